@@ -0,0 +1,120 @@
+# api/admission.py
+
+import asyncio
+import time
+from collections import deque
+from typing import Iterable, Optional
+
+from starlette.responses import JSONResponse
+
+from api.metrics import ADMISSION_SHED
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with a bounded FIFO wait queue and a latency budget.
+
+    At most `max_in_flight` requests hold a slot and up to `max_queue` more wait for one,
+    in arrival order. A request is shed instead of queued when the queue is full, or when
+    its expected wait (its place in the queue, spread over the slots, times the recent
+    mean time a slot is held) plus its own service time exceeds the budget. A queued
+    request still waiting when its budget runs out is shed as well.
+
+    Shedding costs no model work, so an overloaded pod answers the excess in microseconds
+    instead of letting every request's latency grow. All state lives on the event loop.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, latency_budget_s: float,
+                 smoothing: float = 0.1):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self.latency_budget_s = latency_budget_s
+        self.smoothing = smoothing
+        self.in_flight = 0
+        # Moving average of the time a slot is held (0 until the first request completes)
+        self.service_time_s = 0.0
+        self._waiters = deque()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> Optional[str]:
+        """Waits for a slot; returns None once admitted, or the reason the request is shed."""
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            return None
+        if len(self._waiters) >= self.max_queue:
+            return "queue_full"
+        expected_wait_s = (len(self._waiters) + 1) / self.max_in_flight * self.service_time_s
+        if expected_wait_s + self.service_time_s > self.latency_budget_s:
+            return "latency_budget"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # A released slot is handed over directly by `release`
+            await asyncio.wait_for(waiter, self.latency_budget_s - self.service_time_s)
+        except asyncio.TimeoutError:
+            return "timeout"
+        except asyncio.CancelledError:
+            # The client went away; pass on a slot that was already handed over
+            if waiter.done() and not waiter.cancelled():
+                self._hand_over()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        return None
+
+    def release(self, held_s: float):
+        """Frees the slot of a finished request that held it for `held_s` seconds."""
+        if self.service_time_s == 0.0:
+            self.service_time_s = held_s
+        else:
+            self.service_time_s += self.smoothing * (held_s - self.service_time_s)
+        self._hand_over()
+
+    def _hand_over(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware applying an AdmissionController to the prediction paths.
+
+    Other paths (/health, /metrics, admin endpoints) are never queued or shed, so probes
+    keep answering while the pod is saturated. Shed requests get a 503 with Retry-After.
+    """
+
+    def __init__(self, app, controller: AdmissionController,
+                 paths: Iterable[str] = ("/predict", "/predict/batch"), retry_after_s: int = 1):
+        self.app = app
+        self.controller = controller
+        self.paths = frozenset(paths)
+        self.retry_after_s = retry_after_s
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        reason = await self.controller.acquire()
+        if reason is not None:
+            ADMISSION_SHED.labels(reason).inc()
+            response = JSONResponse({"detail": "Service overloaded, retry later."},
+                                    status_code=503,
+                                    headers={"Retry-After": str(self.retry_after_s)})
+            await response(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(time.perf_counter() - start)
@@ -0,0 +1,117 @@
+# api/audit.py
+
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+
+from api.metrics import AUDIT_RECORDS_WRITTEN, AUDIT_RECORDS_DROPPED
+
+
+class AuditLogger:
+    """
+    Non-blocking structured request/response log.
+
+    `log` only appends a tuple to a bounded in-memory buffer (records are dropped and counted
+    when it is full). A background task periodically serialises the buffer to JSONL in a
+    worker thread, so request latency never depends on disk or log-collector back-pressure.
+    The file is rotated by size (`path.1` ... `path.N`); a path of "-" writes to stdout.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 10000, flush_interval_s: float = 1.0,
+                 sample_rate: float = 1.0, max_bytes: int = 50 * 1024 * 1024,
+                 backup_count: int = 5):
+        self.path = None if path == "-" else Path(path)
+        self.buffer_size = buffer_size
+        self.flush_interval_s = flush_interval_s
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._buffer = deque()
+        self._worker = None
+        self._loop = None
+
+    def log(self, endpoint: str, input_data: dict, output: dict):
+        """Buffers one record; never blocks and never raises."""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        if len(self._buffer) >= self.buffer_size:
+            AUDIT_RECORDS_DROPPED.inc()
+            return
+        self._buffer.append((time.time(), endpoint, input_data, output))
+        self._ensure_started()
+
+    async def close(self):
+        """Stops the background task and flushes whatever is still buffered."""
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        await asyncio.to_thread(self.flush)
+
+    def flush(self):
+        """Writes all buffered records (runs in a worker thread)."""
+        records = []
+        while self._buffer:
+            records.append(self._buffer.popleft())
+        if not records:
+            return
+
+        lines = "".join(
+            json.dumps({
+                "timestamp": datetime.fromtimestamp(ts, timezone.utc).isoformat(),
+                "endpoint": endpoint,
+                "input": input_data,
+                "output": output
+            }) + "\n"
+            for ts, endpoint, input_data, output in records
+        )
+
+        if self.path is None:
+            sys.stdout.write(lines)
+            sys.stdout.flush()
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._rotate_if_needed(len(lines.encode()))
+            with open(self.path, "a") as f:
+                f.write(lines)
+        AUDIT_RECORDS_WRITTEN.inc(len(records))
+
+    def _rotate_if_needed(self, incoming_bytes: int):
+        if not self.path.exists() or self.path.stat().st_size + incoming_bytes <= self.max_bytes:
+            return
+        if self.backup_count <= 0:
+            self.path.unlink()
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{i}")
+            if older.exists():
+                os.replace(older, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+
+    def _ensure_started(self):
+        # The flusher is bound to the running loop; start it lazily on first use
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # called outside the event loop: records are flushed on close
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval_s)
+            if self._buffer:
+                try:
+                    await asyncio.to_thread(self.flush)
+                except Exception as e:
+                    print(f"Audit log flush failed: {e}")
@@ -0,0 +1,110 @@
+# api/batching.py
+
+import asyncio
+import time
+from typing import Callable, Dict, List
+
+from api.metrics import MICROBATCH_SIZE, MICROBATCH_QUEUE_WAIT
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-record requests and scores them together.
+
+    Requests are queued on the event loop. A background task takes up to `max_batch_size`
+    records, waiting at most `max_wait_ms` for the batch to fill, and runs the CPU-bound
+    `score_batch` callable in a worker thread so the event loop is never blocked.
+    """
+
+    def __init__(self, score_batch: Callable[[List[Dict]], List[Dict]],
+                 max_batch_size: int, max_wait_ms: float):
+        self.score_batch = score_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue = None
+        self._worker = None
+        self._loop = None
+        self._batch = []  # items taken off the queue and not yet resolved
+
+    async def submit(self, record: Dict) -> Dict:
+        """Queues one record and waits for its result."""
+        self._ensure_started()
+        future = self._loop.create_future()
+        self._queue.put_nowait((record, future, time.perf_counter()))
+        return await future
+
+    async def close(self):
+        """Stops the background worker; every pending caller receives a cancellation."""
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        # The worker cancelled the batch it held; what is still queued was never taken
+        while self._queue is not None and not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            future.cancel()
+
+    def _ensure_started(self):
+        # The worker is bound to the running loop; start it lazily on first use
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _collect_batch(self) -> list:
+        # Items are kept on self._batch as soon as they leave the queue, so a cancelled
+        # worker can still resolve them
+        batch = self._batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Drain everything already queued before waiting for stragglers
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        try:
+            while True:
+                batch = await self._collect_batch()
+
+                # Callers that gave up (e.g. client disconnects) are not scored
+                batch = [item for item in batch if not item[1].done()]
+                if not batch:
+                    continue
+
+                started = time.perf_counter()
+                MICROBATCH_SIZE.observe(len(batch))
+                for _, _, enqueued in batch:
+                    MICROBATCH_QUEUE_WAIT.observe(started - enqueued)
+
+                records = [record for record, _, _ in batch]
+                try:
+                    results = await asyncio.to_thread(self.score_batch, records)
+                except Exception as e:
+                    for _, future, _ in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                for (_, future, _), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            # Cancelled (close): the batch being collected or scored is not coming back
+            for _, future, _ in self._batch:
+                future.cancel()  # (a no-op for resolved futures)
+            self._batch = []
@@ -0,0 +1,207 @@
+# api/binary.py
+#
+# Content-negotiated binary bodies for the prediction endpoints. JSON stays the default;
+# these formats skip the per-field pydantic objects and decode straight into NumPy.
+#
+#   application/x-float32                 little-endian float32, FEATURE_NAMES order:
+#                                          13 values for /predict, an (n, 13) row-major
+#                                          matrix for /predict/batch. Responses are float32
+#                                          [prediction, probability] (per row).
+#   application/msgpack                   /predict: a map like the JSON body.
+#                                          /predict/batch: a map of feature -> array.
+#   application/vnd.apache.arrow.stream   /predict/batch only: an Arrow IPC stream with one
+#                                          numeric column per feature.
+#
+# Responses use the request's format. msgpack and pyarrow are optional: they are imported
+# on first use and a 415 is returned when they are not installed.
+
+import struct
+from typing import Dict, Union
+
+import numpy as np
+from fastapi import HTTPException
+from fastapi.routing import APIRoute
+from starlette.routing import Match
+from api.schema import (
+    HeartDiseaseFeatures, FEATURE_RANGES, INTEGER_FEATURES, invalid_features
+)
+
+FEATURE_NAMES = list(HeartDiseaseFeatures.model_fields)
+
+FLOAT32_MEDIA_TYPE = "application/x-float32"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+BINARY_MEDIA_TYPES = (FLOAT32_MEDIA_TYPE, ARROW_MEDIA_TYPE) + MSGPACK_MEDIA_TYPES
+
+_FLOAT32 = np.dtype('<f4')
+_RECORD = struct.Struct(f"<{len(FEATURE_NAMES)}f")
+_RESULT = struct.Struct("<2f")
+
+
+def media_type(content_type: str) -> str:
+    """The bare media type of a Content-Type header ("" when missing)."""
+    return (content_type or "").split(';')[0].strip().lower()
+
+
+class BinaryPayloadRoute(APIRoute):
+    """
+    Route that only matches requests with a binary Content-Type.
+
+    This lets the binary endpoints share their paths with the JSON ones: registered
+    first, they take the binary bodies and everything else falls through to JSON.
+    """
+
+    def matches(self, scope):
+        match, child_scope = super().matches(scope)
+        if match is not Match.NONE:
+            headers = dict(scope.get('headers') or [])
+            if media_type(headers.get(b'content-type', b'').decode('latin-1')) \
+                    not in BINARY_MEDIA_TYPES:
+                return Match.NONE, {}
+        return match, child_scope
+
+
+def _invalid(detail: str):
+    raise HTTPException(status_code=422, detail=detail)
+
+
+def _check_size(n_rows: int, max_rows: int):
+    # Before any per-value decoding or validation: oversized bodies are rejected cheaply
+    if max_rows is not None and n_rows > max_rows:
+        raise HTTPException(status_code=413,
+                            detail=f"Batch of {n_rows} records exceeds the limit of {max_rows}.")
+
+
+def _optional_module(name: str):
+    try:
+        return __import__(name)
+    except ImportError:
+        raise HTTPException(status_code=415, detail=f"{name} is not installed on this server.")
+
+
+def _check_columns(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    invalid = invalid_features(columns)
+    if invalid:
+        _invalid(f"Values out of range for: {', '.join(invalid)}")
+    return columns
+
+
+def _columns_from_map(data, max_rows: int = None) -> Dict[str, np.ndarray]:
+    if not isinstance(data, dict):
+        _invalid("Expected a map of feature names to values.")
+    missing = [name for name in FEATURE_NAMES if name not in data]
+    if missing:
+        _invalid(f"Missing features: {', '.join(missing)}")
+    _check_size(max(len(data[name]) if isinstance(data[name], list) else 1
+                    for name in FEATURE_NAMES), max_rows)
+    try:
+        columns = {name: np.asarray(data[name], dtype=np.float64).reshape(-1)
+                   for name in FEATURE_NAMES}
+    except (TypeError, ValueError):
+        _invalid("Feature values must be numbers.")
+    if len({len(values) for values in columns.values()}) > 1:
+        _invalid("All feature columns must have the same length")
+    return columns
+
+
+def decode_columns(body: bytes, media: str, max_rows: int = None) -> Dict[str, np.ndarray]:
+    """
+    Decodes and validates a batch body into one NumPy array per feature.
+
+    A batch of more than `max_rows` rows is rejected with a 413 as soon as its size is
+    known, before its values are converted or range-checked.
+    """
+    if media == FLOAT32_MEDIA_TYPE:
+        row_size = _FLOAT32.itemsize * len(FEATURE_NAMES)
+        _check_size(len(body) // row_size, max_rows)
+        if len(body) % row_size:
+            _invalid(f"Body must be an (n, {len(FEATURE_NAMES)}) little-endian float32 matrix.")
+        matrix = np.frombuffer(body, dtype=_FLOAT32).reshape(-1, len(FEATURE_NAMES))
+        columns = {name: matrix[:, i] for i, name in enumerate(FEATURE_NAMES)}
+    elif media == ARROW_MEDIA_TYPE:
+        pa = _optional_module('pyarrow')
+        try:
+            table = pa.ipc.open_stream(body).read_all()
+        except (pa.ArrowInvalid, OSError) as e:
+            _invalid(f"Invalid Arrow IPC stream: {e}")
+        _check_size(table.num_rows, max_rows)
+        missing = [name for name in FEATURE_NAMES if name not in table.column_names]
+        if missing:
+            _invalid(f"Missing features: {', '.join(missing)}")
+        columns = {}
+        for name in FEATURE_NAMES:
+            column = table.column(name)
+            if column.null_count or not pa.types.is_integer(column.type) \
+                    and not pa.types.is_floating(column.type):
+                _invalid(f"Column '{name}' must be numeric without nulls.")
+            columns[name] = column.to_numpy()
+    else:
+        msgpack = _optional_module('msgpack')
+        try:
+            data = msgpack.unpackb(body)
+        except Exception as e:
+            _invalid(f"Invalid msgpack body: {e}")
+        columns = _columns_from_map(data, max_rows)
+    return _check_columns(columns)
+
+
+def decode_record(body: bytes, media: str) -> Dict[str, Union[int, float]]:
+    """
+    Decodes and validates a single-record body into the same dictionary as the JSON path.
+
+    One record is checked with plain scalar comparisons: for 13 values that is cheaper
+    than building arrays.
+    """
+    if media == FLOAT32_MEDIA_TYPE:
+        if len(body) != _RECORD.size:
+            _invalid(f"Body must be {len(FEATURE_NAMES)} little-endian float32 values.")
+        record = dict(zip(FEATURE_NAMES, _RECORD.unpack(body)))
+    elif media == ARROW_MEDIA_TYPE:
+        raise HTTPException(status_code=415, detail="Arrow bodies are only accepted by "
+                                                    "/predict/batch.")
+    else:
+        msgpack = _optional_module('msgpack')
+        try:
+            record = msgpack.unpackb(body)
+        except Exception as e:
+            _invalid(f"Invalid msgpack body: {e}")
+        if not isinstance(record, dict):
+            _invalid("Expected a map of feature names to values.")
+        missing = [name for name in FEATURE_NAMES if name not in record]
+        if missing:
+            _invalid(f"Missing features: {', '.join(missing)}")
+        if not all(type(record[name]) in (int, float) for name in FEATURE_NAMES):
+            _invalid("Feature values must be numbers.")
+
+    invalid = [name for name, (low, high) in FEATURE_RANGES.items()
+               if not low <= record[name] <= high
+               or name in INTEGER_FEATURES and record[name] != int(record[name])]
+    if invalid:
+        _invalid(f"Values out of range for: {', '.join(invalid)}")
+    return {name: int(record[name]) if name in INTEGER_FEATURES else float(record[name])
+            for name in FEATURE_NAMES}
+
+
+def encode_record_result(result: dict, message: str, media: str) -> bytes:
+    """Encodes one prediction result in the request's format."""
+    if media == FLOAT32_MEDIA_TYPE:
+        return _RESULT.pack(result['prediction'], result['probability'])
+    return _optional_module('msgpack').packb({**result, "message": message})
+
+
+def encode_column_results(predictions: np.ndarray, probabilities: np.ndarray,
+                          media: str) -> bytes:
+    """Encodes batch results in the request's format (columnar, in input order)."""
+    if media == FLOAT32_MEDIA_TYPE:
+        return np.column_stack([predictions, probabilities]).astype(_FLOAT32).tobytes()
+    if media == ARROW_MEDIA_TYPE:
+        pa = _optional_module('pyarrow')
+        table = pa.table({"prediction": pa.array(predictions.astype(np.int8)),
+                          "probability": pa.array(probabilities.astype(np.float32))})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    return _optional_module('msgpack').packb({"prediction": predictions.tolist(),
+                                              "probability": probabilities.tolist(),
+                                              "count": len(predictions)})
@@ -0,0 +1,24 @@
+# api/gunicorn_conf.py
+#
+# Multi-worker serving: gunicorn imports the app (and loads the model) once in the master
+# process, then forks the uvicorn workers. Model arrays loaded with MODEL_MMAP and any
+# memory allocated before the fork are shared copy-on-write instead of duplicated per worker.
+#
+# Run with: gunicorn -c api/gunicorn_conf.py api.main:app
+
+import gc
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import api.main (and load the model) before forking the workers
+preload_app = True
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far out of the GC's reach: collections in the workers
+    # would otherwise write to these objects' headers and un-share their pages
+    gc.freeze()
@@ -1,72 +1,338 @@
 # api/main.py
 
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, HTTPException, Header, BackgroundTasks, Request
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, Response
 from prometheus_fastapi_instrumentator import Instrumentator
-import json
+import asyncio
+import hmac
+import numpy as np
 import os
 import sys
+import threading
 from pathlib import Path
-import pandas as pd
 
 # Add project root and src to PYTHONPATH for imports to work in local and container env
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 sys.path.append(str(PROJECT_ROOT))
 
-from src.inference import predict_heart_disease, load_model_pipeline
-from api.schema import HeartDiseaseFeatures, PredictionResponse
+from src.config import (
+    MAX_BATCH_SIZE, MICROBATCH_ENABLED, MICROBATCH_MAX_SIZE, MICROBATCH_MAX_WAIT_MS,
+    MODEL_RELOAD_INTERVAL_S, AUDIT_LOG_ENABLED, AUDIT_LOG_PATH, AUDIT_BUFFER_SIZE,
+    AUDIT_FLUSH_INTERVAL_S, AUDIT_SAMPLE_RATE, AUDIT_MAX_BYTES, AUDIT_BACKUP_COUNT,
+    PROFILING_ADMIN_TOKEN, PROFILING_MAX_SECONDS, DRIFT_MONITOR_ENABLED, SHADOW_ENABLED,
+    SHADOW_MODELS, SHADOW_MAX_WORKERS, SHADOW_MAX_PENDING, ADMISSION_CONTROL_ENABLED,
+    ADMISSION_MAX_IN_FLIGHT, ADMISSION_MAX_QUEUE, ADMISSION_LATENCY_BUDGET_MS,
+    ADMISSION_RETRY_AFTER_S, CASCADE_ENABLED
+)
+from src import inference
+from src.inference import (
+    predict_heart_disease_batch_cached, predict_heart_disease_columns, get_active_model,
+    load_challenger_models, attach_active_cascade, ModelWatcher, stage_timer
+)
+from api.schema import (
+    HeartDiseaseFeatures, PredictionResponse, BatchPredictionRequest, BatchPredictionResponse
+)
+from api.binary import (
+    BinaryPayloadRoute, FEATURE_NAMES, media_type, decode_record, decode_columns,
+    encode_record_result, encode_column_results
+)
+from api.admission import AdmissionController, AdmissionControlMiddleware
+from api.batching import MicroBatcher
+from api.audit import AuditLogger
+from src.drift import load_drift_monitor
+from api.metrics import (
+    register_cache_metrics, register_stage_metrics, register_drift_metrics,
+    register_cascade_metrics, register_admission_metrics
+)
+from api.profiling import sample_stacks
+from api.shadow import ShadowScorer
+
+
+def _load_shadow_scorer():
+    try:
+        challengers = load_challenger_models(names=SHADOW_MODELS)
+    except Exception as e:
+        print(f"Shadow scoring disabled: failed to load the challengers: {e}")
+        return None
+    if not challengers:
+        return None
+    print(f"Shadow scoring with challengers: {', '.join(challengers)}")
+    return ShadowScorer(challengers, max_workers=SHADOW_MAX_WORKERS, max_pending=SHADOW_MAX_PENDING)
+
+
+# Challenger models score the same traffic in the background, for promotion decisions.
+# They are loaded by a thread started at startup: unpickling them imports scikit-learn
+# (and SciPy/pandas), which the flat serving bundle otherwise keeps off the startup path.
+SHADOW_SCORER = None
+SHADOW_LOADED = threading.Event()
+
+
+def _start_shadow_scoring():
+    global SHADOW_SCORER
+    SHADOW_SCORER = _load_shadow_scorer()
+    SHADOW_LOADED.set()
+
+
+def _start_cascade():
+    # Like the challengers, the cheap cascade stage is unpickled off the startup path;
+    # the served model answers alone until it is attached
+    try:
+        attach_active_cascade()
+    except Exception as e:
+        print(f"Cascade disabled: failed to load the cheap stage: {e}")
+
+
+def score_batch(input_data):
+    """Scores with the served model, then hands the batch to the shadow challengers."""
+    results = predict_heart_disease_batch_cached(input_data)
+    if SHADOW_SCORER is not None:
+        SHADOW_SCORER.submit(input_data, results)
+    return results
+
+
+def score_columns(columns):
+    """`score_batch` for decoded binary batches: NumPy columns in, arrays out."""
+    predictions, probabilities = predict_heart_disease_columns(columns)
+    if SHADOW_SCORER is not None:
+        # Per-row results for the agreement metrics are built in the shadow pool
+        SHADOW_SCORER.submit(columns, lambda: [
+            {"prediction": prediction, "probability": probability}
+            for prediction, probability in zip(predictions.tolist(), probabilities.tolist())
+        ])
+    return predictions, probabilities
+
+
+# Concurrent /predict calls are grouped and scored together off the event loop
+MICRO_BATCHER = MicroBatcher(
+    score_batch,
+    max_batch_size=MICROBATCH_MAX_SIZE,
+    max_wait_ms=MICROBATCH_MAX_WAIT_MS
+)
+
+# Logging (Step 8): buffered structured log of requests/responses, written off the request path
+AUDIT_LOGGER = AuditLogger(
+    AUDIT_LOG_PATH,
+    buffer_size=AUDIT_BUFFER_SIZE,
+    flush_interval_s=AUDIT_FLUSH_INTERVAL_S,
+    sample_rate=AUDIT_SAMPLE_RATE,
+    max_bytes=AUDIT_MAX_BYTES,
+    backup_count=AUDIT_BACKUP_COUNT
+) if AUDIT_LOG_ENABLED else None
+
+# Bounded concurrency for the prediction endpoints: excess load is shed with a fast 503
+ADMISSION_CONTROLLER = AdmissionController(
+    ADMISSION_MAX_IN_FLIGHT,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_LATENCY_BUDGET_MS / 1000.0
+) if ADMISSION_CONTROL_ENABLED else None
+
+# Input drift against the training data (live histograms, constant memory); set by
+# refresh_drift_monitor once the model is loaded, None while monitoring is off
+DRIFT_MONITOR = None
+
+
+def refresh_drift_monitor(model=None):
+    """
+    Rebuilds DRIFT_MONITOR for the served model (at startup and after every hot reload).
+
+    The saved reference is only used when it was built for that model version; after an
+    incremental update (which does not refresh it) monitoring stays off until the next
+    full training run.
+    """
+    global DRIFT_MONITOR
+    if not DRIFT_MONITOR_ENABLED:
+        return
+    model = model or inference.ACTIVE_MODEL
+    DRIFT_MONITOR = load_drift_monitor(model_version=model.version) \
+        if model is not None else None
+    register_drift_metrics(DRIFT_MONITOR)
+
+
+async def observe_drift(input_data):
+    # Runs as a background task on the event loop once the response has been sent:
+    # batches arrive as columns, single /predict records as a one-record list
+    monitor = DRIFT_MONITOR
+    if monitor is None:  # (the model changed since the task was queued)
+        return
+    if isinstance(input_data, dict):
+        monitor.update_columns(input_data)
+    else:
+        monitor.update(input_data)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Hot reload: a background thread swaps in new artifacts without a restart
+    watcher = None
+    if MODEL_RELOAD_INTERVAL_S > 0:
+        watcher = ModelWatcher(interval_s=MODEL_RELOAD_INTERVAL_S,
+                               on_reload=refresh_drift_monitor)
+        watcher.start()
+    if SHADOW_ENABLED and not SHADOW_LOADED.is_set():
+        threading.Thread(target=_start_shadow_scoring, name="shadow-loader", daemon=True).start()
+    if CASCADE_ENABLED:
+        threading.Thread(target=_start_cascade, name="cascade-loader", daemon=True).start()
+    yield
+    if watcher is not None:
+        watcher.stop()
+    await MICRO_BATCHER.close()
+    if AUDIT_LOGGER is not None:
+        await AUDIT_LOGGER.close()
+    if SHADOW_SCORER is not None:
+        SHADOW_SCORER.close()
+
 
 # Initialize FastAPI
-app = FastAPI(title="Heart Disease Prediction API", version="1.0")
+app = FastAPI(title="Heart Disease Prediction API", version="1.0", lifespan=lifespan)
+
+# Admission control is added before the instrumentation middleware, which therefore wraps
+# it: shed requests still show up (as 503s) in the HTTP metrics
+if ADMISSION_CONTROLLER is not None:
+    app.add_middleware(AdmissionControlMiddleware, controller=ADMISSION_CONTROLLER,
+                       retry_after_s=ADMISSION_RETRY_AFTER_S)
 
 # Prometheus metrics instrumentation
 Instrumentator().instrument(app).expose(app)
+register_cache_metrics()
+register_stage_metrics()
+register_cascade_metrics()
+register_admission_metrics(ADMISSION_CONTROLLER)
+
+
+@app.exception_handler(RequestValidationError)
+async def batch_size_exception_handler(request: Request, exc: RequestValidationError):
+    # The batch schema caps its lists at MAX_BATCH_SIZE (validation stops at the first
+    # extra item): an oversized batch is a 413, whatever else is wrong with it
+    if any(error["type"] == "too_long" for error in exc.errors()):
+        return JSONResponse(status_code=413, content={
+            "detail": f"Batch exceeds the limit of {MAX_BATCH_SIZE} records."})
+    return await request_validation_exception_handler(request, exc)
 
-# Load model pipeline on startup
+
+# Load the model on startup (from the serving bundle when one matches the artifact)
 try:
-    load_model_pipeline()
+    get_active_model()
 except Exception as e:
     print(f"CRITICAL ERROR: Failed to load model during startup: {e}")
+refresh_drift_monitor()
 
 
 @app.get("/health", response_model=dict, tags=["Monitoring"])
-def get_health():
+async def get_health():
     """Health check endpoint to ensure API is running and model is loaded."""
-    model_loaded = True
-    try:
-        load_model_pipeline()
-    except:
-        model_loaded = False
-
+    # Runs on the event loop (no threadpool slot), so saturated batch workers cannot starve it.
+    # It only reads the active snapshot: loading (hashing, unpickling) would block the loop.
+    model = inference.ACTIVE_MODEL
     return {
         "status": "ok",
-        "model_loaded": model_loaded,
+        "model_loaded": model is not None,
+        "model_version": model.version if model is not None else None,
+        "model_loaded_at": model.loaded_at.isoformat() if model is not None else None,
         "api_version": app.version
     }
 
 
+def to_prediction_response(result: dict) -> PredictionResponse:
+    """Wraps a raw inference result into the public response schema."""
+    message = "Heart disease predicted" if result['prediction'] == 1 else "No heart disease predicted"
+
+    return PredictionResponse(
+        prediction=result['prediction'],
+        probability=result['probability'],
+        message=message
+    )
+
+
+async def score_record(input_data: dict, background_tasks: BackgroundTasks) -> dict:
+    """Scores one validated /predict record, then audits it and queues the drift update."""
+    if MICROBATCH_ENABLED:
+        result = await MICRO_BATCHER.submit(input_data)
+    else:
+        # Keep the CPU-bound model call off the event loop
+        result = (await asyncio.to_thread(score_batch, [input_data]))[0]
+
+    # Logging (Step 8): Structured log of request/response (buffered, non-blocking)
+    if AUDIT_LOGGER is not None:
+        AUDIT_LOGGER.log("/predict", input_data, result)
+    if DRIFT_MONITOR is not None:
+        background_tasks.add_task(observe_drift, [input_data])
+    return result
+
+
+# Binary payloads (api/binary.py). These routes only match binary Content-Types and are
+# registered before the JSON routes of the same paths, which handle everything else.
+binary_router = APIRouter(route_class=BinaryPayloadRoute)
+
+
+@binary_router.post("/predict", include_in_schema=False)
+async def predict_risk_binary(request: Request, background_tasks: BackgroundTasks):
+    """/predict for msgpack and fixed-layout float32 bodies, answered in the same format."""
+    media = media_type(request.headers.get("content-type"))
+    body = await request.body()
+    with stage_timer("validation"):
+        input_data = decode_record(body, media)
+    try:
+        result = await score_record(input_data, background_tasks)
+        with stage_timer("serialization"):
+            return Response(
+                encode_record_result(result, to_prediction_response(result).message, media),
+                media_type=media
+            )
+
+    except FileNotFoundError:
+        raise HTTPException(status_code=500, detail="Model artifact not found. The service is not ready.")
+    except Exception as e:
+        print(f"Prediction Error: {e}")
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+
+@binary_router.post("/predict/batch", include_in_schema=False)
+async def predict_risk_batch_binary(request: Request, background_tasks: BackgroundTasks):
+    """/predict/batch for float32 matrices, Arrow IPC streams and msgpack columns."""
+    media = media_type(request.headers.get("content-type"))
+    body = await request.body()
+    with stage_timer("batch_validation"):
+        columns = decode_columns(body, media, max_rows=MAX_BATCH_SIZE)
+    n_rows = len(columns[FEATURE_NAMES[0]])
+    if n_rows == 0:
+        return Response(encode_column_results(np.zeros(0), np.zeros(0), media), media_type=media)
+
+    try:
+        predictions, probabilities = await asyncio.to_thread(score_columns, columns)
+        if DRIFT_MONITOR is not None:
+            background_tasks.add_task(observe_drift, columns)
+
+        with stage_timer("serialization"):
+            return Response(encode_column_results(predictions, probabilities, media),
+                            media_type=media)
+
+    except FileNotFoundError:
+        raise HTTPException(status_code=500, detail="Model artifact not found. The service is not ready.")
+    except Exception as e:
+        print(f"Batch Prediction Error: {e}")
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+
+app.include_router(binary_router)
+
+
 @app.post("/predict", response_model=PredictionResponse, tags=["Prediction"])
-async def predict_risk(features: HeartDiseaseFeatures):
-    """Predicts the presence of heart disease (1) or absence (0)."""
+async def predict_risk(features: HeartDiseaseFeatures, background_tasks: BackgroundTasks):
+    """
+    Predicts the presence of heart disease (1) or absence (0).
+
+    Also accepts msgpack and little-endian float32 bodies (see api/binary.py).
+    """
     try:
         input_data = features.model_dump()
-        result = predict_heart_disease(input_data)
-
-        # Logging (Step 8): Structured log of request/response
-        log_entry = {
-            "timestamp": pd.Timestamp.now().isoformat(),
-            "endpoint": "/predict",
-            "input": input_data,
-            "output": result
-        }
-        print(json.dumps(log_entry))  # Prints to stdout, collected by Kubernetes/Cloud logs
-
-        message = "Heart disease predicted" if result['prediction'] == 1 else "No heart disease predicted"
-
-        return PredictionResponse(
-            prediction=result['prediction'],
-            probability=result['probability'],
-            message=message
-        )
+        result = await score_record(input_data, background_tasks)
+
+        # Serialize here (instead of in FastAPI after returning) so the stage can be timed
+        with stage_timer("serialization"):
+            return JSONResponse(to_prediction_response(result).model_dump())
 
     except FileNotFoundError:
         raise HTTPException(status_code=500, detail="Model artifact not found. The service is not ready.")
@@ -74,4 +340,67 @@ async def predict_risk(features: HeartDiseaseFeatures):
         print(f"Prediction Error: {e}")
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse, tags=["Prediction"])
+def predict_risk_batch(batch: BatchPredictionRequest, background_tasks: BackgroundTasks):
+    """
+    Scores many patients in one request with a single vectorized model call.
+
+    Also accepts float32 matrices, Arrow IPC streams and msgpack columns (api/binary.py).
+    """
+    if len(batch) == 0:
+        return BatchPredictionResponse(predictions=[], count=0)
+
+    try:
+        if batch.records is not None:
+            input_data = [record.model_dump() for record in batch.records]
+        else:
+            input_data = batch.columns.model_dump()
+        results = score_batch(input_data)
+        if DRIFT_MONITOR is not None:
+            # Columns are built here, in the threadpool: the drift task on the event loop
+            # then updates its histograms with one vectorized pass per feature
+            columns = input_data if isinstance(input_data, dict) else \
+                {name: [record[name] for record in input_data] for name in FEATURE_NAMES}
+            background_tasks.add_task(observe_drift, columns)
+
+        with stage_timer("serialization"):
+            return JSONResponse(BatchPredictionResponse(
+                predictions=[to_prediction_response(result) for result in results],
+                count=len(results)
+            ).model_dump())
+
+    except FileNotFoundError:
+        raise HTTPException(status_code=500, detail="Model artifact not found. The service is not ready.")
+    except Exception as e:
+        print(f"Batch Prediction Error: {e}")
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+
+# Only one profile at a time: concurrent samplers would skew each other
+_PROFILE_LOCK = asyncio.Lock()
+
+
+@app.post("/admin/profile", response_model=dict, tags=["Monitoring"])
+async def profile_service(seconds: float = 10.0, interval_ms: float = 5.0,
+                          include_idle: bool = False,
+                          x_admin_token: str = Header(None)):
+    """Samples the stacks of all threads for `seconds` and returns the aggregated profile."""
+    # Hidden unless a token is configured; compared in constant time
+    if not PROFILING_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, PROFILING_ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+    if not 0 < seconds <= PROFILING_MAX_SECONDS or interval_ms <= 0:
+        raise HTTPException(
+            status_code=422,
+            detail=f"seconds must be in (0, {PROFILING_MAX_SECONDS}] and interval_ms > 0."
+        )
+    if _PROFILE_LOCK.locked():
+        raise HTTPException(status_code=409, detail="A profile is already being recorded.")
+
+    async with _PROFILE_LOCK:
+        # The sampler sleeps between samples in its own thread; requests keep being served
+        return await asyncio.to_thread(sample_stacks, seconds, interval_ms / 1000, include_idle)
+
 # Local Run Command: uvicorn api.main:app --reload
\ No newline at end of file
@@ -0,0 +1,209 @@
+# api/metrics.py
+
+from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from src import inference
+
+# Custom application metrics. They are registered in the default Prometheus registry,
+# so the Instrumentator's /metrics endpoint exposes them next to the HTTP metrics.
+
+MICROBATCH_SIZE = Histogram(
+    "predict_microbatch_size",
+    "Number of /predict requests scored together in one micro-batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+
+MICROBATCH_QUEUE_WAIT = Histogram(
+    "predict_microbatch_queue_wait_seconds",
+    "Time a /predict request waited in the micro-batch queue before scoring",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+# Time spent in each stage of a prediction: request validation, feature encoding (or
+# DataFrame construction + ColumnTransformer), classifier, result formatting, cache lookup,
+# response serialization, and model loading. With the cascade on, "cascade_cheap" wraps the
+# cheap model's own encode/classifier stages.
+INFERENCE_STAGE_SECONDS = Histogram(
+    "inference_stage_seconds",
+    "Wall time of one inference stage",
+    ["stage"],
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+             0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 2.5, 10.0)
+)
+
+# Shadow scoring of challenger models (agreement rate = agree / (agree + disagree))
+SHADOW_PREDICTIONS = Counter(
+    "shadow_predictions",
+    "Challenger predictions, by agreement with the served model's prediction",
+    ["model", "outcome"]
+)
+
+SHADOW_PROBABILITY_DELTA = Histogram(
+    "shadow_probability_delta",
+    "Absolute difference between the challenger's and the served model's probability",
+    ["model"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0)
+)
+
+SHADOW_LATENCY = Histogram(
+    "shadow_scoring_seconds",
+    "Time a challenger took to score one batch of served requests",
+    ["model"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+)
+
+SHADOW_BATCHES_DROPPED = Counter(
+    "shadow_batches_dropped",
+    "Batches not shadow-scored because the challenger pool was saturated"
+)
+
+AUDIT_RECORDS_WRITTEN = Counter(
+    "audit_log_records_written",
+    "Audit log records flushed to the JSONL sink"
+)
+
+AUDIT_RECORDS_DROPPED = Counter(
+    "audit_log_records_dropped",
+    "Audit log records dropped because the in-memory buffer was full"
+)
+
+
+# Requests answered with a 503 by admission control, by reason (queue_full, latency_budget
+# or timeout)
+ADMISSION_SHED = Counter(
+    "admission_shed_requests",
+    "Prediction requests shed by admission control",
+    ["reason"]
+)
+
+
+class PredictionCacheCollector:
+    """Reports the prediction cache statistics at scrape time."""
+
+    def collect(self):
+        cache = inference.PREDICTION_CACHE
+        if cache is None:
+            return
+        for name, value, documentation in [
+            ("hits", cache.hits, "Prediction cache hits"),
+            ("misses", cache.misses, "Prediction cache misses"),
+            ("evictions", cache.evictions, "Entries evicted because the cache was full"),
+            ("expirations", cache.expirations, "Entries dropped because their TTL expired"),
+            ("invalidations", cache.invalidations, "Cache flushes caused by a new model version"),
+        ]:
+            yield CounterMetricFamily(f"prediction_cache_{name}", documentation, value=value)
+        yield GaugeMetricFamily("prediction_cache_entries", "Entries currently cached",
+                                value=len(cache))
+
+
+_CACHE_COLLECTOR = None
+
+
+def register_cache_metrics():
+    """Registers the cache collector once (safe to call on every app import)."""
+    global _CACHE_COLLECTOR
+    if _CACHE_COLLECTOR is None:
+        _CACHE_COLLECTOR = PredictionCacheCollector()
+        REGISTRY.register(_CACHE_COLLECTOR)
+
+
+class DriftCollector:
+    """Computes the per-feature drift scores at scrape time (O(features x bins))."""
+
+    def __init__(self, monitor):
+        self.monitor = monitor
+
+    def collect(self):
+        psi = GaugeMetricFamily("feature_drift_psi",
+                                "Population stability index of live traffic vs. training data",
+                                labels=["feature"])
+        ks = GaugeMetricFamily("feature_drift_ks",
+                               "Binned Kolmogorov-Smirnov statistic vs. training data",
+                               labels=["feature"])
+        monitor = self.monitor  # (swapped when the served model changes)
+        if monitor is None:
+            return
+        for feature, scores in monitor.scores().items():
+            psi.add_metric([feature], scores["psi"])
+            if feature in monitor.reference["numerical"]:
+                ks.add_metric([feature], scores["ks"])
+        yield psi
+        yield ks
+        yield CounterMetricFamily("drift_monitor_observations",
+                                  "Records fed to the drift monitor",
+                                  value=monitor.n_observed)
+
+
+_DRIFT_COLLECTOR = None
+
+
+def register_drift_metrics(monitor):
+    """
+    Points the drift collector at `monitor`, registering it on first use.
+
+    None (no reference for the served model) hides the drift series until a monitor is set.
+    """
+    global _DRIFT_COLLECTOR
+    if _DRIFT_COLLECTOR is None:
+        if monitor is None:
+            return
+        _DRIFT_COLLECTOR = DriftCollector(monitor)
+        REGISTRY.register(_DRIFT_COLLECTOR)
+    _DRIFT_COLLECTOR.monitor = monitor
+
+
+# Rows scored by the cascade (escalation rate = escalated / cheap)
+CASCADE_ROWS = Counter(
+    "cascade_rows",
+    "Rows scored by the cheap cascade stage, and rows escalated to the served model",
+    ["stage"]
+)
+
+
+def observe_cascade(n_rows: int, n_escalated: int):
+    CASCADE_ROWS.labels("cheap").inc(n_rows)
+    if n_escalated:
+        CASCADE_ROWS.labels("escalated").inc(n_escalated)
+
+
+def register_cascade_metrics():
+    """Routes the cascade row counts into the cascade counter."""
+    inference.CASCADE_OBSERVER = observe_cascade
+
+
+class AdmissionCollector:
+    """Reports the admission controller's occupancy at scrape time (autoscaling signals)."""
+
+    def __init__(self, controller):
+        self.controller = controller
+
+    def collect(self):
+        yield GaugeMetricFamily("admission_in_flight_requests",
+                                "Prediction requests currently being processed",
+                                value=self.controller.in_flight)
+        yield GaugeMetricFamily("admission_queue_depth",
+                                "Prediction requests waiting for a processing slot",
+                                value=self.controller.queue_depth)
+        yield GaugeMetricFamily("admission_service_time_seconds",
+                                "Moving average of the time a request holds a slot",
+                                value=self.controller.service_time_s)
+
+
+_ADMISSION_COLLECTOR = None
+
+
+def register_admission_metrics(controller):
+    """Registers the admission collector for `controller` (once; no-op when disabled)."""
+    global _ADMISSION_COLLECTOR
+    if controller is not None and _ADMISSION_COLLECTOR is None:
+        _ADMISSION_COLLECTOR = AdmissionCollector(controller)
+        REGISTRY.register(_ADMISSION_COLLECTOR)
+
+
+def observe_stage(stage: str, seconds: float):
+    INFERENCE_STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def register_stage_metrics():
+    """Routes the inference stage timings into the stage histogram."""
+    inference.STAGE_OBSERVER = observe_stage
@@ -0,0 +1,78 @@
+# api/profiling.py
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Leaf frames of threads that are parked (event loop select, idle thread-pool workers,
+# watcher waits). Their samples are dropped unless `include_idle` is set.
+IDLE_LEAF_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("thread.py", "_worker"),
+    ("queue.py", "get"),
+}
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    # co_qualname is new in Python 3.11 (the image and CI run 3.10)
+    name = getattr(code, 'co_qualname', code.co_name)
+    # The definition line, not the executing one: samples add up per function
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAF_FRAMES
+
+
+def sample_stacks(duration_s: float, interval_s: float = 0.005, include_idle: bool = False,
+                  max_stacks: int = 50, max_functions: int = 30) -> dict:
+    """
+    Wall-clock stack sampler: snapshots every thread's Python stack at a fixed interval.
+
+    Unlike cProfile it sees all threads (event loop, to_thread workers, micro-batcher) and
+    costs nothing while it is not running. Returns the hottest functions (self and
+    total sample counts) and the hottest stacks in folded format (flamegraph.pl input).
+    """
+    own_thread = threading.get_ident()
+    stacks = Counter()
+    self_counts = Counter()
+    total_counts = Counter()
+    n_samples = 0
+
+    deadline = time.perf_counter() + duration_s
+    while time.perf_counter() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread or (not include_idle and _is_idle(frame)):
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.reverse()  # outermost first
+
+            n_samples += 1
+            stacks[";".join(labels)] += 1
+            self_counts[labels[-1]] += 1
+            total_counts.update(set(labels))
+        time.sleep(interval_s)
+
+    def share(count):
+        return round(100.0 * count / n_samples, 2) if n_samples else 0.0
+
+    return {
+        "duration_s": duration_s,
+        "interval_ms": interval_s * 1000,
+        "samples": n_samples,
+        "top_functions": [
+            {"function": function, "self_samples": self_counts[function],
+             "total_samples": count, "self_pct": share(self_counts[function]),
+             "total_pct": share(count)}
+            for function, count in total_counts.most_common(max_functions)
+        ],
+        "stacks": dict(stacks.most_common(max_stacks)),
+    }
@@ -1,23 +1,66 @@
 # api/schema.py
 
-from pydantic import BaseModel, Field
+from contextvars import ContextVar
+from typing import Annotated, Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel, Field, model_validator
+from src.config import MAX_BATCH_SIZE
+from src.inference import stage_timer
+
+# Set while a batch request is validated, so its nested records are not timed one by one
+_IN_BATCH_VALIDATION = ContextVar("in_batch_validation", default=False)
+
+# Accepted (inclusive) range of every feature: loose plausibility bounds that also admit
+# the 0-based codings of cp/slope/thal used by other copies of the dataset
+FEATURE_RANGES = {
+    'age': (1, 120), 'sex': (0, 1), 'cp': (0, 4), 'trestbps': (50, 300), 'chol': (50, 1000),
+    'fbs': (0, 1), 'restecg': (0, 2), 'thalach': (30, 250), 'exang': (0, 1),
+    'oldpeak': (-5.0, 10.0), 'slope': (0, 3), 'ca': (0, 4), 'thal': (0, 7),
+}
+
+
+def _bounds(feature: str) -> dict:
+    low, high = FEATURE_RANGES[feature]
+    return {"ge": low, "le": high}
 
 
 # Input Schema for the /predict endpoint
 class HeartDiseaseFeatures(BaseModel):
-    age: int = Field(..., description="Age in years (e.g., 63)")
-    sex: int = Field(..., description="Sex (1 = male; 0 = female)")
-    cp: int = Field(..., description="Chest pain type (1-4, where 4 is asymptomatic)")
-    trestbps: int = Field(..., description="Resting blood pressure (mm Hg)")
-    chol: int = Field(..., description="Serum cholesterol (mg/dl)")
-    fbs: int = Field(..., description="Fasting blood sugar > 120 mg/dl (1=true; 0=false)")
-    restecg: int = Field(..., description="Resting electrocardiographic results (0-2)")
-    thalach: int = Field(..., description="Maximum heart rate achieved")
-    exang: int = Field(..., description="Exercise induced angina (1=yes; 0=no)")
-    oldpeak: float = Field(..., description="ST depression induced by exercise relative to rest")
-    slope: int = Field(..., description="The slope of the peak exercise ST segment (1-3)")
-    ca: int = Field(..., description="Number of major vessels (0-3) colored by fluoroscopy")
-    thal: int = Field(..., description="Thalium stress test result (3=normal; 6=fixed defect; 7=reversible defect)")
+    age: int = Field(..., description="Age in years (e.g., 63)",
+                     **_bounds("age"))
+    sex: int = Field(..., description="Sex (1 = male; 0 = female)",
+                     **_bounds("sex"))
+    cp: int = Field(..., description="Chest pain type (1-4, where 4 is asymptomatic)",
+                    **_bounds("cp"))
+    trestbps: int = Field(..., description="Resting blood pressure (mm Hg)",
+                          **_bounds("trestbps"))
+    chol: int = Field(..., description="Serum cholesterol (mg/dl)",
+                      **_bounds("chol"))
+    fbs: int = Field(..., description="Fasting blood sugar > 120 mg/dl (1=true; 0=false)",
+                     **_bounds("fbs"))
+    restecg: int = Field(..., description="Resting electrocardiographic results (0-2)",
+                         **_bounds("restecg"))
+    thalach: int = Field(..., description="Maximum heart rate achieved",
+                         **_bounds("thalach"))
+    exang: int = Field(..., description="Exercise induced angina (1=yes; 0=no)",
+                       **_bounds("exang"))
+    oldpeak: float = Field(..., description="ST depression induced by exercise relative to rest",
+                           **_bounds("oldpeak"))
+    slope: int = Field(..., description="The slope of the peak exercise ST segment (1-3)",
+                       **_bounds("slope"))
+    ca: int = Field(..., description="Number of major vessels (0-3) colored by fluoroscopy",
+                    **_bounds("ca"))
+    thal: int = Field(..., description="Thalium stress test result (3=normal; 6=fixed defect; 7=reversible defect)",
+                      **_bounds("thal"))
+
+    @model_validator(mode="wrap")
+    @classmethod
+    def time_validation(cls, data, handler):
+        if _IN_BATCH_VALIDATION.get():
+            return handler(data)
+        with stage_timer("validation"):
+            return handler(data)
 
     model_config = {
         "json_schema_extra": {
@@ -36,4 +79,97 @@ class HeartDiseaseFeatures(BaseModel):
 class PredictionResponse(BaseModel):
     prediction: int = Field(..., description="The predicted class (1 for heart disease, 0 for no heart disease)")
     probability: float = Field(..., description="The probability of heart disease presence (class 1)")
-    message: str
\ No newline at end of file
+    message: str
+
+
+# Batch lists are capped in the schema: pydantic rejects an oversized list as soon as it
+# has counted past the limit, before validating the rest of its items (a 413 in api/main.py)
+_IntColumn = Annotated[List[int], Field(max_length=MAX_BATCH_SIZE)]
+_FloatColumn = Annotated[List[float], Field(max_length=MAX_BATCH_SIZE)]
+
+
+# Columnar input for the /predict/batch endpoint: one equally sized array per feature
+class HeartDiseaseColumns(BaseModel):
+    age: _IntColumn
+    sex: _IntColumn
+    cp: _IntColumn
+    trestbps: _IntColumn
+    chol: _IntColumn
+    fbs: _IntColumn
+    restecg: _IntColumn
+    thalach: _IntColumn
+    exang: _IntColumn
+    oldpeak: _FloatColumn
+    slope: _IntColumn
+    ca: _IntColumn
+    thal: _IntColumn
+
+    @model_validator(mode="after")
+    def check_equal_lengths(self):
+        columns = self.model_dump()
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("All feature columns must have the same length")
+        invalid = invalid_features(columns)
+        if invalid:
+            raise ValueError(f"Values out of range for: {', '.join(invalid)}")
+        return self
+
+    def __len__(self):
+        return len(self.age)
+
+
+INTEGER_FEATURES = [name for name, field in HeartDiseaseFeatures.model_fields.items()
+                    if field.annotation is int]
+
+
+def invalid_features(columns: Dict[str, np.ndarray]) -> List[str]:
+    """
+    Names of the features with a value outside FEATURE_RANGES (or a fractional value for
+    an integer feature). One vectorized comparison per column, so large decoded batches
+    are validated without a Python object per value; NaN is always out of range.
+    """
+    invalid = []
+    for feature, (low, high) in FEATURE_RANGES.items():
+        values = np.asarray(columns[feature], dtype=np.float64)
+        valid = (values >= low) & (values <= high)
+        if feature in INTEGER_FEATURES:
+            valid &= values == np.round(values)
+        if not valid.all():
+            invalid.append(feature)
+    return invalid
+
+
+# Input Schema for the /predict/batch endpoint (either `records` or `columns`)
+class BatchPredictionRequest(BaseModel):
+    records: Optional[List[HeartDiseaseFeatures]] = Field(
+        None, max_length=MAX_BATCH_SIZE,
+        description="Row-oriented batch: one feature object per patient")
+    columns: Optional[HeartDiseaseColumns] = Field(
+        None, description="Column-oriented batch: one array per feature")
+
+    @model_validator(mode="wrap")
+    @classmethod
+    def time_validation(cls, data, handler):
+        token = _IN_BATCH_VALIDATION.set(True)
+        try:
+            with stage_timer("batch_validation"):
+                return handler(data)
+        finally:
+            _IN_BATCH_VALIDATION.reset(token)
+
+    @model_validator(mode="after")
+    def check_exactly_one_layout(self):
+        if (self.records is None) == (self.columns is None):
+            raise ValueError("Provide exactly one of 'records' or 'columns'")
+        return self
+
+    def __len__(self):
+        return len(self.records) if self.records is not None else len(self.columns)
+
+
+# Output Schema for the /predict/batch endpoint
+class BatchPredictionResponse(BaseModel):
+    predictions: List[PredictionResponse] = Field(
+        ..., description="One prediction per input row, in input order")
+    count: int
@@ -0,0 +1,83 @@
+# api/shadow.py
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Union
+
+from src.inference import LoadedModel, predict_heart_disease_batch
+from api.metrics import (
+    SHADOW_PREDICTIONS, SHADOW_PROBABILITY_DELTA, SHADOW_LATENCY, SHADOW_BATCHES_DROPPED
+)
+
+
+def _lower_thread_priority():
+    # Linux schedules threads individually: a higher nice value keeps shadow work behind
+    # the request threads whenever the CPU is contended
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+    except (AttributeError, OSError):
+        pass
+
+
+class ShadowScorer:
+    """
+    Scores served traffic with challenger models, off the critical path.
+
+    `submit` only hands the batch to a small thread pool and returns; the response never
+    waits for a challenger. At most `max_pending` batches are queued or running: beyond
+    that new batches are dropped (and counted) instead of building an unbounded backlog.
+    Each challenger's latency and its agreement with the served predictions go to
+    /metrics, labelled by challenger name.
+    """
+
+    def __init__(self, challengers: Dict[str, LoadedModel], max_workers: int = 1,
+                 max_pending: int = 2):
+        self.challengers = challengers
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers),
+                                            thread_name_prefix="shadow",
+                                            initializer=_lower_thread_priority)
+
+    def submit(self, input_data, served_results: Union[List[Dict], Callable[[], List[Dict]]]):
+        """
+        Queues the challengers' scoring of a batch the served model already scored.
+
+        `served_results` can also be a callable building them, so the conversion of array
+        results runs in the pool rather than on the request path.
+        """
+        if not self._slots.acquire(blocking=False):
+            SHADOW_BATCHES_DROPPED.inc()
+            return
+        try:
+            future = self._executor.submit(self._score, input_data, served_results)
+        except RuntimeError:  # shut down
+            self._slots.release()
+            return
+        future.add_done_callback(lambda _: self._slots.release())
+
+    def _score(self, input_data, served_results):
+        if callable(served_results):
+            served_results = served_results()
+        for name, model in self.challengers.items():
+            try:
+                start = time.perf_counter()
+                results = predict_heart_disease_batch(input_data, model=model)
+                SHADOW_LATENCY.labels(name).observe(time.perf_counter() - start)
+            except Exception as e:
+                # A broken challenger must never affect serving
+                print(f"Shadow scoring with '{name}' failed: {e}")
+                continue
+
+            agree = sum(result['prediction'] == served['prediction']
+                        for result, served in zip(results, served_results))
+            SHADOW_PREDICTIONS.labels(name, "agree").inc(agree)
+            SHADOW_PREDICTIONS.labels(name, "disagree").inc(len(results) - agree)
+            for result, served in zip(results, served_results):
+                SHADOW_PROBABILITY_DELTA.labels(name).observe(
+                    abs(result['probability'] - served['probability']))
+
+    def close(self, wait: bool = False):
+        """Stops the pool; queued shadow work is discarded unless `wait` is set."""
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,50 @@
+# benchmarks/bench_evaluation.py
+#
+# Bootstrap confidence intervals: a Python loop of sklearn metric calls per resample vs.
+# the vectorized src.evaluation.bootstrap_metrics:
+#   python -m benchmarks.bench_evaluation --rows 60 1000 --resamples 2000
+
+import argparse
+import time
+import numpy as np
+from src.evaluation import bootstrap_metrics, threshold_sweep
+from src.utils import get_metrics
+
+
+def loop_bootstrap(y_true, y_prob, n_resamples: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    results = []
+    for _ in range(n_resamples):
+        indices = rng.integers(0, len(y_true), len(y_true))
+        y, p = y_true[indices], y_prob[indices]
+        if y.min() != y.max():
+            results.append(get_metrics(y, (p > 0.5).astype(int), p))
+    return results
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bootstrap evaluation.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[60, 1000])
+    parser.add_argument("--resamples", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>7}{'sklearn loop':>15}{'vectorized':>13}{'speedup':>9}{'sweep':>11}")
+    for n_rows in args.rows:
+        y_true = rng.integers(0, 2, n_rows)
+        y_prob = np.clip(y_true * 0.3 + rng.uniform(size=n_rows) * 0.7, 0, 1)
+        loop_s = timed(loop_bootstrap, y_true, y_prob, args.resamples)
+        vectorized_s = timed(bootstrap_metrics, y_true, y_prob, args.resamples)
+        sweep_s = timed(threshold_sweep, y_true, y_prob, np.linspace(0, 1, 1001))
+        print(f"{n_rows:>7}{loop_s:>14.2f}s{vectorized_s * 1e3:>10.1f}ms"
+              f"{loop_s / vectorized_s:>8.0f}x{sweep_s * 1e3:>9.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
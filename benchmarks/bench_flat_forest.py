@@ -0,0 +1,58 @@
+# benchmarks/bench_flat_forest.py
+
+import argparse
+import time
+import numpy as np
+from src.config import MODEL_PATH
+from src.inference import load_model_pipeline, build_fast_encoder, build_flat_forest
+
+BATCH_SIZES = [1, 64, 4096]
+
+
+def time_call(fn, X, repeats: int) -> float:
+    """Returns the best-of-N wall time of fn(X) in milliseconds."""
+    fn(X)  # warm-up
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def synthetic_rows(encoder, n_rows: int, rng) -> np.ndarray:
+    """Draws plausible raw records and encodes them with the fitted preprocessor."""
+    columns = {}
+    for _, features, mean, scale in encoder.numerical_blocks:
+        for feature, mu, sigma in zip(features, mean, scale):
+            columns[feature] = rng.normal(mu, sigma, n_rows)
+    for feature, categories, _ in encoder.categorical_blocks:
+        columns[feature] = rng.choice(categories, n_rows)
+    return encoder.encode_columns(columns)
+
+
+def run_benchmark(repeats: int):
+    pipeline = load_model_pipeline(MODEL_PATH)
+    encoder = build_fast_encoder(pipeline)
+    forest = build_flat_forest(pipeline)
+    if encoder is None or forest is None:
+        raise SystemExit("The saved model is not a tree ensemble pipeline; nothing to compare.")
+
+    classifier = pipeline[-1]
+    rng = np.random.default_rng(0)
+
+    print(f"Forest: {forest.n_trees} trees, depth {forest.depth}")
+    print(f"{'batch':>6} | {'sklearn ms':>11} | {'flat ms':>9} | {'speedup':>7} | max abs diff")
+    for batch_size in BATCH_SIZES:
+        X = synthetic_rows(encoder, batch_size, rng)
+        sklearn_ms = time_call(classifier.predict_proba, X, repeats)
+        flat_ms = time_call(forest.predict_proba, X, repeats)
+        diff = np.abs(classifier.predict_proba(X) - forest.predict_proba(X)).max()
+        print(f"{batch_size:>6} | {sklearn_ms:>11.3f} | {flat_ms:>9.3f} | "
+              f"{sklearn_ms / flat_ms:>6.1f}x | {diff:.2e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare sklearn and flat forest latency.")
+    parser.add_argument("--repeats", type=int, default=20)
+    run_benchmark(parser.parse_args().repeats)
@@ -0,0 +1,66 @@
+# benchmarks/bench_incremental.py
+#
+# Incremental updates vs. a full retrain on the same rows: wall time and test metrics.
+# The Cleveland training split is bootstrapped up to --rows, so timings are meaningful;
+# the test split stays the real held-out data.
+#   python -m benchmarks.bench_incremental --rows 200000 --updates 5
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from src.config import RAW_DATA_PATH, RANDOM_STATE
+from src.preprocess import preprocess_and_split, build_preprocessor
+from src.incremental import init_state, update_state, evaluate_state
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+LABELS = {"Random Forest": "RF", "SGD Classifier": "SGD"}
+
+
+def format_metrics(metrics: dict) -> str:
+    return " ".join(f"{LABELS[name]}: auc {m['roc_auc']:.3f} acc {m['accuracy']:.3f}"
+                    for name, m in metrics.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark incremental retraining.")
+    parser.add_argument("--rows", type=int, default=200_000, help="Training rows in total")
+    parser.add_argument("--updates", type=int, default=5, help="Number of incremental batches")
+    parser.add_argument("--initial-fraction", type=float, default=0.5)
+    args = parser.parse_args()
+
+    X_train, X_test, y_train, y_test, _ = preprocess_and_split(pd.read_csv(RAW_DATA_PATH))
+    rng = np.random.default_rng(RANDOM_STATE)
+    rows = rng.integers(0, len(X_train), args.rows)
+    X_pool = X_train.iloc[rows].reset_index(drop=True)
+    y_pool = y_train.iloc[rows].reset_index(drop=True)
+
+    n_initial = int(args.rows * args.initial_fraction)
+    boundaries = np.linspace(n_initial, args.rows, args.updates + 1).astype(int)
+
+    def full_retrain(n_rows):
+        X, y = X_pool.iloc[:n_rows], y_pool.iloc[:n_rows]
+        return init_state(X, y, X_test, y_test, build_preprocessor().fit(X))
+
+    state, seconds = timed(full_retrain, n_initial)
+    print(f"Initial fit on {n_initial} rows: {seconds:.2f}s | "
+          f"{format_metrics(evaluate_state(state))}")
+
+    for start, stop in zip(boundaries[:-1], boundaries[1:]):
+        summary, update_seconds = timed(update_state, state,
+                                        X_pool.iloc[start:stop], y_pool.iloc[start:stop])
+        retrained, retrain_seconds = timed(full_retrain, stop)
+        print(f"\n+{stop - start} rows (total {stop}, {summary['n_trees']} trees)")
+        print(f"  incremental  {update_seconds:7.2f}s | {format_metrics(evaluate_state(state))}")
+        print(f"  full retrain {retrain_seconds:7.2f}s | "
+              f"{format_metrics(evaluate_state(retrained))}")
+
+
+if __name__ == "__main__":
+    main()
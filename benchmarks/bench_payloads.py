@@ -0,0 +1,110 @@
+# benchmarks/bench_payloads.py
+#
+# JSON vs. binary request bodies (api/binary.py), in-process through the ASGI app:
+#   python -m benchmarks.bench_payloads --batch-sizes 1 100 1000
+#
+# Reports the decode + validation time alone and the full request time per format.
+# The prediction cache is disabled, so every request really scores its rows.
+
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault("PREDICTION_CACHE_SIZE", "0")
+os.environ.setdefault("SHADOW_ENABLED", "false")
+os.environ.setdefault("DRIFT_MONITOR_ENABLED", "false")
+os.environ.setdefault("AUDIT_LOG_ENABLED", "false")
+
+import numpy as np  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from api.binary import FEATURE_NAMES, decode_columns, decode_record  # noqa: E402
+from api.schema import BatchPredictionRequest, HeartDiseaseFeatures  # noqa: E402
+from benchmarks.load_test import synthetic_records  # noqa: E402
+
+
+def encode_bodies(records: list) -> dict:
+    """Request bodies of every available format: {name: (path, content type, bytes)}."""
+    single = len(records) == 1
+    path = "/predict" if single else "/predict/batch"
+    matrix = np.array([[record[name] for name in FEATURE_NAMES] for record in records],
+                      dtype='<f4')
+    columns = {name: [record[name] for record in records] for name in FEATURE_NAMES}
+    bodies = {
+        "json": (path, "application/json",
+                 json.dumps(records[0] if single else {"records": records}).encode()),
+        "float32": (path, "application/x-float32", matrix.tobytes()),
+    }
+    if not single:
+        bodies["json-columns"] = (path, "application/json",
+                                  json.dumps({"columns": columns}).encode())
+    try:
+        import pyarrow as pa
+        if not single:
+            table = pa.table({name: matrix[:, i] for i, name in enumerate(FEATURE_NAMES)})
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            bodies["arrow"] = (path, "application/vnd.apache.arrow.stream",
+                               sink.getvalue().to_pybytes())
+    except ImportError:
+        pass
+    try:
+        import msgpack
+        bodies["msgpack"] = (path, "application/msgpack",
+                             msgpack.packb(records[0] if single else columns))
+    except ImportError:
+        pass
+    return bodies
+
+
+def decode_only(name: str, path: str, content_type: str, body: bytes):
+    # What the endpoint does before scoring: parse + validate
+    if content_type == "application/json":
+        model = HeartDiseaseFeatures if path == "/predict" else BatchPredictionRequest
+        return model.model_validate_json(body)
+    return decode_record(body, content_type) if path == "/predict" \
+        else decode_columns(body, content_type)
+
+
+def best_of(fn, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON vs. binary payloads.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--requests", type=int, default=50,
+                        help="Requests per timing (best of --repeats)")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    from api.main import app
+
+    with TestClient(app) as client:
+        print(f"{'rows':>6}  {'format':<13}{'bytes':>9}{'decode+validate':>18}{'request':>12}"
+              f"{'per row':>11}")
+        for n_rows in args.batch_sizes:
+            bodies = encode_bodies(synthetic_records(n_rows))
+            for name, (path, content_type, body) in bodies.items():
+                headers = {"Content-Type": content_type}
+                response = client.post(path, content=body, headers=headers)
+                response.raise_for_status()
+
+                decode_s = best_of(lambda: [decode_only(name, path, content_type, body)
+                                            for _ in range(args.requests)],
+                                   args.repeats) / args.requests
+                request_s = best_of(lambda: [client.post(path, content=body, headers=headers)
+                                             for _ in range(args.requests)],
+                                    args.repeats) / args.requests
+                print(f"{n_rows:>6}  {name:<13}{len(body):>9}{decode_s * 1e3:>15.3f} ms"
+                      f"{request_s * 1e3:>9.3f} ms{request_s / n_rows * 1e6:>8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/bench_startup.py
+#
+# Cold-start time of a serving replica: imports, model load and first prediction,
+# each measured in a fresh interpreter (best of --repeats).
+#
+#   python -m benchmarks.bench_startup
+#   python -m benchmarks.bench_startup --backend flat   # serving bundle, no sklearn import
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+# Runs in the child process; prints the phase timings as JSON
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import fastapi, prometheus_fastapi_instrumentator
+import src.inference as inference
+import api.schema, api.metrics, api.batching, api.audit
+imported = time.perf_counter()
+model = inference.get_active_model()
+loaded = time.perf_counter()
+import api.main
+app_built = time.perf_counter()
+with open("tests/sample_input.json") as f:
+    record = json.load(f)[0]["input"]
+inference.predict_heart_disease(record)
+predicted = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "model_load_s": loaded - imported,
+    "app_s": app_built - loaded,
+    "first_prediction_s": predicted - app_built,
+    "total_s": predicted - start,
+    "served_from_bundle": model._pipeline is None,
+    "heavy_modules": [m for m in ("pandas", "sklearn", "scipy", "mlflow", "src.train")
+                      if m in sys.modules],
+}))
+"""
+
+
+def measure_startup(backend: str) -> dict:
+    env = dict(os.environ, INFERENCE_BACKEND=backend, MODEL_RELOAD_INTERVAL_S="0",
+               AUDIT_LOG_ENABLED="false")
+    result = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=PROJECT_ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure serving cold-start time.")
+    parser.add_argument("--backend", choices=["sklearn", "flat", "both"], default="both")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    backends = ["sklearn", "flat"] if args.backend == "both" else [args.backend]
+    for backend in backends:
+        runs = [measure_startup(backend) for _ in range(args.repeats)]
+        best = min(runs, key=lambda run: run["total_s"])
+        print(f"{backend:>8}: total {best['total_s'] * 1000:7.1f} ms "
+              f"(imports {best['import_s'] * 1000:6.1f}, "
+              f"model load {best['model_load_s'] * 1000:6.1f}, "
+              f"app {best['app_s'] * 1000:6.1f}, "
+              f"first prediction {best['first_prediction_s'] * 1000:5.1f}) "
+              f"bundle={best['served_from_bundle']} heavy={best['heavy_modules']}")
+
+
+if __name__ == "__main__":
+    main()
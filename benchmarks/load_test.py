@@ -0,0 +1,296 @@
+# benchmarks/load_test.py
+#
+# Reproducible load test for the prediction API. Starts `api.main:app` locally (or targets
+# --url), drives it at a fixed concurrency (closed loop) or request rate (open loop), and
+# reports latency percentiles, throughput and error rate as JSON.
+#
+#   python -m benchmarks.load_test --concurrency 16 --duration 20
+#   python -m benchmarks.load_test --rate 200 --payload replay --replay-file logs/requests.jsonl
+#   python -m benchmarks.load_test --endpoint /predict/batch --batch-size 64
+#   python -m benchmarks.load_test --baseline benchmarks/baselines/predict.json
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+import httpx
+import numpy as np
+from api.schema import HeartDiseaseFeatures
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SAMPLE_INPUT_PATH = PROJECT_ROOT / 'tests' / 'sample_input.json'
+
+# Plausible value ranges for synthetic records (inclusive), per HeartDiseaseFeatures field
+SYNTHETIC_RANGES = {
+    'age': (29, 77), 'sex': (0, 1), 'cp': (1, 4), 'trestbps': (94, 200), 'chol': (126, 564),
+    'fbs': (0, 1), 'restecg': (0, 2), 'thalach': (71, 202), 'exang': (0, 1),
+    'oldpeak': (0.0, 6.2), 'slope': (1, 3), 'ca': (0, 3), 'thal': (3, 7),
+}
+
+
+def synthetic_records(n: int, seed: int = 0) -> list:
+    """Generates random records with the field names and types of HeartDiseaseFeatures."""
+    rng = random.Random(seed)
+    records = []
+    for _ in range(n):
+        record = {}
+        for name, field in HeartDiseaseFeatures.model_fields.items():
+            low, high = SYNTHETIC_RANGES[name]
+            record[name] = round(rng.uniform(low, high), 1) if field.annotation is float \
+                else rng.randint(low, high)
+        records.append(record)
+    return records
+
+
+def load_payloads(source: str, replay_file: Path = None, n_synthetic: int = 1000) -> list:
+    """Returns the list of /predict bodies to cycle through."""
+    if source == "sample":
+        with open(SAMPLE_INPUT_PATH) as f:
+            return [sample['input'] for sample in json.load(f)]
+    if source == "synthetic":
+        return synthetic_records(n_synthetic)
+    if source == "replay":
+        # Captured audit log (logs/requests.jsonl): one {"input": {...}, ...} object per line
+        with open(replay_file) as f:
+            return [json.loads(line)['input'] for line in f if line.strip()]
+    raise ValueError(f"Unknown payload source: {source}")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_local_server(port: int, workers: int) -> subprocess.Popen:
+    """Starts uvicorn with api.main:app and waits until /health answers."""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("The API server exited during startup.")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("The API server did not become healthy within 60s.")
+
+
+class LoadGenerator:
+    """
+    Sends requests and records their latencies and failures.
+
+    `latencies` and `errors` only cover requests that were sent. Open-loop arrivals that
+    find every in-flight slot taken are never sent: they are counted in `dropped` alone,
+    so an overloaded run cannot report better percentiles than it had.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, endpoint: str, payloads: list,
+                 batch_size: int):
+        self.client = client
+        self.endpoint = endpoint
+        self.payloads = payloads
+        self.batch_size = batch_size
+        self.latencies = []
+        self.errors = 0
+        self.dropped = 0
+        self._next = 0
+
+    def _body(self):
+        if self.endpoint == "/predict/batch":
+            records = [self.payloads[(self._next + i) % len(self.payloads)]
+                       for i in range(self.batch_size)]
+            self._next += self.batch_size
+            return {"records": records}
+        body = self.payloads[self._next % len(self.payloads)]
+        self._next += 1
+        return body
+
+    async def send_one(self):
+        body = self._body()
+        start = time.perf_counter()
+        try:
+            response = await self.client.post(self.endpoint, json=body)
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        self.latencies.append(time.perf_counter() - start)
+        if not ok:
+            self.errors += 1
+
+    async def closed_loop(self, concurrency: int, deadline: float):
+        async def worker():
+            while time.perf_counter() < deadline:
+                await self.send_one()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    async def open_loop(self, rate: float, concurrency: int, deadline: float):
+        # Fixed-rate arrivals; `concurrency` caps outstanding requests (excess are dropped)
+        in_flight = asyncio.Semaphore(concurrency)
+        tasks = []
+
+        async def fire():
+            async with in_flight:
+                await self.send_one()
+
+        next_send = time.perf_counter()
+        while next_send < deadline:
+            await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+            if in_flight.locked():
+                self.dropped += 1
+            else:
+                tasks.append(asyncio.create_task(fire()))
+            next_send += 1.0 / rate
+        await asyncio.gather(*tasks)
+
+
+def summarize(generator: LoadGenerator, elapsed: float, config: dict) -> dict:
+    """
+    The JSON report of a run.
+
+    "requests", "errors", "error_rate" and the latencies cover the requests actually sent;
+    client-side drops (open loop only) are reported as "dropped", with "drop_rate" as a
+    share of all scheduled arrivals (sent + dropped).
+    """
+    latencies_ms = np.array(generator.latencies) * 1000
+    n = len(latencies_ms)
+    scheduled = n + generator.dropped
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99]) if n else (0.0, 0.0, 0.0)
+    rows = config["batch_size"] if config["endpoint"] == "/predict/batch" else 1
+    return {
+        "config": config,
+        "requests": n,
+        "errors": generator.errors,
+        "error_rate": generator.errors / n if n else 0.0,
+        "dropped": generator.dropped,
+        "drop_rate": generator.dropped / scheduled if scheduled else 0.0,
+        "throughput_rps": n / elapsed,
+        "rows_per_second": n * rows / elapsed,
+        "latency_ms": {
+            "p50": float(p50), "p95": float(p95), "p99": float(p99),
+            "mean": float(latencies_ms.mean()) if n else 0.0,
+            "max": float(latencies_ms.max()) if n else 0.0,
+        },
+    }
+
+
+def compare_to_baseline(result: dict, baseline: dict, tolerance: float) -> list:
+    """Returns a list of regressions (empty when within tolerance of the baseline)."""
+    # Only runs with the same load shape are comparable (duration may differ)
+    mismatched = [key for key in ("endpoint", "payload", "concurrency", "rate", "batch_size")
+                  if result["config"][key] != baseline["config"][key]]
+    if mismatched:
+        raise ValueError(f"Baseline was recorded with a different {', '.join(mismatched)}; "
+                         f"rerun with the baseline's settings or --update-baseline.")
+    regressions = []
+    for percentile in ("p50", "p95", "p99"):
+        limit = baseline["latency_ms"][percentile] * (1 + tolerance)
+        if result["latency_ms"][percentile] > limit:
+            regressions.append(f"{percentile} {result['latency_ms'][percentile]:.2f} ms "
+                               f"> {limit:.2f} ms")
+    min_throughput = baseline["throughput_rps"] * (1 - tolerance)
+    if result["throughput_rps"] < min_throughput:
+        regressions.append(f"throughput {result['throughput_rps']:.1f} rps "
+                           f"< {min_throughput:.1f} rps")
+    max_error_rate = baseline["error_rate"] + 0.01
+    if result["error_rate"] > max_error_rate:
+        regressions.append(f"error rate {result['error_rate']:.3f} > {max_error_rate:.3f}")
+    max_drop_rate = baseline.get("drop_rate", 0.0) + 0.01
+    if result["drop_rate"] > max_drop_rate:
+        regressions.append(f"drop rate {result['drop_rate']:.3f} > {max_drop_rate:.3f}")
+    return regressions
+
+
+async def run_load(url: str, args, payloads: list) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency,
+                          max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        generator = LoadGenerator(client, args.endpoint, payloads, args.batch_size)
+
+        # Warm-up requests are not recorded
+        for _ in range(min(20, len(payloads))):
+            await generator.send_one()
+        generator.latencies.clear()
+        generator.errors = 0
+        generator.dropped = 0
+
+        start = time.perf_counter()
+        deadline = start + args.duration
+        if args.rate:
+            await generator.open_loop(args.rate, args.concurrency, deadline)
+        else:
+            await generator.closed_loop(args.concurrency, deadline)
+        elapsed = time.perf_counter() - start
+
+    config = {key: getattr(args, key) for key in
+              ("endpoint", "payload", "concurrency", "rate", "duration", "batch_size")}
+    return summarize(generator, elapsed, config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the prediction API.")
+    parser.add_argument("--url", help="Target a running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (local server)")
+    parser.add_argument("--endpoint", default="/predict", choices=["/predict", "/predict/batch"])
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--payload", default="synthetic", choices=["sample", "synthetic", "replay"])
+    parser.add_argument("--replay-file", type=Path)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="Open-loop requests/second (0 = closed loop at --concurrency)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of measured load")
+    parser.add_argument("--output", type=Path, help="Write the JSON report to this file")
+    parser.add_argument("--baseline", type=Path, help="Fail when results regress past this")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative regression vs. the baseline")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Store this run as the new --baseline")
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.payload, args.replay_file)
+    server = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        server = start_local_server(port, args.workers)
+        url = f"http://127.0.0.1:{port}"
+
+    try:
+        result = asyncio.run(run_load(url, args, payloads))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report = json.dumps(result, indent=2)
+    print(report)
+    if args.output:
+        args.output.write_text(report + "\n")
+
+    if args.baseline and args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(report + "\n")
+        print(f"Baseline updated: {args.baseline}")
+    elif args.baseline:
+        regressions = compare_to_baseline(result, json.loads(args.baseline.read_text()),
+                                          args.tolerance)
+        if regressions:
+            print("REGRESSION vs. baseline: " + "; ".join(regressions))
+            sys.exit(1)
+        print(f"Within {args.tolerance:.0%} of baseline {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
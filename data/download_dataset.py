@@ -1,25 +1,42 @@
 # data/download_dataset.py
 
+import argparse
+import hashlib
+import os
 import pandas as pd
 import requests
 from io import StringIO
 from pathlib import Path
+from urllib.parse import urlparse
 from src.config import RAW_DATA_PATH, DATA_DOWNLOAD_URL, DATA_RAW_DIR, COLUMN_NAMES
 from src.utils import create_dirs
+from src.dataset_store import resolve_source, file_sha256
+
+
+def fetch_raw_text(source: str) -> str:
+    """Returns the raw UCI file from an http(s) URL, a local path or a file:// URL."""
+    if urlparse(source).scheme in ('http', 'https'):
+        response = requests.get(source)
+        response.raise_for_status()
+        return response.text
+    # Local sources make offline runs (CI, air-gapped training nodes) possible
+    return resolve_source(source).read_text()
 
 
 def download_data(url: str, output_path: Path):
-    """Downloads the raw UCI data, applies headers, and saves it as CSV."""
+    """
+    Downloads the raw UCI data, applies headers, and saves it as CSV.
+
+    The file is only rewritten when its content changed, so an unchanged dataset keeps
+    its checksum and modification time and the dataset store reuses its parsed arrays.
+    """
 
     create_dirs([DATA_RAW_DIR])
     print(f"Attempting to download data from: {url}")
 
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-
         # 1. Read the raw data (which lacks headers)
-        data = StringIO(response.text)
+        data = StringIO(fetch_raw_text(url))
 
         # Load data, specifying no header, and marking '?' as missing values
         df = pd.read_csv(data, sep=',', header=None, na_values='?')
@@ -29,7 +46,14 @@ def download_data(url: str, output_path: Path):
 
         # 3. Save the structured data (The '?' handling is still done later in preprocess.py,
         # but the headers are crucial here.)
-        df.to_csv(output_path, index=False)
+        content = df.to_csv(index=False).encode()
+        if output_path.exists() and \
+                file_sha256(output_path) == hashlib.sha256(content).hexdigest():
+            print(f"Data unchanged, keeping: {output_path}")
+            return
+        tmp_path = output_path.with_suffix('.tmp')
+        tmp_path.write_bytes(content)
+        os.replace(tmp_path, output_path)
         print(f"Data successfully downloaded and saved to: {output_path}")
         print(f"Dataset shape: {df.shape}")
 
@@ -39,4 +63,8 @@ def download_data(url: str, output_path: Path):
 
 
 if __name__ == "__main__":
-    download_data(DATA_DOWNLOAD_URL, RAW_DATA_PATH)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Fetch the raw UCI heart disease data.")
+    parser.add_argument("--source", default=DATA_DOWNLOAD_URL,
+                        help="http(s) URL, local path or file:// URL of processed.cleveland.data")
+    args = parser.parse_args()
+    download_data(args.source, RAW_DATA_PATH)
@@ -0,0 +1,143 @@
+# src/batch_score.py
+#
+# Offline batch scoring for large CSV/Parquet files:
+#   python -m src.batch_score data/raw/heart.csv scores.csv --chunk-size 100000 --workers 4
+
+import argparse
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import pandas as pd
+from src.config import MODEL_PATH, NUMERICAL_FEATURES, CATEGORICAL_FEATURES
+from src.preprocess import clean_feature_frame
+
+FEATURES = NUMERICAL_FEATURES + CATEGORICAL_FEATURES
+
+
+def read_chunks(input_path: Path, chunk_size: int):
+    """Yields the input file as DataFrames of at most `chunk_size` rows."""
+    if input_path.suffix == '.parquet':
+        import pyarrow.parquet as pq  # optional dependency, only needed for Parquet input
+
+        for batch in pq.ParquetFile(input_path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(input_path, chunksize=chunk_size)
+
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or Parquet file as they arrive."""
+
+    def __init__(self, output_path: Path):
+        self.output_path = output_path
+        self._parquet_writer = None
+        self._started = False
+
+    def write(self, df: pd.DataFrame):
+        if self.output_path.suffix == '.parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.output_path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            df.to_csv(self.output_path, mode='a' if self._started else 'w',
+                      header=not self._started, index=False)
+        self._started = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def _init_worker(model_path: Path):
+    # Each worker process loads the model once and keeps it for all of its chunks
+    from src.inference import get_active_model
+    get_active_model(model_path)
+
+
+def score_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Cleans one chunk like preprocess_and_split and appends prediction columns."""
+    from src.inference import get_active_model
+
+    model = get_active_model()
+    df = clean_feature_frame(chunk, subset=FEATURES)
+    if df.empty:
+        return df.assign(prediction=pd.Series(dtype='int64'),
+                         probability=pd.Series(dtype='float64'))
+
+    # Columns go straight to the vectorized encoder (no per-row Python objects)
+    probabilities = model.predict_proba_batch({f: df[f].to_numpy() for f in FEATURES})
+    classes = model.classes_
+    return df.assign(prediction=classes[probabilities.argmax(axis=1)],
+                     probability=probabilities[:, 1].round(4))
+
+
+def run_batch_scoring(input_path: Path, output_path: Path, chunk_size: int = 100_000,
+                      workers: int = 1, model_path: Path = MODEL_PATH):
+    """
+    Streams `input_path` through the model and writes the scored rows to `output_path`.
+
+    At most `2 * workers` chunks are in flight at any time and results are written in
+    input order as soon as they are ready, so memory stays bounded by the chunk size.
+    """
+    start = time.perf_counter()
+    rows_in = rows_out = 0
+    writer = ChunkWriter(output_path)
+
+    def report(final=False):
+        elapsed = time.perf_counter() - start
+        label = "Done" if final else "Progress"
+        print(f"{label}: {rows_in} rows read, {rows_out} scored, "
+              f"{rows_out / max(elapsed, 1e-9):,.0f} rows/sec")
+
+    try:
+        if workers <= 1:
+            _init_worker(model_path)
+            for chunk in read_chunks(input_path, chunk_size):
+                rows_in += len(chunk)
+                scored = score_chunk(chunk)
+                writer.write(scored)
+                rows_out += len(scored)
+                report()
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(model_path,)) as pool:
+                pending = deque()
+                for chunk in read_chunks(input_path, chunk_size):
+                    rows_in += len(chunk)
+                    pending.append(pool.submit(score_chunk, chunk))
+                    # Back-pressure: stop reading until the oldest chunk is written
+                    while len(pending) >= 2 * workers:
+                        scored = pending.popleft().result()
+                        writer.write(scored)
+                        rows_out += len(scored)
+                        report()
+                while pending:
+                    scored = pending.popleft().result()
+                    writer.write(scored)
+                    rows_out += len(scored)
+                    report()
+    finally:
+        writer.close()
+
+    report(final=True)
+    print(f"Dropped {rows_in - rows_out} rows with missing values. Output: {output_path}")
+    return rows_out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet file of patient records.")
+    parser.add_argument("input_path", type=Path)
+    parser.add_argument("output_path", type=Path)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Scoring processes (the model is loaded once per process)")
+    parser.add_argument("--model-path", type=Path, default=MODEL_PATH)
+    args = parser.parse_args()
+
+    run_batch_scoring(args.input_path, args.output_path, args.chunk_size, args.workers,
+                      args.model_path)
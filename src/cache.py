@@ -0,0 +1,76 @@
+# src/cache.py
+
+import hashlib
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Union
+from src.config import COLUMN_NAMES, TARGET_COLUMN
+
+FEATURE_ORDER = [name for name in COLUMN_NAMES if name != TARGET_COLUMN]
+_PACKER = struct.Struct(f"<{len(FEATURE_ORDER)}d")
+
+
+def make_cache_key(record: Dict[str, Union[int, float]], model_version: str) -> bytes:
+    """
+    Builds a compact 16-byte key from the canonical feature tuple and the model version.
+
+    Features are packed in a fixed order as float64, so `{"age": 63}` and `{"age": 63.0}`
+    (or dictionaries with a different key order) map to the same entry.
+    """
+    packed = _PACKER.pack(*(float(record[name]) for name in FEATURE_ORDER))
+    return hashlib.blake2b(packed + model_version.encode(), digest_size=16).digest()
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with a per-entry TTL for prediction results."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.model_version = None
+        self._entries = OrderedDict()  # key -> (expires_at, result)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def sync_model_version(self, model_version: str):
+        """Drops every entry when a different model artifact has been loaded."""
+        if model_version != self.model_version:
+            with self._lock:
+                if model_version != self.model_version:
+                    if self.model_version is not None:
+                        self.invalidations += 1
+                    self._entries.clear()
+                    self.model_version = model_version
+
+    def get(self, key: bytes) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, key: bytes, result: dict):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, dict(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
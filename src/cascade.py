@@ -0,0 +1,212 @@
+# src/cascade.py
+#
+# Training-time calibration of the cheap-first cascade served by src/inference.py.
+
+import json
+import os
+import time
+from pathlib import Path
+import mlflow
+import numpy as np
+from sklearn.model_selection import StratifiedKFold, cross_val_predict
+from src.config import (
+    MODEL_PATH, CASCADE_CONFIG_PATH, CASCADE_TARGET_AGREEMENT, FAST_INFERENCE,
+    SEARCH_CV_FOLDS, RANDOM_STATE
+)
+from src.utils import get_metrics
+from src.inference import CascadeStage, LoadedModel, file_digest, _columns_to_records
+
+# Agreement targets compared in the training report (the served one is always added)
+REPORT_TARGETS = (0.95, 0.98, 0.99, 1.0)
+
+
+def calibrate_cascade_band(cheap_proba, expensive_pred, target: float = CASCADE_TARGET_AGREEMENT):
+    """
+    Finds the narrowest uncertainty band [low, high] for the cheap model.
+
+    Rows whose cheap positive-class probability `p` falls inside the band are escalated to
+    the expensive model; the others keep the cheap prediction (class 1 iff p > 0.5). The
+    band escalates as few rows as possible while the cascade still agrees with
+    `expensive_pred` on at least `target` of the rows.
+
+    Both sides of the band contribute independently: for every candidate `low` the
+    disagreements below it are counted with cumulative sums over the sorted
+    probabilities, and the smallest `high` that fits the remaining disagreement budget
+    is found with one binary search, so the whole search is O(n log n).
+    """
+    p = np.asarray(cheap_proba, dtype=np.float64)
+    expensive_positive = np.asarray(expensive_pred).astype(bool)
+    n = len(p)
+    budget = int(np.floor((1.0 - target) * n + 1e-9))
+
+    order = np.argsort(p, kind='stable')
+    sorted_p = p[order]
+    positives = np.concatenate([[0], np.cumsum(expensive_positive[order])])
+    negatives = np.arange(n + 1) - positives
+    n_below_half = int(np.searchsorted(sorted_p, 0.5, side='right'))
+
+    # Rows with p < low are kept as class 0: disagreements are expensive positives
+    lows = np.unique(np.append(sorted_p[:n_below_half], 0.5))
+    kept_low = np.searchsorted(sorted_p, lows, side='left')
+    low_disagreements = positives[kept_low]
+    low_escalations = n_below_half - kept_low
+
+    # Rows with p > high are kept as class 1: disagreements are expensive negatives
+    highs = np.unique(np.append(0.5, sorted_p[n_below_half:]))
+    escalated_high = np.searchsorted(sorted_p, highs, side='right')
+    high_disagreements = negatives[n] - negatives[escalated_high]  # non-increasing
+    high_escalations = escalated_high - n_below_half
+
+    remaining = budget - low_disagreements
+    high_index = np.searchsorted(-high_disagreements, -remaining, side='left')
+    feasible = (remaining >= 0) & (high_index < len(highs))
+    high_index = np.minimum(high_index, len(highs) - 1)
+    escalations = np.where(feasible, low_escalations + high_escalations[high_index], n + 1)
+
+    best = int(np.argmin(escalations))
+    low, high = float(lows[best]), float(highs[high_index[best]])
+    disagreements = int(low_disagreements[best] + high_disagreements[high_index[best]])
+    return {
+        "low": low,
+        "high": high,
+        "escalation_rate": float(escalations[best] / n) if n else 0.0,
+        "agreement": 1.0 - disagreements / n if n else 1.0,
+    }
+
+
+def cascade_proba(cheap_proba: np.ndarray, expensive_proba: np.ndarray,
+                  low: float, high: float) -> np.ndarray:
+    """The probabilities the served cascade returns, from both models' full outputs."""
+    escalate = CascadeStage(None, low, high).escalate(cheap_proba)
+    return np.where(escalate[:, None], expensive_proba, cheap_proba)
+
+
+def _mean_record_latency_us(model: LoadedModel, records: list, n_rounds: int = 5) -> float:
+    # Per-request cost on the serving fast path (one record per call, like /predict)
+    model.warm_up()
+    start = time.perf_counter()
+    for _ in range(n_rounds):
+        for record in records:
+            model.predict_proba_record(record, fast=FAST_INFERENCE)
+    return (time.perf_counter() - start) / (n_rounds * len(records)) * 1e6
+
+
+def out_of_fold_predictions(served_pipeline, cheap_pipeline, X_train, y_train,
+                            n_folds: int = SEARCH_CV_FOLDS):
+    """
+    Cheap positive-class probabilities and served predictions for the training rows, each
+    from clones fitted on the other folds.
+
+    In-sample predictions of the fitted models are overconfident (the forest nearly
+    memorizes its training rows), so a band calibrated on them is far too narrow for
+    unseen traffic.
+    """
+    folds = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=RANDOM_STATE)
+    cheap_proba = cross_val_predict(cheap_pipeline, X_train, y_train, cv=folds,
+                                    method='predict_proba')[:, 1]
+    served_pred = cross_val_predict(served_pipeline, X_train, y_train, cv=folds,
+                                    method='predict')
+    return cheap_proba, served_pred
+
+
+def build_cascade_report(served_pipeline, cheap_pipeline, X_train, y_train, X_test, y_test,
+                         targets=REPORT_TARGETS, served_version: str = None) -> dict:
+    """
+    Calibrates a band per agreement target on out-of-fold predictions over the training
+    split and reports the accuracy/latency trade-off of each one on the test split, next
+    to both single models. `target_met` tells whether the test agreement reached the target.
+    """
+    served = LoadedModel(served_pipeline, MODEL_PATH, served_version or "in-memory", None)
+    cheap = LoadedModel(cheap_pipeline, MODEL_PATH, "cascade-cheap", None)
+    train_cheap, train_served = out_of_fold_predictions(served_pipeline, cheap_pipeline,
+                                                        X_train, y_train)
+    test_cheap = cheap_pipeline.predict_proba(X_test)
+    test_served = served_pipeline.predict_proba(X_test)
+    classes = served_pipeline.classes_
+    records = _columns_to_records({name: X_test[name].tolist() for name in X_test.columns})
+
+    def evaluate(probabilities, model):
+        metrics = get_metrics(y_test, classes[np.argmax(probabilities, axis=1)],
+                              probabilities[:, 1])
+        metrics["agreement"] = float(np.mean(np.argmax(probabilities, axis=1)
+                                             == np.argmax(test_served, axis=1)))
+        metrics["latency_us"] = _mean_record_latency_us(model, records)
+        return metrics
+
+    report = {"cheap": evaluate(test_cheap, cheap), "served": evaluate(test_served, served),
+              "cascade": {}}
+    for target in sorted(set(targets) | {CASCADE_TARGET_AGREEMENT}):
+        band = calibrate_cascade_band(train_cheap, train_served, target)
+        served.cascade = CascadeStage(cheap, band["low"], band["high"])
+        combined = cascade_proba(test_cheap, test_served, band["low"], band["high"])
+        metrics = evaluate(combined, served)
+        report["cascade"][str(target)] = {
+            **metrics,
+            "low": band["low"], "high": band["high"],
+            "train_escalation_rate": band["escalation_rate"],
+            "escalation_rate": float(served.cascade.escalate(test_cheap).mean()),
+            "target_met": bool(metrics["agreement"] >= target),
+        }
+    return report
+
+
+def save_cascade_config(config: dict, path: Path = CASCADE_CONFIG_PATH):
+    # Atomic write: the serving watcher may read the file at any time
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(config, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def calibrate_and_save_cascade(served_pipeline, cheap_pipeline, cheap_path: Path,
+                               X_train, y_train, X_test, y_test,
+                               served_path: Path = MODEL_PATH,
+                               config_path: Path = CASCADE_CONFIG_PATH) -> dict:
+    """
+    Calibrates the served band (CASCADE_TARGET_AGREEMENT), logs the trade-off report to
+    MLflow and saves the band for serving, tagged with both artifact versions.
+    """
+    served_version = file_digest(served_path)
+    report = build_cascade_report(served_pipeline, cheap_pipeline, X_train, y_train,
+                                  X_test, y_test, served_version=served_version)
+    chosen = report["cascade"][str(CASCADE_TARGET_AGREEMENT)]
+
+    with mlflow.start_run(run_name="Cascade"):
+        mlflow.log_params({"cheap_model": cheap_path.stem,
+                           "target_agreement": CASCADE_TARGET_AGREEMENT,
+                           "low": chosen["low"], "high": chosen["high"]})
+        mlflow.log_metrics({f"cheap_{key}": value for key, value in report["cheap"].items()})
+        mlflow.log_metrics({f"served_{key}": value for key, value in report["served"].items()})
+        for target, metrics in report["cascade"].items():
+            mlflow.log_metrics({f"cascade_{target}_{key}": value
+                                for key, value in metrics.items()})
+        mlflow.log_dict(report, "cascade_report.json")
+
+    save_cascade_config({
+        "source_version": served_version,
+        "cheap_model": cheap_path.stem,
+        "cheap_version": file_digest(cheap_path),
+        "target_agreement": CASCADE_TARGET_AGREEMENT,
+        "low": chosen["low"],
+        "high": chosen["high"],
+        "escalation_rate": chosen["escalation_rate"],
+        "agreement": chosen["agreement"],
+        "target_met": chosen["target_met"],
+    }, config_path)
+
+    print(f"\nCascade trade-off (test split, {len(y_test)} rows):")
+    print(f"  {'model':<16}{'escalated':>10}{'agreement':>11}{'accuracy':>10}"
+          f"{'roc_auc':>9}{'latency':>12}")
+    rows = [("cheap only", {**report["cheap"], "escalation_rate": 0.0}),
+            ("served only", {**report["served"], "escalation_rate": 1.0})]
+    rows += [(f"cascade @{target}", metrics) for target, metrics in report["cascade"].items()]
+    for label, metrics in rows:
+        print(f"  {label:<16}{metrics['escalation_rate']:>10.1%}{metrics['agreement']:>11.3f}"
+              f"{metrics['accuracy']:>10.3f}{metrics['roc_auc']:>9.3f}"
+              f"{metrics['latency_us']:>10.1f}us")
+    print(f"Cascade band [{chosen['low']:.4f}, {chosen['high']:.4f}] saved to: {config_path}")
+    if not chosen["target_met"]:
+        print(f"⚠️ Warning: the cascade agrees with the served model on "
+              f"{chosen['agreement']:.3f} of the test rows, below the "
+              f"{CASCADE_TARGET_AGREEMENT} target.")
+    return report
@@ -1,5 +1,6 @@
 # src/config.py
 
+import os
 from pathlib import Path
 
 # --- General Configuration ---
@@ -15,6 +16,8 @@ DATA_DOWNLOAD_URL = ("https://archive.ics.uci.edu/ml/machine-learning-databases/
 
 RAW_DATA_PATH = DATA_RAW_DIR / DATA_FILENAME
 PROCESSED_DATA_PATH = DATA_PROCESSED_DIR / DATA_FILENAME
+# Content-addressed store of parsed, cleaned and split datasets (see src/dataset_store.py)
+DATASET_STORE_DIR = DATA_PROCESSED_DIR / 'store'
 
 # Feature Definitions (used for headers since the raw file lacks them)
 COLUMN_NAMES = [
@@ -30,6 +33,13 @@ TARGET_COLUMN = 'target'
 MODEL_DIR = PROJECT_DIR / 'src' / 'model'
 MODEL_FILENAME = 'final_model.pkl'
 MODEL_PATH = MODEL_DIR / MODEL_FILENAME
+# Flat array export of the best tree ensemble (one uncompressed .npy file per array),
+# in a subdirectory per artifact version: exports are never overwritten while mapped
+FLAT_MODEL_DIR = MODEL_DIR / 'flat_forest'
+# The other trained pipelines (challengers), one <model_name>.pkl each, for shadow scoring
+CHALLENGER_DIR = MODEL_DIR / 'challengers'
+# Calibrated band of the cheap-first cascade (written by train.py)
+CASCADE_CONFIG_PATH = MODEL_DIR / 'cascade.json'
 
 TEST_SIZE = 0.2
 RANDOM_STATE = 42
@@ -47,5 +57,119 @@ MODEL_CONFIGS = {
     }
 }
 
+# Hyperparameter search (python -m src.train --search)
+# Each entry expands a grid ("grid" strategy) or is sampled ("random" strategy); values may be
+# lists or scipy.stats distributions, as accepted by sklearn's ParameterGrid/ParameterSampler.
+SEARCH_SPACES = {
+    "Logistic Regression": {
+        "model": "LogisticRegression",
+        "base_params": {"solver": 'liblinear', "random_state": RANDOM_STATE},
+        "space": {"C": [0.01, 0.1, 1.0, 10.0], "penalty": ['l1', 'l2']}
+    },
+    "Random Forest": {
+        "model": "RandomForestClassifier",
+        "base_params": {"random_state": RANDOM_STATE},
+        "space": {"n_estimators": [100, 200], "max_depth": [3, 5, 8],
+                  "min_samples_leaf": [1, 3, 5]}
+    }
+}
+SEARCH_STRATEGY = "grid"   # "grid" or "random"
+SEARCH_N_ITER = 10         # candidates per model for the "random" strategy
+SEARCH_CV_FOLDS = 5
+SEARCH_METRIC = "roc_auc"  # any key returned by src.utils.get_metrics
+SEARCH_N_JOBS = -1         # joblib workers (-1 = all cores)
+
+# Test-set evaluation (src/evaluation.py): bootstrap confidence intervals of the metrics and
+# a decision threshold sweep, logged to MLflow with every trained model
+EVAL_BOOTSTRAP_RESAMPLES = 2000
+EVAL_CONFIDENCE = 0.95
+EVAL_THRESHOLDS = [round(0.05 * i, 2) for i in range(1, 20)]  # 0.05 .. 0.95
+
+# Incremental retraining (python -m src.train --incremental NEW_ROWS.csv)
+# The checkpoint holds the frozen preprocessor, both incremental models and the test split
+INCREMENTAL_CHECKPOINT_PATH = MODEL_DIR / 'incremental_checkpoint.pkl'
+# Forest size cap: new trees are fitted on new rows only, the oldest trees are dropped first
+INCREMENTAL_MAX_TREES = 300
+# partial_fit-capable alternative to LogisticRegression (log loss = logistic regression)
+INCREMENTAL_SGD_PARAMS = {"loss": "log_loss", "alpha": 1e-3, "random_state": RANDOM_STATE}
+INCREMENTAL_SGD_EPOCHS = 10  # passes over the initial training data
+# Model published to MODEL_PATH after each update: "Random Forest" or "SGD Classifier"
+INCREMENTAL_SERVING_MODEL = "Random Forest"
+
 # --- MLOps Configuration ---
 MLFLOW_EXPERIMENT_NAME = "Heart_Disease_Prediction_MLOps"
+
+# --- Serving Configuration ---
+# Encode requests with NumPy (no DataFrame) and call the classifier directly
+FAST_INFERENCE = os.getenv("FAST_INFERENCE", "true").lower() == "true"
+# Classifier backend on the fast path: "sklearn" (exact) or "flat" (compiled tree arrays)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "sklearn")
+# Deepest trees the flat backend compiles: its complete-tree layout stores 2**depth leaves
+# per tree, so deeper ensembles (e.g. max_depth=None) stay on the sklearn classifier
+FLAT_FOREST_MAX_DEPTH = int(os.getenv("FLAT_FOREST_MAX_DEPTH", "12"))
+# Memory-map model arrays (joblib artifact and flat forest export) instead of copying them,
+# so worker processes on the same node share read-only pages
+MODEL_MMAP = os.getenv("MODEL_MMAP", "true").lower() == "true"
+
+# Upper bound on the number of records accepted by /predict/batch in a single request.
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1024"))
+
+# Dynamic micro-batching of concurrent /predict requests
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "true").lower() == "true"
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "32"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2"))
+
+# Prediction result cache (LRU + TTL) in front of the model; size 0 disables it
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL_S = float(os.getenv("PREDICTION_CACHE_TTL_S", "3600"))
+
+# Admission control for /predict and /predict/batch (api/admission.py): at most
+# ADMISSION_MAX_IN_FLIGHT requests are processed and ADMISSION_MAX_QUEUE wait for a slot.
+# Requests that cannot finish within the latency budget get a 503 with Retry-After.
+ADMISSION_CONTROL_ENABLED = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() == "true"
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "32"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_LATENCY_BUDGET_MS = float(os.getenv("ADMISSION_LATENCY_BUDGET_MS", "500"))
+ADMISSION_RETRY_AFTER_S = int(os.getenv("ADMISSION_RETRY_AFTER_S", "1"))
+
+# Poll the model artifact and hot-swap it when it changes (seconds; 0 disables the watcher)
+MODEL_RELOAD_INTERVAL_S = float(os.getenv("MODEL_RELOAD_INTERVAL_S", "30"))
+
+# Request/response audit log: buffered in memory and flushed to JSONL by a background task
+AUDIT_LOG_ENABLED = os.getenv("AUDIT_LOG_ENABLED", "true").lower() == "true"
+# JSONL destination; "-" writes to stdout (for cluster log collection)
+AUDIT_LOG_PATH = os.getenv("AUDIT_LOG_PATH", str(PROJECT_DIR / 'logs' / 'requests.jsonl'))
+AUDIT_BUFFER_SIZE = int(os.getenv("AUDIT_BUFFER_SIZE", "10000"))
+AUDIT_FLUSH_INTERVAL_S = float(os.getenv("AUDIT_FLUSH_INTERVAL_S", "1.0"))
+AUDIT_SAMPLE_RATE = float(os.getenv("AUDIT_SAMPLE_RATE", "1.0"))
+AUDIT_MAX_BYTES = int(os.getenv("AUDIT_MAX_BYTES", str(50 * 1024 * 1024)))
+AUDIT_BACKUP_COUNT = int(os.getenv("AUDIT_BACKUP_COUNT", "5"))
+
+# Input drift monitor: live traffic is binned against reference sketches of the training
+# features (saved next to the model by train.py) and PSI/KS scores are exposed on /metrics
+DRIFT_MONITOR_ENABLED = os.getenv("DRIFT_MONITOR_ENABLED", "true").lower() == "true"
+DRIFT_REFERENCE_PATH = MODEL_DIR / 'drift_reference.json'
+DRIFT_NUM_BINS = int(os.getenv("DRIFT_NUM_BINS", "10"))
+# Live counts are halved every DRIFT_WINDOW records (0 = accumulate forever)
+DRIFT_WINDOW = int(os.getenv("DRIFT_WINDOW", "10000"))
+
+# Shadow scoring: challengers from CHALLENGER_DIR score live traffic in a bounded background
+# pool. Their results are compared with the served model's, never returned.
+SHADOW_ENABLED = os.getenv("SHADOW_ENABLED", "true").lower() == "true"
+# Comma-separated challenger names (file stems in CHALLENGER_DIR); empty = all of them
+SHADOW_MODELS = [name for name in os.getenv("SHADOW_MODELS", "").split(",") if name]
+SHADOW_MAX_WORKERS = int(os.getenv("SHADOW_MAX_WORKERS", "1"))
+# Batches queued or running in the pool; beyond this, new shadow work is dropped
+SHADOW_MAX_PENDING = int(os.getenv("SHADOW_MAX_PENDING", "2"))
+
+# Cascade inference: the cheap challenger scores first and only probabilities inside the
+# calibrated uncertainty band are escalated to the served model (fast path only)
+CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "false").lower() == "true"
+CASCADE_CHEAP_MODEL = "Logistic Regression"
+# The band is the narrowest one keeping this agreement with the served model (train split)
+CASCADE_TARGET_AGREEMENT = float(os.getenv("CASCADE_TARGET_AGREEMENT", "0.99"))
+
+# On-demand stack sampling via POST /admin/profile, authenticated with the X-Admin-Token
+# header. The endpoint is disabled while no token is configured.
+PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN", "")
+PROFILING_MAX_SECONDS = float(os.getenv("PROFILING_MAX_SECONDS", "60"))
@@ -0,0 +1,161 @@
+# src/dataset_store.py
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Union
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+import numpy as np
+import pandas as pd
+from src.config import (
+    RAW_DATA_PATH, DATASET_STORE_DIR, COLUMN_NAMES, NUMERICAL_FEATURES, CATEGORICAL_FEATURES,
+    TARGET_COLUMN, TEST_SIZE, RANDOM_STATE
+)
+from src.preprocess import COLUMN_DTYPES, preprocess_and_split, build_preprocessor
+from src.utils import file_sha256
+
+# Bump when the on-disk layout or the cleaning code changes in a way the config does not show
+STORE_FORMAT_VERSION = 2
+SPLIT_NAMES = ['X_train', 'X_test']
+TARGET_NAMES = ['y_train', 'y_test']
+
+
+def resolve_source(source: Union[str, Path]) -> Path:
+    """Returns the local path of a dataset source (a path or a file:// URL)."""
+    source = str(source)
+    parsed = urlparse(source)
+    if parsed.scheme == 'file':
+        return Path(url2pathname(parsed.path))
+    if parsed.scheme and len(parsed.scheme) > 1:  # (one letter: a Windows drive)
+        raise ValueError(f"Unsupported dataset source '{source}': use a local path or file:// "
+                         f"URL (remote data is fetched by data/download_dataset.py).")
+    return Path(source)
+
+
+def source_checksum(path: Path, store_dir: Path = DATASET_STORE_DIR) -> str:
+    """
+    SHA-256 of the raw bytes at `path`.
+
+    The result is remembered per (path, size, mtime), so an unchanged multi-GB file is
+    only hashed once rather than on every training run.
+    """
+    stat = path.stat()
+    index_path = store_dir / 'checksums.json'
+    index = json.loads(index_path.read_text()) if index_path.exists() else {}
+    key = str(path.resolve())
+    entry = index.get(key)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['sha256']
+
+    checksum = file_sha256(path)
+    index[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': checksum}
+    store_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = index_path.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(index, indent=2))
+    os.replace(tmp_path, index_path)
+    return checksum
+
+
+def preprocessing_fingerprint() -> str:
+    """Hash of every setting that shapes the cleaned and split arrays."""
+    config = {
+        'format_version': STORE_FORMAT_VERSION,
+        'columns': COLUMN_NAMES,
+        'numerical': NUMERICAL_FEATURES,
+        'categorical': CATEGORICAL_FEATURES,
+        'target': TARGET_COLUMN,
+        'dtypes': {name: np.dtype(dtype).str for name, dtype in COLUMN_DTYPES.items()},
+        'test_size': TEST_SIZE,
+        'random_state': RANDOM_STATE,
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+
+def _write_entry(raw_path: Path, entry_dir: Path, checksum: str, fingerprint: str):
+    # Parse and clean once with the regular pipeline, then store one .npy file per column
+    X_train, X_test, y_train, y_test, _ = preprocess_and_split(pd.read_csv(raw_path))
+
+    tmp_dir = entry_dir.with_name(entry_dir.name + '.tmp')
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    for name, frame in zip(SPLIT_NAMES, [X_train, X_test]):
+        (tmp_dir / name).mkdir(parents=True)
+        for column in frame.columns:
+            np.save(tmp_dir / name / f"{column}.npy", frame[column].to_numpy())
+        np.save(tmp_dir / name / 'index.npy', frame.index.to_numpy())
+    for name, series in zip(TARGET_NAMES, [y_train, y_test]):
+        np.save(tmp_dir / f"{name}.npy", series.to_numpy())
+
+    manifest = {
+        'source': str(raw_path),
+        'sha256': checksum,
+        'preprocessing_fingerprint': fingerprint,
+        'columns': list(X_train.columns),
+        'rows': {'train': len(X_train), 'test': len(X_test)},
+    }
+    (tmp_dir / 'manifest.json').write_text(json.dumps(manifest, indent=2))
+    # Publish the finished entry with one rename: readers never see a partial entry
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    os.replace(tmp_dir, entry_dir)
+
+
+def ensure_dataset(source: Union[str, Path] = RAW_DATA_PATH,
+                   store_dir: Path = DATASET_STORE_DIR) -> Path:
+    """
+    Returns the store entry for `source`, building it on the first call.
+
+    Entries are keyed by the checksum of the raw bytes and the preprocessing fingerprint,
+    so an unchanged file under unchanged settings is never parsed or cleaned twice, and
+    any change (data or config) gets a fresh entry.
+    """
+    raw_path = resolve_source(source)
+    if not raw_path.exists():
+        raise FileNotFoundError(f"Raw data not found at {raw_path}. "
+                                f"Please run download_dataset.py first.")
+    checksum = source_checksum(raw_path, store_dir)
+    fingerprint = preprocessing_fingerprint()
+    entry_dir = store_dir / f"{checksum[:16]}-{fingerprint[:12]}"
+
+    if (entry_dir / 'manifest.json').exists():
+        print(f"Dataset store: reusing {entry_dir.name} for {raw_path.name}.")
+    else:
+        print(f"Dataset store: building {entry_dir.name} from {raw_path}.")
+        _write_entry(raw_path, entry_dir, checksum, fingerprint)
+    return entry_dir
+
+
+def load_entry(entry_dir: Path, mmap: bool = True):
+    """Loads (X_train, X_test, y_train, y_test) from a store entry (memory-mapped)."""
+    mmap_mode = 'r' if mmap else None
+    manifest = json.loads((entry_dir / 'manifest.json').read_text())
+    frames = []
+    for name in SPLIT_NAMES:
+        # copy=False keeps each column as its own (memory-mapped) array
+        frames.append(pd.DataFrame(
+            {column: np.load(entry_dir / name / f"{column}.npy", mmap_mode=mmap_mode)
+             for column in manifest['columns']},
+            index=np.load(entry_dir / name / 'index.npy'), copy=False
+        ))
+    X_train, X_test = frames
+    y_train, y_test = [
+        pd.Series(np.load(entry_dir / f"{name}.npy", mmap_mode=mmap_mode), index=frame.index,
+                  name=TARGET_COLUMN, copy=False)
+        for name, frame in zip(TARGET_NAMES, frames)
+    ]
+    return X_train, X_test, y_train, y_test
+
+
+def load_dataset_split(source: Union[str, Path] = RAW_DATA_PATH,
+                       store_dir: Path = DATASET_STORE_DIR, mmap: bool = True):
+    """
+    Store-backed drop-in for `preprocess_and_split(pd.read_csv(source))`.
+
+    Returns the same (X_train, X_test, y_train, y_test, preprocessor); only the
+    preprocessor is fitted again (one pass over the training split).
+    """
+    X_train, X_test, y_train, y_test = load_entry(ensure_dataset(source, store_dir), mmap=mmap)
+    preprocessor = build_preprocessor()
+    preprocessor.fit(X_train)
+    return X_train, X_test, y_train, y_test, preprocessor
@@ -0,0 +1,171 @@
+# src/drift.py
+#
+# Serving-side input drift monitor (NumPy only, like src/inference.py).
+
+import json
+import math
+import threading
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, List, Union
+import numpy as np
+from src.config import (
+    NUMERICAL_FEATURES, CATEGORICAL_FEATURES, DRIFT_REFERENCE_PATH, DRIFT_NUM_BINS, DRIFT_WINDOW
+)
+
+# Floor for empty bins, so PSI stays finite when a bin is empty on one side
+_PSI_EPSILON = 1e-4
+
+
+def build_reference(X, source_version: str = None, n_bins: int = DRIFT_NUM_BINS) -> dict:
+    """
+    Summarizes the training features as fixed-size reference sketches.
+
+    Numerical features get `n_bins` bins with quantile edges (roughly equal reference
+    mass per bin, the usual PSI binning). Categorical features get their category
+    frequencies. `X` is any column mapping (DataFrame or dict of arrays).
+    """
+    numerical = {}
+    for feature in NUMERICAL_FEATURES:
+        values = np.asarray(X[feature], dtype=np.float64)
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, values, side='right'),
+                             minlength=len(edges) + 1)
+        numerical[feature] = {"edges": edges.tolist(),
+                              "proportions": (counts / len(values)).tolist()}
+
+    categorical = {}
+    for feature in CATEGORICAL_FEATURES:
+        categories, counts = np.unique(np.asarray(X[feature]), return_counts=True)
+        categorical[feature] = {"categories": categories.tolist(),
+                                "proportions": (counts / counts.sum()).tolist()}
+
+    return {"source_version": source_version, "n_rows": len(X[NUMERICAL_FEATURES[0]]),
+            "numerical": numerical, "categorical": categorical}
+
+
+def save_reference(reference: dict, path: Path = DRIFT_REFERENCE_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(reference, f)
+
+
+def load_reference(path: Path = DRIFT_REFERENCE_PATH) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def population_stability_index(live: np.ndarray, reference: np.ndarray) -> float:
+    """PSI between two binned distributions (proportions over the same bins)."""
+    live = np.maximum(live, _PSI_EPSILON)
+    reference = np.maximum(reference, _PSI_EPSILON)
+    return float(np.sum((live - reference) * np.log(live / reference)))
+
+
+class DriftMonitor:
+    """
+    Streams live records into fixed-size histograms laid over the reference sketches.
+
+    Memory is one count per bin/category (O(features)), whatever the traffic volume.
+    Numerical values are binned with `bisect` on the reference edges and categories
+    with a dict lookup (unseen values share an extra "other" slot), so updating with
+    one record costs a few microseconds. Every `window` records all counts are halved,
+    which makes the scores track recent traffic instead of the whole process lifetime.
+    """
+
+    def __init__(self, reference: dict, window: int = DRIFT_WINDOW):
+        self.reference = reference
+        self.window = window
+        self.n_observed = 0
+        self._since_decay = 0
+        self._lock = threading.Lock()
+
+        self._numerical = []    # (feature, bin edges, live counts)
+        for feature, sketch in reference["numerical"].items():
+            self._numerical.append((feature, sketch["edges"], [0.0] * len(sketch["proportions"])))
+        self._categorical = []  # (feature, {category: slot}, live counts incl. "other")
+        for feature, sketch in reference["categorical"].items():
+            lookup = {category: i for i, category in enumerate(sketch["categories"])}
+            self._categorical.append((feature, lookup, [0.0] * (len(lookup) + 1)))
+
+    def update(self, records: List[Dict[str, Union[int, float]]]):
+        """Adds a list of records to the live histograms."""
+        with self._lock:
+            for record in records:
+                for feature, edges, counts in self._numerical:
+                    counts[bisect_right(edges, record[feature])] += 1
+                for feature, lookup, counts in self._categorical:
+                    counts[lookup.get(record[feature], -1)] += 1
+            self._advance(len(records))
+
+    def update_columns(self, columns: Dict[str, List[Union[int, float]]]):
+        """Adds a dictionary of equally sized columns (vectorized per feature)."""
+        n_rows = len(next(iter(columns.values())))
+        with self._lock:
+            for feature, edges, counts in self._numerical:
+                bins = np.searchsorted(edges, np.asarray(columns[feature], dtype=np.float64),
+                                       side='right')
+                for i, count in enumerate(np.bincount(bins, minlength=len(counts)).tolist()):
+                    counts[i] += count
+            for feature, lookup, counts in self._categorical:
+                values, value_counts = np.unique(np.asarray(columns[feature]),
+                                                 return_counts=True)
+                for value, count in zip(values.tolist(), value_counts.tolist()):
+                    counts[lookup.get(value, -1)] += count
+            self._advance(n_rows)
+
+    def _advance(self, n_rows: int):
+        self.n_observed += n_rows
+        self._since_decay += n_rows
+        if self.window and self._since_decay >= self.window:
+            for _, _, counts in self._numerical + self._categorical:
+                counts[:] = [count / 2 for count in counts]
+            self._since_decay = 0
+
+    def scores(self) -> Dict[str, dict]:
+        """
+        Per-feature drift scores: PSI for every feature and, for numerical features,
+        the KS statistic at bin resolution (max CDF gap over the reference edges).
+        Features without live data yet are omitted.
+        """
+        with self._lock:
+            snapshot = [(feature, list(counts), True) for feature, _, counts in self._numerical]
+            snapshot += [(feature, list(counts), False)
+                         for feature, _, counts in self._categorical]
+
+        scores = {}
+        for feature, counts, is_numerical in snapshot:
+            live = np.asarray(counts)
+            total = live.sum()
+            if total == 0:
+                continue
+            live /= total
+            if is_numerical:
+                reference = np.asarray(self.reference["numerical"][feature]["proportions"])
+                ks = float(np.max(np.abs(np.cumsum(live) - np.cumsum(reference))))
+            else:
+                # The trailing "other" slot has no reference mass
+                reference = np.append(self.reference["categorical"][feature]["proportions"], 0.0)
+                ks = math.nan
+            scores[feature] = {"psi": population_stability_index(live, reference), "ks": ks}
+        return scores
+
+
+def load_drift_monitor(path: Path = DRIFT_REFERENCE_PATH, window: int = DRIFT_WINDOW,
+                       model_version: str = None):
+    """
+    Returns a DriftMonitor for the saved training reference, or None if there is none.
+
+    With `model_version`, the reference is only used when it was built for that artifact
+    (train.py tags it with the model's content hash): traffic is never compared with the
+    training data of another model.
+    """
+    if not path.exists():
+        print(f"Drift monitoring disabled: no reference sketches at {path}.")
+        return None
+    reference = load_reference(path)
+    if model_version is not None and reference.get("source_version") != model_version:
+        print(f"Drift monitoring disabled: the reference at {path} was built for model "
+              f"{reference.get('source_version')}, not the served {model_version}.")
+        return None
+    return DriftMonitor(reference, window=window)
@@ -0,0 +1,126 @@
+# src/evaluation.py
+#
+# Test-set evaluation beyond the point estimates of src.utils.get_metrics: bootstrap
+# confidence intervals and decision threshold sweeps, vectorized with NumPy.
+
+import numpy as np
+from src.config import EVAL_BOOTSTRAP_RESAMPLES, EVAL_CONFIDENCE, EVAL_THRESHOLDS, RANDOM_STATE
+
+METRIC_NAMES = ("accuracy", "precision", "recall", "roc_auc")
+
+# Resamples are scored in chunks of about this many (resample, row) weights
+_CHUNK_ELEMENTS = 2_000_000
+
+
+def weighted_metrics(y_true, y_prob, weights, threshold: float = 0.5) -> dict:
+    """
+    get_metrics for many weighted copies of one test set at once.
+
+    `weights` is an (n_sets, n_rows) matrix of row multiplicities (a bootstrap resample is
+    the bincount of its drawn indices). A row is predicted positive when its probability
+    is above `threshold` (the rule of `predict` at 0.5). Precision and recall are 0 when
+    undefined, like sklearn; ROC-AUC is NaN for sets with a single class.
+
+    ROC-AUC is the Mann-Whitney statistic: the rows are sorted by probability once, and in
+    every set the positive weight of each group of tied scores is paired with the negative
+    weight below it (ties count half), so no set needs a sort of its own.
+    """
+    y = np.asarray(y_true).astype(bool)
+    p = np.asarray(y_prob, dtype=np.float64)
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    predicted = p > threshold
+
+    tp = weights @ (y & predicted).astype(np.float64)
+    fp = weights @ (~y & predicted).astype(np.float64)
+    fn = weights @ (y & ~predicted).astype(np.float64)
+    total = weights.sum(axis=1)
+    positives = tp + fn
+
+    order = np.argsort(p, kind='stable')
+    sorted_p = p[order]
+    group_starts = np.flatnonzero(np.r_[True, sorted_p[1:] != sorted_p[:-1]])
+    sorted_weights = weights[:, order]
+    positive_rows = y[order]
+    group_positives = np.add.reduceat(sorted_weights * positive_rows, group_starts, axis=1)
+    group_negatives = np.add.reduceat(sorted_weights * ~positive_rows, group_starts, axis=1)
+    negatives_below = np.cumsum(group_negatives, axis=1) - group_negatives
+    ranked_pairs = (group_positives * (negatives_below + 0.5 * group_negatives)).sum(axis=1)
+    pairs = positives * (total - positives)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            "accuracy": (total - fp - fn) / total,
+            "precision": np.where(tp + fp > 0, tp / (tp + fp), 0.0),
+            "recall": np.where(positives > 0, tp / positives, 0.0),
+            "roc_auc": np.where(pairs > 0, ranked_pairs / pairs, np.nan),
+        }
+
+
+def bootstrap_metrics(y_true, y_prob, n_resamples: int = EVAL_BOOTSTRAP_RESAMPLES,
+                      confidence: float = EVAL_CONFIDENCE, threshold: float = 0.5,
+                      random_state: int = RANDOM_STATE) -> dict:
+    """
+    Point estimates and percentile bootstrap confidence intervals of the test metrics.
+
+    Returns {metric: {"estimate", "ci_low", "ci_high", "std"}}. The resamples are drawn
+    as index matrices and scored together by `weighted_metrics` (chunked to bound memory)
+    instead of calling the sklearn metrics once per resample.
+    """
+    y = np.asarray(y_true).astype(bool)
+    p = np.asarray(y_prob, dtype=np.float64)
+    n = len(y)
+    rng = np.random.default_rng(random_state)
+    estimates = weighted_metrics(y, p, np.ones((1, n)), threshold)
+
+    samples = {name: [] for name in METRIC_NAMES}
+    chunk = max(1, _CHUNK_ELEMENTS // max(n, 1))
+    for start in range(0, n_resamples, chunk):
+        size = min(chunk, n_resamples - start)
+        indices = rng.integers(0, n, size=(size, n)) + (np.arange(size) * n)[:, None]
+        weights = np.bincount(indices.ravel(), minlength=size * n).reshape(size, n)
+        for name, values in weighted_metrics(y, p, weights, threshold).items():
+            samples[name].append(values)
+
+    tail = (1 - confidence) / 2 * 100
+    results = {}
+    for name in METRIC_NAMES:
+        values = np.concatenate(samples[name])
+        values = values[~np.isnan(values)]  # single-class resamples have no ROC-AUC
+        low, high = np.percentile(values, [tail, 100 - tail])
+        results[name] = {"estimate": float(estimates[name][0]), "ci_low": float(low),
+                         "ci_high": float(high), "std": float(values.std())}
+    return results
+
+
+def threshold_sweep(y_true, y_prob, thresholds=EVAL_THRESHOLDS) -> dict:
+    """
+    Confusion counts and metrics at every decision threshold, from a single sort.
+
+    The rows predicted positive at a threshold are the ones sorted above it, so each
+    threshold only costs a binary search and a cumulative-sum lookup. Returns arrays
+    keyed by "threshold", "tp", "fp", "fn", "tn", "accuracy", "precision", "recall", "f1".
+    """
+    y = np.asarray(y_true).astype(bool)
+    p = np.asarray(y_prob, dtype=np.float64)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+
+    order = np.argsort(p, kind='stable')
+    positives_up_to = np.r_[0, np.cumsum(y[order])]
+    predicted_negative = np.searchsorted(p[order], thresholds, side='right')
+    fn = positives_up_to[predicted_negative]
+    tp = positives_up_to[-1] - fn
+    tn = predicted_negative - fn
+    fp = len(p) - predicted_negative - tp
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+        f1 = np.where(precision + recall > 0,
+                      2 * precision * recall / (precision + recall), 0.0)
+    return {"threshold": thresholds, "tp": tp, "fp": fp, "fn": fn, "tn": tn,
+            "accuracy": (tp + tn) / len(p), "precision": precision, "recall": recall, "f1": f1}
+
+
+def best_threshold(sweep: dict, metric: str = "f1") -> float:
+    """The threshold of a sweep with the highest `metric` (the lowest one on ties)."""
+    return float(sweep["threshold"][int(np.argmax(sweep[metric]))])
@@ -0,0 +1,162 @@
+# src/incremental.py
+
+import copy
+import os
+import time
+import joblib
+import mlflow
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+from src.config import (
+    RAW_DATA_PATH, MODEL_CONFIGS, NUMERICAL_FEATURES, TARGET_COLUMN, RANDOM_STATE,
+    MLFLOW_EXPERIMENT_NAME, INCREMENTAL_CHECKPOINT_PATH, INCREMENTAL_MAX_TREES,
+    INCREMENTAL_SGD_PARAMS, INCREMENTAL_SGD_EPOCHS, INCREMENTAL_SERVING_MODEL
+)
+from src.utils import get_metrics
+from src.preprocess import clean_feature_frame, binarize_target
+from src.dataset_store import load_dataset_split
+
+CLASSES = np.array([0, 1])
+
+
+def evaluate_state(state: dict) -> dict:
+    """get_metrics of both incremental models on the checkpointed test split."""
+    metrics = {}
+    for name, pipeline in state['pipelines'].items():
+        y_pred = pipeline.predict(state['X_test'])
+        y_prob = pipeline.predict_proba(state['X_test'])[:, 1]
+        metrics[name] = get_metrics(state['y_test'], y_pred, y_prob)
+    return metrics
+
+
+def init_state(X_train, y_train, X_test, y_test, preprocessor) -> dict:
+    """
+    Fits the incremental models from scratch (the full-retrain baseline).
+
+    - "Random Forest": the configured forest, with warm_start so updates can add trees.
+      Its preprocessor is frozen: existing trees split on the scaled values it produced.
+    - "SGD Classifier": logistic regression trained with SGD, so it can `partial_fit`.
+      It gets its own copy of the preprocessor, whose StandardScaler statistics are
+      updated with every batch of new rows.
+    """
+    forest = RandomForestClassifier(**MODEL_CONFIGS["Random Forest"]['params'], warm_start=True)
+    forest_pipeline = Pipeline(steps=[('preprocessor', preprocessor), ('classifier', forest)])
+    forest_pipeline.fit(X_train, y_train)
+
+    sgd_preprocessor = copy.deepcopy(preprocessor)
+    encoded = sgd_preprocessor.transform(X_train)
+    y = np.asarray(y_train)
+    sgd = SGDClassifier(**INCREMENTAL_SGD_PARAMS)
+    rng = np.random.default_rng(RANDOM_STATE)
+    for _ in range(INCREMENTAL_SGD_EPOCHS):
+        order = rng.permutation(len(y))
+        sgd.partial_fit(encoded[order], y[order], classes=CLASSES)
+
+    return {
+        'pipelines': {
+            "Random Forest": forest_pipeline,
+            "SGD Classifier": Pipeline(steps=[('preprocessor', sgd_preprocessor),
+                                              ('classifier', sgd)]),
+        },
+        # Each new tree is fitted on about as many rows as each initial tree represents,
+        # so new data gets a vote proportional to its size
+        'rows_per_tree': len(y) / forest.n_estimators,
+        'n_rows_seen': len(y),
+        'n_updates': 0,
+        'X_test': X_test,
+        'y_test': y_test,
+    }
+
+
+def update_state(state: dict, X_new: pd.DataFrame, y_new) -> dict:
+    """
+    Folds a batch of new labeled rows into the checkpointed models, in place.
+
+    The cost depends only on the new rows: the forest grows by trees fitted on them
+    (capped at INCREMENTAL_MAX_TREES, oldest first), the SGD model takes one partial_fit
+    pass, and its StandardScaler statistics are updated with `partial_fit`.
+    Returns a summary of the update.
+    """
+    y_new = np.asarray(y_new)
+    summary = {'n_new_rows': len(y_new), 'n_new_trees': 0}
+
+    forest_pipeline = state['pipelines']["Random Forest"]
+    forest = forest_pipeline.named_steps['classifier']
+    if len(np.unique(y_new)) == len(CLASSES):
+        # Trees fitted on a single-class batch would not produce a probability per class
+        n_new_trees = max(1, round(len(y_new) / state['rows_per_tree']))
+        forest.n_estimators = len(forest.estimators_) + n_new_trees
+        forest.fit(forest_pipeline.named_steps['preprocessor'].transform(X_new), y_new)
+        if len(forest.estimators_) > INCREMENTAL_MAX_TREES:
+            forest.estimators_ = forest.estimators_[-INCREMENTAL_MAX_TREES:]
+            forest.n_estimators = INCREMENTAL_MAX_TREES
+        summary['n_new_trees'] = n_new_trees
+    else:
+        print(f"Skipping the forest update: the batch of {len(y_new)} rows has a single class.")
+
+    sgd_pipeline = state['pipelines']["SGD Classifier"]
+    sgd_preprocessor = sgd_pipeline.named_steps['preprocessor']
+    sgd_preprocessor.named_transformers_['num'].partial_fit(X_new[NUMERICAL_FEATURES])
+    sgd_pipeline.named_steps['classifier'].partial_fit(sgd_preprocessor.transform(X_new), y_new,
+                                                       classes=CLASSES)
+
+    state['n_rows_seen'] += len(y_new)
+    state['n_updates'] += 1
+    summary['n_trees'] = len(forest.estimators_)
+    return summary
+
+
+def save_checkpoint(state: dict, path=INCREMENTAL_CHECKPOINT_PATH):
+    # Write-then-rename, so an interrupted update leaves the previous checkpoint intact
+    tmp_path = path.with_suffix('.tmp')
+    joblib.dump(state, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path=INCREMENTAL_CHECKPOINT_PATH) -> dict:
+    return joblib.load(path)
+
+
+def run_incremental_update(new_rows_path, checkpoint_path=INCREMENTAL_CHECKPOINT_PATH,
+                           serving_model: str = INCREMENTAL_SERVING_MODEL,
+                           data_source=RAW_DATA_PATH):
+    """
+    Applies the labeled rows in `new_rows_path` (raw CSV layout) to the checkpoint,
+    logs the update to MLflow and publishes the serving model.
+
+    Without a checkpoint, one is initialized from `data_source` first (a full fit).
+    """
+    from src.train import save_model_artifacts
+
+    mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
+
+    if checkpoint_path.exists():
+        state = load_checkpoint(checkpoint_path)
+    else:
+        print(f"No incremental checkpoint at {checkpoint_path}; initializing from {data_source}.")
+        X_train, X_test, y_train, y_test, preprocessor = load_dataset_split(data_source)
+        state = init_state(X_train, y_train, X_test, y_test, preprocessor)
+
+    new_df = clean_feature_frame(pd.read_csv(new_rows_path))
+    y_new = binarize_target(new_df[TARGET_COLUMN])
+    X_new = new_df.drop(columns=TARGET_COLUMN)
+
+    with mlflow.start_run(run_name="Incremental Update"):
+        start = time.perf_counter()
+        summary = update_state(state, X_new, y_new)
+        summary['update_seconds'] = time.perf_counter() - start
+        metrics = evaluate_state(state)
+
+        mlflow.log_params({**summary, 'n_rows_seen': state['n_rows_seen']})
+        for name, model_metrics in metrics.items():
+            prefix = name.lower().replace(' ', '_')
+            mlflow.log_metrics({f"{prefix}_{key}": value for key, value in model_metrics.items()})
+        print(f"Incremental update #{state['n_updates']}: {summary}")
+        print(f"Test metrics: {metrics}")
+
+    save_checkpoint(state, checkpoint_path)
+    save_model_artifacts(state['pipelines'][serving_model])
+    return state, metrics
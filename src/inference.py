@@ -1,41 +1,793 @@
 # src/inference.py
+#
+# Serving-side module: it must stay importable without pandas, scikit-learn or the
+# training stack (mlflow, src.train). pandas is only imported by the DataFrame fallback
+# path, and scikit-learn only when a pickled pipeline is actually loaded.
 
+import json
+import threading
+import time
 import joblib
-import pandas as pd
+import numpy as np
 from pathlib import Path
-from src.config import MODEL_PATH
-from typing import Dict, Union
+from src.config import (
+    MODEL_PATH, FLAT_MODEL_DIR, CHALLENGER_DIR, CASCADE_CONFIG_PATH, CASCADE_ENABLED,
+    FAST_INFERENCE, INFERENCE_BACKEND, MODEL_MMAP, FLAT_FOREST_MAX_DEPTH,
+    PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL_S
+)
+from src.cache import PredictionCache, make_cache_key
+from src.utils import file_sha256
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Union
 
 MODEL_PIPELINE = None
 
+# Optional hook called as STAGE_OBSERVER(stage, seconds) for every timed inference stage.
+# The API points it at a Prometheus histogram; when it is None nothing is timed.
+STAGE_OBSERVER = None
+# Optional hook called as CASCADE_OBSERVER(n_rows, n_escalated) for every cascade batch
+CASCADE_OBSERVER = None
 
-def load_model_pipeline(model_path: Path = MODEL_PATH):
-    """Loads the trained model pipeline from the specified path."""
-    global MODEL_PIPELINE
-    if MODEL_PIPELINE is None:
-        if not model_path.exists():
-            raise FileNotFoundError(f"Model file not found at {model_path}. Run train.py first.")
+PREDICTION_CACHE = (PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL_S)
+                    if PREDICTION_CACHE_SIZE > 0 else None)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Reports the wall time of the enclosed block to STAGE_OBSERVER (if set)."""
+    observer = STAGE_OBSERVER
+    if observer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observer(stage, time.perf_counter() - start)
+
+
+class FastFeatureEncoder:
+    """
+    Plain NumPy replica of the fitted ColumnTransformer used in the training pipeline.
+
+    The StandardScaler statistics and OneHotEncoder categories are read once from the
+    fitted preprocessor, so a record can be encoded without building a DataFrame.
+    The output is bit-for-bit identical to `preprocessor.transform`.
+    """
+
+    ENCODER_FILENAME = 'encoder.json'
+
+    def __init__(self, preprocessor):
+        from sklearn.preprocessing import StandardScaler, OneHotEncoder
+
+        numerical_blocks = []   # (output offset, feature names, means, scales)
+        categorical_blocks = []  # (feature name, sorted categories, output offset)
+        offset = 0
+
+        for name, transformer, columns in preprocessor.transformers_:
+            if transformer == 'drop' or len(columns) == 0:
+                continue
+            if isinstance(transformer, StandardScaler):
+                n = len(columns)
+                mean = transformer.mean_ if transformer.with_mean else np.zeros(n)
+                scale = transformer.scale_ if transformer.with_std else np.ones(n)
+                numerical_blocks.append((offset, list(columns), mean, scale))
+                offset += n
+            elif isinstance(transformer, OneHotEncoder) and self._is_plain_one_hot(transformer):
+                for feature, categories in zip(columns, transformer.categories_):
+                    categorical_blocks.append((feature, categories, offset))
+                    offset += len(categories)
+            else:
+                raise ValueError(f"Unsupported transformer '{name}' for fast inference.")
+
+        self._set_blocks(numerical_blocks, categorical_blocks, offset)
+
+    def _set_blocks(self, numerical_blocks, categorical_blocks, n_features_out):
+        self.numerical_blocks = numerical_blocks
+        self.categorical_blocks = categorical_blocks
+        self.category_lookup = [
+            (feature, {c: offset + i for i, c in enumerate(categories.tolist())})
+            for feature, categories, offset in categorical_blocks
+        ]
+        self.n_features_out = n_features_out
+        self._local = threading.local()
+
+    def save(self, directory: Path, source_version: str = None):
+        """
+        Saves the encoding parameters as JSON next to the flat forest export.
+
+        Together they form the serving bundle: a model that can be served without
+        unpickling the pipeline (and so without importing scikit-learn). Python floats
+        round-trip exactly through JSON, so a loaded encoder stays bit-for-bit identical.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        state = {
+            "source_version": source_version,
+            "n_features_out": self.n_features_out,
+            "numerical_blocks": [
+                {"offset": offset, "features": features, "dtype": mean.dtype.str,
+                 "mean": mean.tolist(), "scale": scale.tolist()}
+                for offset, features, mean, scale in self.numerical_blocks
+            ],
+            "categorical_blocks": [
+                {"feature": feature, "offset": offset, "dtype": categories.dtype.str,
+                 "categories": categories.tolist()}
+                for feature, categories, offset in self.categorical_blocks
+            ],
+        }
+        with open(directory / self.ENCODER_FILENAME, 'w') as f:
+            json.dump(state, f)
+
+    @classmethod
+    def load(cls, directory: Path):
+        """Loads an encoder written by `save`; returns (encoder, source_version)."""
+        with open(directory / cls.ENCODER_FILENAME) as f:
+            state = json.load(f)
+        encoder = cls.__new__(cls)
+        encoder._set_blocks(
+            [(block["offset"], block["features"], np.array(block["mean"], dtype=block["dtype"]),
+              np.array(block["scale"], dtype=block["dtype"]))
+             for block in state["numerical_blocks"]],
+            [(block["feature"], np.array(block["categories"], dtype=block["dtype"]),
+              block["offset"])
+             for block in state["categorical_blocks"]],
+            state["n_features_out"]
+        )
+        return encoder, state["source_version"]
+
+    @staticmethod
+    def _is_plain_one_hot(encoder) -> bool:
+        return (encoder.drop is None and encoder.handle_unknown == 'ignore'
+                and encoder.min_frequency is None and encoder.max_categories is None)
+
+    def _row(self) -> np.ndarray:
+        # One preallocated row per thread (requests may be scored concurrently)
+        row = getattr(self._local, 'row', None)
+        if row is None:
+            row = self._local.row = np.zeros((1, self.n_features_out))
+        else:
+            row.fill(0.0)
+        return row
+
+    def encode_record(self, record: Dict[str, Union[int, float]]) -> np.ndarray:
+        """Encodes a single record into a (1, n_features_out) array."""
+        row = self._row()
+        out = row[0]
+
+        for offset, features, mean, scale in self.numerical_blocks:
+            values = np.array([record[f] for f in features], dtype=np.float64)
+            out[offset:offset + len(features)] = (values - mean) / scale
+
+        # Unknown categories are encoded as all zeros (handle_unknown='ignore')
+        for feature, lookup in self.category_lookup:
+            column = lookup.get(record[feature])
+            if column is not None:
+                out[column] = 1.0
+
+        return row
+
+    def encode_columns(self, columns: Dict[str, List[Union[int, float]]]) -> np.ndarray:
+        """Encodes a dictionary of equally sized columns into an (n, n_features_out) array."""
+        n_rows = len(next(iter(columns.values())))
+        encoded = np.zeros((n_rows, self.n_features_out))
+
+        for offset, features, mean, scale in self.numerical_blocks:
+            values = np.column_stack([np.asarray(columns[f], dtype=np.float64) for f in features])
+            encoded[:, offset:offset + len(features)] = (values - mean) / scale
+
+        rows = np.arange(n_rows)
+        for feature, categories, offset in self.categorical_blocks:
+            values = np.asarray(columns[feature], dtype=np.float64)
+            positions = np.searchsorted(categories, values).clip(max=len(categories) - 1)
+            known = categories[positions] == values
+            encoded[rows[known], offset + positions[known]] = 1.0
+
+        return encoded
+
+
+class FlatForest:
+    """
+    Tree ensemble compiled into contiguous arrays with a complete binary layout.
+
+    Every tree is padded to the same depth D: node `i` has children `2i + 1` and `2i + 2`,
+    internal nodes are `0 .. 2^D - 2` and leaves follow. Leaves shallower than D become
+    pass-through nodes (threshold +inf, always left) whose subtree repeats the leaf value.
+    This lets a whole batch walk all trees level by level with pure NumPy indexing.
+    """
+
+    ARRAY_NAMES = ('feature', 'threshold', 'value', 'classes')
+    TRAVERSAL_NAMES = ('left_child', 'node_feature', 'node_threshold', 'leaf_value')
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, value: np.ndarray,
+                 classes: np.ndarray, traversal: dict = None, source_version: str = None):
+        self.feature = feature        # (n_trees, 2^D - 1) int32
+        self.threshold = threshold    # (n_trees, 2^D - 1) float64
+        self.value = value            # (n_trees, 2^D, n_classes) float64 class probabilities
+        self.classes_ = classes
+        self.n_trees = feature.shape[0]
+        self.depth = int(np.log2(feature.shape[1] + 1))
+        self.source_version = source_version
+
+        n_nodes = 2 * feature.shape[1] + 1
+        self._roots = np.arange(self.n_trees, dtype=np.int32) * n_nodes
+        for name, array in (traversal or self._build_traversal()).items():
+            setattr(self, name, array)
+
+    @classmethod
+    def from_estimator(cls, forest):
+        """Flattens a fitted RandomForestClassifier (or any single-output tree ensemble)."""
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        depth = max(1, max(tree.max_depth for tree in trees))
+        n_internal, n_leaves = 2 ** depth - 1, 2 ** depth
+        n_classes = len(forest.classes_)
+
+        feature = np.zeros((len(trees), n_internal), dtype=np.int32)
+        threshold = np.full((len(trees), n_internal), np.inf)
+        value = np.zeros((len(trees), n_leaves, n_classes))
+
+        for t, tree in enumerate(trees):
+            # Leaf probabilities, normalised the same way as DecisionTreeClassifier
+            proba = tree.value[:, 0, :n_classes]
+            normalizer = proba.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            proba = proba / normalizer
+
+            stack = [(0, 0, 0)]  # (sklearn node, layout position, level)
+            while stack:
+                node, position, level = stack.pop()
+                if level == depth:
+                    value[t, position - n_internal] = proba[node]
+                    continue
+                left, right = tree.children_left[node], tree.children_right[node]
+                if left == -1:
+                    # Pad a shallow leaf: +inf threshold keeps the walk on the left branch
+                    stack.append((node, 2 * position + 1, level + 1))
+                    stack.append((node, 2 * position + 2, level + 1))
+                else:
+                    feature[t, position] = tree.feature[node]
+                    threshold[t, position] = tree.threshold[node]
+                    stack.append((left, 2 * position + 1, level + 1))
+                    stack.append((right, 2 * position + 2, level + 1))
+
+        return cls(feature, threshold, value, np.asarray(forest.classes_))
+
+    def save(self, directory: Path, source_version: str = None):
+        """
+        Saves the arrays as uncompressed .npy files.
+
+        The traversal arrays are saved as well, so `load(..., mmap_mode='r')` can serve
+        straight from the page cache: worker processes mapping the same files share
+        one physical copy instead of each building its own.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in self.ARRAY_NAMES + self.TRAVERSAL_NAMES:
+            array = self.classes_ if name == 'classes' else getattr(self, name)
+            np.save(directory / f"{name}.npy", np.ascontiguousarray(array))
+        with open(directory / 'metadata.json', 'w') as f:
+            json.dump({"source_version": source_version}, f)
+
+    @classmethod
+    def load(cls, directory: Path, mmap_mode=None):
+        """Loads a forest written by `save` (memory-mapped when `mmap_mode` is given)."""
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode=mmap_mode)
+                  for name in cls.ARRAY_NAMES + cls.TRAVERSAL_NAMES}
+        with open(directory / 'metadata.json') as f:
+            metadata = json.load(f)
+        return cls(arrays['feature'], arrays['threshold'], arrays['value'], arrays['classes'],
+                   traversal={name: arrays[name] for name in cls.TRAVERSAL_NAMES},
+                   source_version=metadata.get("source_version"))
+
+    def _build_traversal(self) -> dict:
+        # Number all nodes of all trees globally (tree t owns [t * n_nodes, (t + 1) * n_nodes))
+        # so each level of the walk is a handful of 1-D `take` calls on int32 indices.
+        n_trees, n_internal = self.feature.shape
+        n_nodes = 2 * n_internal + 1
+        base = (np.arange(n_trees, dtype=np.int32) * n_nodes)[:, None]
+        local = np.arange(n_nodes, dtype=np.int32)[None, :]
+
+        left_child = np.zeros((n_trees, n_nodes), dtype=np.int32)
+        left_child[:, :n_internal] = base + 2 * local[:, :n_internal] + 1
+        node_feature = np.zeros((n_trees, n_nodes), dtype=np.int32)
+        node_feature[:, :n_internal] = self.feature
+        node_threshold = np.full((n_trees, n_nodes), np.inf)
+        node_threshold[:, :n_internal] = self.threshold
+        # Per-class leaf probabilities indexed by global node id: (n_classes, n_trees * n_nodes)
+        leaf_value = np.zeros((self.value.shape[2], n_trees, n_nodes))
+        leaf_value[:, :, n_internal:] = self.value.transpose(2, 0, 1)
+
+        return {
+            'left_child': left_child.ravel(),
+            'node_feature': node_feature.ravel(),
+            'node_threshold': node_threshold.ravel(),
+            'leaf_value': leaf_value.reshape(self.value.shape[2], -1),
+        }
+
+    def predict_proba(self, X: np.ndarray, chunk_size: int = 256) -> np.ndarray:
+        """Averages leaf class probabilities over all trees for a batch of encoded rows."""
+        # sklearn trees compare float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        proba = np.empty((X.shape[0], self.leaf_value.shape[0]))
+
+        # Chunking keeps the (rows x trees) index arrays cache-resident for large batches
+        for start in range(0, X.shape[0], chunk_size):
+            chunk = X[start:start + chunk_size]
+            row_offset = (np.arange(chunk.shape[0], dtype=np.int32) * chunk.shape[1])[:, None]
+            X_flat = chunk.ravel()
+
+            node = np.broadcast_to(self._roots, (chunk.shape[0], self.n_trees))
+            for _ in range(self.depth):
+                values = X_flat.take(self.node_feature.take(node) + row_offset)
+                node = self.left_child.take(node) + (values > self.node_threshold.take(node))
+
+            for c, leaf_value in enumerate(self.leaf_value):
+                proba[start:start + chunk_size, c] = leaf_value.take(node).sum(axis=1)
+
+        return proba / self.n_trees
+
+
+def build_flat_forest(pipeline):
+    """
+    Returns a FlatForest for pipelines ending in a tree ensemble, or None.
+
+    Ensembles deeper than FLAT_FOREST_MAX_DEPTH are not compiled: the layout would need
+    2**depth nodes per tree.
+    """
+    classifier = pipeline[-1]
+    if not hasattr(classifier, 'estimators_') or not hasattr(classifier, 'classes_'):
+        return None
+    if not all(hasattr(estimator, 'tree_') for estimator in classifier.estimators_):
+        return None
+    depth = max(estimator.tree_.max_depth for estimator in classifier.estimators_)
+    if depth > FLAT_FOREST_MAX_DEPTH:
+        print(f"Flat forest skipped: trees of depth {depth} exceed FLAT_FOREST_MAX_DEPTH "
+              f"({FLAT_FOREST_MAX_DEPTH}), the sklearn classifier is used instead.")
+        return None
+    return FlatForest.from_estimator(classifier)
+
+
+def flat_export_dir(version: str, flat_model_dir: Path = FLAT_MODEL_DIR) -> Path:
+    """
+    Directory of the flat export written for the artifact `version`.
+
+    Each version gets its own directory, published with a single rename by train.py, so
+    files a serving process has memory-mapped are never rewritten underneath it.
+    """
+    return flat_model_dir / version
+
+
+def load_flat_forest(pipeline, version: str, flat_model_dir: Path = FLAT_MODEL_DIR):
+    """
+    Returns the compiled forest for a loaded pipeline.
+
+    The exported arrays are memory-mapped when they were written for this exact artifact
+    (same content hash); otherwise the forest is compiled from the estimator in memory.
+    """
+    export_dir = flat_export_dir(version, flat_model_dir)
+    if (export_dir / 'metadata.json').exists():
+        forest = FlatForest.load(export_dir, mmap_mode='r' if MODEL_MMAP else None)
+        if forest.source_version == version:
+            return forest
+    return build_flat_forest(pipeline)
+
+
+def build_fast_encoder(pipeline):
+    """Returns a FastFeatureEncoder for a (preprocessor, classifier) pipeline, or None."""
+    steps = getattr(pipeline, 'steps', None)
+    if steps is None or len(steps) != 2:
+        return None
+    try:
+        return FastFeatureEncoder(steps[0][1])
+    except (ValueError, AttributeError) as e:
+        print(f"Fast inference disabled, falling back to the DataFrame path: {e}")
+        return None
+
+
+def file_digest(path: Path) -> str:
+    """Returns a short content hash of a model artifact, used as its version."""
+    return file_sha256(path)[:12]
+
+
+class CascadeStage:
+    """
+    Cheap first stage of a cascade: its probability is kept outside [low, high] and rows
+    inside that uncertainty band are escalated to the model the stage is attached to.
+    """
+
+    def __init__(self, cheap: 'LoadedModel', low: float, high: float):
+        self.cheap = cheap
+        self.low = low
+        self.high = high
+
+    def escalate(self, probabilities: np.ndarray) -> np.ndarray:
+        positive = probabilities[:, 1]
+        return (positive >= self.low) & (positive <= self.high)
+
+
+class LoadedModel:
+    """
+    Snapshot of one loaded artifact together with everything derived from it.
+
+    Requests grab the active snapshot once and use it until they finish, so swapping in
+    a new model never mixes the pipeline of one artifact with the encoder of another.
+    """
+
+    def __init__(self, pipeline, model_path: Path, version: str, file_stat,
+                 encoder: FastFeatureEncoder = None, flat_forest: FlatForest = None,
+                 cascade: CascadeStage = None):
+        self._pipeline = pipeline
+        self._pipeline_lock = threading.Lock()
+        self.path = model_path
+        self.version = version
+        self.file_signature = (file_stat.st_mtime_ns, file_stat.st_size) if file_stat else None
+        self.cascade = cascade
+        self.loaded_at = datetime.now(timezone.utc)
+        if pipeline is None:
+            # Serving bundle: everything the fast path needs comes from the export
+            self.encoder = encoder
+            self.flat_forest = flat_forest
+            self.classes_ = flat_forest.classes_
+        else:
+            self.encoder = build_fast_encoder(pipeline)
+            self.flat_forest = load_flat_forest(pipeline, version) \
+                if INFERENCE_BACKEND == 'flat' else None
+            self.classes_ = pipeline.classes_
+
+    @property
+    def pipeline(self):
+        """The fitted pipeline (unpickled on first use for models served from the bundle)."""
+        if self._pipeline is None:
+            with self._pipeline_lock:
+                if self._pipeline is None:
+                    if file_digest(self.path) != self.version:
+                        raise RuntimeError(f"Model file at {self.path} no longer matches the "
+                                           f"served version {self.version}.")
+                    self._pipeline = joblib.load(self.path, mmap_mode='r' if MODEL_MMAP else None)
+        return self._pipeline
+
+    def _classifier_proba(self, encoded: np.ndarray) -> np.ndarray:
+        # Use the compiled forest when enabled, otherwise the fitted sklearn classifier
+        with stage_timer("classifier"):
+            if self.flat_forest is not None:
+                return self.flat_forest.predict_proba(encoded)
+            return self.pipeline[-1].predict_proba(encoded)
+
+    def _pipeline_proba(self, frame_data) -> np.ndarray:
+        # Same as pipeline.predict_proba, split into its stages so each one can be timed
+        import pandas as pd
+
+        with stage_timer("dataframe"):
+            frame = pd.DataFrame(frame_data)
+        with stage_timer("transform"):
+            encoded = self.pipeline[:-1].transform(frame)
+        return self._classifier_proba(encoded)
+
+    def predict_proba_record(self, record: Dict[str, Union[int, float]],
+                             fast: bool = FAST_INFERENCE) -> np.ndarray:
+        """Class probabilities for a single record, shape (1, n_classes)."""
+        cascade = self.cascade  # (attached in the background once loaded)
+        if fast and cascade is not None and self.encoder is not None:
+            return self._cascade_proba(cascade, record, single=True)
+        if fast and self.encoder is not None:
+            # Encode straight into a NumPy row and call the classifier directly
+            with stage_timer("encode"):
+                encoded = self.encoder.encode_record(record)
+            return self._classifier_proba(encoded)
+        # Convert the record to a Pandas DataFrame; the pipeline handles all preprocessing
+        return self._pipeline_proba([record])
+
+    def predict_proba_batch(self, input_data, fast: bool = FAST_INFERENCE) -> np.ndarray:
+        """Class probabilities for a list of records or a dictionary of columns."""
+        cascade = self.cascade
+        if fast and cascade is not None and self.encoder is not None:
+            return self._cascade_proba(cascade, _records_to_columns(input_data))
+        if fast and self.encoder is not None:
+            with stage_timer("encode"):
+                encoded = self.encoder.encode_columns(_records_to_columns(input_data))
+            return self._classifier_proba(encoded)
+        # Both row-oriented and column-oriented inputs map directly onto a DataFrame
+        return self._pipeline_proba(input_data)
+
+    def _cascade_proba(self, cascade: CascadeStage, input_data,
+                       single: bool = False) -> np.ndarray:
+        # The cheap model scores every row; only the uncertain ones pay for this model
+        cheap = cascade.cheap
+        with stage_timer("cascade_cheap"):
+            probabilities = cheap.predict_proba_record(input_data, fast=True) if single \
+                else cheap.predict_proba_batch(input_data, fast=True)
+        escalate = cascade.escalate(probabilities)
+        n_escalated = int(escalate.sum())
+        if n_escalated:
+            with stage_timer("encode"):
+                encoded = self.encoder.encode_record(input_data) if single else \
+                    self.encoder.encode_columns({name: np.asarray(values)[escalate]
+                                                 for name, values in input_data.items()})
+            probabilities[escalate] = self._classifier_proba(encoded)
+        if CASCADE_OBSERVER is not None:
+            CASCADE_OBSERVER(len(escalate), n_escalated)
+        return probabilities
+
+    def warm_up(self, n_rounds: int = 3):
+        """Runs a few dummy predictions so the first real request does not pay for it."""
+        if self.encoder is None:
+            return
+        record = {}
+        for _, features, mean, _ in self.encoder.numerical_blocks:
+            record.update(zip(features, mean.tolist()))
+        for feature, categories, _ in self.encoder.categorical_blocks:
+            record[feature] = categories[0].item()
+        for _ in range(n_rounds):
+            self.predict_proba_record(record)
+            self.predict_proba_batch([record] * 8)
+
+
+ACTIVE_MODEL = None
+_MODEL_LOCK = threading.Lock()
+
+
+def load_serving_bundle(model_path: Path = MODEL_PATH, flat_model_dir: Path = FLAT_MODEL_DIR):
+    """
+    Loads the artifact at `model_path` from its serving bundle, or returns None.
+
+    The bundle (fast encoder parameters + flat forest arrays, see train.py) is only used
+    when both parts were exported for this exact artifact. The pipeline itself is then
+    not unpickled until something asks for it, which keeps scikit-learn, SciPy and pandas
+    out of the serving process and cuts cold start to a few file reads.
+    """
+    file_stat = model_path.stat()
+    version = file_digest(model_path)
+    export_dir = flat_export_dir(version, flat_model_dir)
+    encoder_path = export_dir / FastFeatureEncoder.ENCODER_FILENAME
+    if not encoder_path.exists() or not (export_dir / 'metadata.json').exists():
+        return None
+    encoder, encoder_version = FastFeatureEncoder.load(export_dir)
+    if encoder_version != version:
+        return None
+    flat_forest = FlatForest.load(export_dir, mmap_mode='r' if MODEL_MMAP else None)
+    if flat_forest.source_version != version:
+        return None
+    return LoadedModel(None, model_path, version, file_stat,
+                       encoder=encoder, flat_forest=flat_forest)
+
+
+def _read_model(model_path: Path) -> LoadedModel:
+    if not model_path.exists():
+        raise FileNotFoundError(f"Model file not found at {model_path}. Run train.py first.")
+    with stage_timer("model_load"):
         try:
-            MODEL_PIPELINE = joblib.load(model_path)
-            print(f"✅ Model pipeline loaded successfully from {model_path}.")
+            # The bundle can only serve the fast path with the compiled forest
+            if FAST_INFERENCE and INFERENCE_BACKEND == 'flat':
+                model = load_serving_bundle(model_path)
+                if model is not None:
+                    return model
+            file_stat = model_path.stat()
+            version = file_digest(model_path)
+            # Uncompressed artifacts can be memory-mapped: NumPy arrays stay in the page cache
+            pipeline = joblib.load(model_path, mmap_mode='r' if MODEL_MMAP else None)
         except Exception as e:
             raise RuntimeError(f"Error loading model: {e}")
+        return LoadedModel(pipeline, model_path, version, file_stat)
+
+
+def load_challenger_models(challenger_dir: Path = CHALLENGER_DIR,
+                           names: List[str] = None) -> Dict[str, LoadedModel]:
+    """Loads the challenger artifacts saved by train.py (all of them, or only `names`)."""
+    models = {}
+    for path in sorted(challenger_dir.glob('*.pkl')) if challenger_dir.exists() else []:
+        if not names or path.stem in names:
+            models[path.stem] = _read_model(path)
+    return models
+
+
+def load_cascade_stage(model: LoadedModel, config_path: Path = CASCADE_CONFIG_PATH,
+                       challenger_dir: Path = CHALLENGER_DIR):
+    """
+    Returns the calibrated cascade stage for `model`, or None.
+
+    The band is only used with the artifacts it was calibrated on: the served model and
+    the cheap challenger must both match the content hashes recorded by train.py.
+    """
+    if not config_path.exists():
+        return None
+    with open(config_path) as f:
+        config = json.load(f)
+    cheap_path = challenger_dir / f"{config['cheap_model']}.pkl"
+    if config['source_version'] != model.version or not cheap_path.exists() \
+            or file_digest(cheap_path) != config['cheap_version']:
+        return None
+    cheap = _read_model(cheap_path)
+    if cheap.encoder is None or list(cheap.classes_) != list(model.classes_):
+        return None
+    return CascadeStage(cheap, config['low'], config['high'])
+
+
+def _attach_cascade(model: LoadedModel):
+    # Unpickles the cheap pipeline (and so imports scikit-learn): never on the startup path
+    if CASCADE_ENABLED and model.cascade is None:
+        model.cascade = load_cascade_stage(model)
+        if model.cascade is not None:
+            print(f"Cascade enabled: escalating cheap-model probabilities in "
+                  f"[{model.cascade.low:.4f}, {model.cascade.high:.4f}].")
+
+
+def _activate(model: LoadedModel):
+    # A single reference assignment: in-flight requests keep their own snapshot
+    global ACTIVE_MODEL, MODEL_PIPELINE
+    ACTIVE_MODEL = model
+    MODEL_PIPELINE = model._pipeline
+
+
+def get_active_model(model_path: Path = MODEL_PATH) -> LoadedModel:
+    """Returns the active model snapshot, loading it on first use."""
+    model = ACTIVE_MODEL
+    if model is None:
+        with _MODEL_LOCK:
+            if ACTIVE_MODEL is None:
+                model = _read_model(model_path)
+                _activate(model)
+                print(f"✅ Model pipeline loaded successfully from {model_path}.")
+            model = ACTIVE_MODEL
+    return model
+
 
-    return MODEL_PIPELINE
+def attach_active_cascade(model_path: Path = MODEL_PATH):
+    """
+    Attaches the calibrated cascade (CASCADE_ENABLED) to the active model.
 
+    Meant for a background thread after startup: until it returns, requests are served
+    by the model alone. Hot reloads attach the cascade before swapping a model in.
+    """
+    _attach_cascade(get_active_model(model_path))
 
-def predict_heart_disease(input_data: Dict[str, Union[int, float]]):
+
+def load_model_pipeline(model_path: Path = MODEL_PATH):
+    """Loads the trained model pipeline from the specified path."""
+    return get_active_model(model_path).pipeline
+
+
+def reload_model_if_changed(model_path: Path = MODEL_PATH) -> bool:
+    """
+    Loads, warms up and swaps in the artifact at `model_path` if it changed.
+
+    A cheap mtime/size check runs first; the content hash decides whether the file really
+    is a different model. Returns True when a new model was activated.
+    """
+    current = ACTIVE_MODEL
+    if current is None:
+        get_active_model(model_path)
+        return True
+
+    file_stat = model_path.stat()
+    if (file_stat.st_mtime_ns, file_stat.st_size) == current.file_signature \
+            and model_path == current.path:
+        # The cascade band is written after the model: pick it up once it matches
+        _attach_cascade(current)
+        return False
+    if file_digest(model_path) == current.version:
+        current.file_signature = (file_stat.st_mtime_ns, file_stat.st_size)
+        return False
+
+    candidate = _read_model(model_path)
+    _attach_cascade(candidate)
+    candidate.warm_up()
+    with _MODEL_LOCK:
+        _activate(candidate)
+    print(f"🔄 Model reloaded from {model_path}: {current.version} -> {candidate.version}")
+    return True
+
+
+class ModelWatcher(threading.Thread):
+    """Background thread polling the model artifact and hot-swapping it when it changes."""
+
+    def __init__(self, model_path: Path = MODEL_PATH, interval_s: float = 30.0,
+                 on_reload: Callable[[LoadedModel], None] = None):
+        super().__init__(name="model-watcher", daemon=True)
+        self.model_path = model_path
+        self.interval_s = interval_s
+        # Called (on this thread) with every newly activated model
+        self.on_reload = on_reload
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval_s):
+            try:
+                if self.model_path.exists() and reload_model_if_changed(self.model_path) \
+                        and self.on_reload is not None:
+                    self.on_reload(ACTIVE_MODEL)
+            except Exception as e:
+                # Keep serving the current model; the next poll retries
+                print(f"Model reload failed, keeping the active model: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def _records_to_columns(input_data) -> Dict[str, list]:
+    if isinstance(input_data, dict):
+        return input_data
+    return {feature: [record[feature] for record in input_data] for feature in input_data[0]}
+
+
+def _format_results(classes, probabilities):
+    # The class is derived from the single predict_proba call (same rule as predict)
+    predictions = classes[np.argmax(probabilities, axis=1)]
+    return [
+        {"prediction": int(prediction), "probability": round(float(probability), 4)}
+        for prediction, probability in zip(predictions, probabilities[:, 1])
+    ]
+
+
+def predict_heart_disease(input_data: Dict[str, Union[int, float]], fast: bool = FAST_INFERENCE):
     """Makes a prediction using the loaded model pipeline."""
-    pipeline = load_model_pipeline()
+    model = get_active_model()
+    probabilities = model.predict_proba_record(input_data, fast=fast)
+    with stage_timer("format"):
+        return _format_results(model.classes_, probabilities)[0]
+
+
+def predict_heart_disease_batch(input_data: Union[List[Dict[str, Union[int, float]]],
+                                                  Dict[str, List[Union[int, float]]]],
+                                fast: bool = FAST_INFERENCE, model: LoadedModel = None):
+    """
+    Scores a batch of records with a single pass through the model pipeline.
+
+    Accepts either a list of records or a dictionary of equally sized columns.
+    Results are returned in the same order as the input rows.
+    """
+    model = model or get_active_model()
+    if len(input_data) == 0:
+        return []
+
+    probabilities = model.predict_proba_batch(input_data, fast=fast)
+    with stage_timer("format"):
+        return _format_results(model.classes_, probabilities)
+
+
+def predict_heart_disease_columns(columns: Dict[str, np.ndarray], fast: bool = FAST_INFERENCE,
+                                  model: LoadedModel = None):
+    """
+    Scores a dictionary of NumPy feature columns and returns the (predictions, probabilities)
+    arrays, without building a result dictionary per row.
+
+    Used for decoded binary payloads; the prediction cache is bypassed (its keys are
+    per record). Probabilities are rounded like the dictionary results.
+    """
+    model = model or get_active_model()
+    probabilities = model.predict_proba_batch(columns, fast=fast)
+    with stage_timer("format"):
+        return model.classes_[np.argmax(probabilities, axis=1)], probabilities[:, 1].round(4)
+
+
+def _columns_to_records(columns: Dict[str, list]) -> List[Dict]:
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*(columns[name] for name in names))]
+
+
+def predict_heart_disease_batch_cached(input_data: Union[List[Dict[str, Union[int, float]]],
+                                                         Dict[str, List[Union[int, float]]]]):
+    """
+    `predict_heart_disease_batch` behind the prediction cache (when enabled).
+
+    Only the records missing from the cache are sent to the model, in one batch.
+    """
+    if PREDICTION_CACHE is None:
+        return predict_heart_disease_batch(input_data)
+
+    model = get_active_model()
+    # Cascade predictions may differ from the served model's: they get their own entries
+    scoring_version = model.version if model.cascade is None else f"{model.version}+cascade"
+    PREDICTION_CACHE.sync_model_version(scoring_version)
 
-    # Convert input dictionary to a Pandas DataFrame
-    input_df = pd.DataFrame([input_data])
+    with stage_timer("cache_lookup"):
+        records = _columns_to_records(input_data) if isinstance(input_data, dict) else input_data
+        keys = [make_cache_key(record, scoring_version) for record in records]
+        results = [PREDICTION_CACHE.get(key) for key in keys]
 
-    # The pipeline handles all preprocessing
-    prediction = pipeline.predict(input_df)[0]
-    probability = pipeline.predict_proba(input_df)[0][1]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        scored = predict_heart_disease_batch([records[i] for i in missing], model=model)
+        for i, result in zip(missing, scored):
+            PREDICTION_CACHE.put(keys[i], result)
+            results[i] = result
 
-    return {
-        "prediction": int(prediction),
-        "probability": round(probability, 4)
-    }
+    return results
@@ -1,5 +1,6 @@
 # src/preprocess.py
 
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
@@ -11,44 +12,83 @@ from src.config import (
     RAW_DATA_PATH  # Import RAW_DATA_PATH from config
 )
 
+# Compact dtypes for the cleaned data: every categorical code (and the raw 0-4 target)
+# fits in int8, and float32 is ample precision for the clinical measurements.
+COLUMN_DTYPES = {
+    **{feature: np.float32 for feature in NUMERICAL_FEATURES},
+    **{feature: np.int8 for feature in CATEGORICAL_FEATURES},
+    TARGET_COLUMN: np.int8,
+}
 
-def preprocess_and_split(raw_df: pd.DataFrame):
-    """
-    Cleans, transforms, and splits the raw data, handling specific UCI dataset quirks.
-    """
 
-    # 1. Data Cleaning
-    # (Handling '?' as missing values - already loaded as NaN in download_dataset.py)
-    # The download script loads '?' as NaN. We drop rows with ANY missing value (ca or thal).
-    df = raw_df.copy()
-    initial_shape = df.shape[0]
+def _representable(values: np.ndarray, dtype) -> np.ndarray:
+    """Mask of the values that a cast to `dtype` keeps unchanged (never NaN)."""
+    dtype = np.dtype(dtype)
+    with np.errstate(invalid='ignore'):
+        if dtype.kind in 'iu':
+            info = np.iinfo(dtype)
+            return (values >= info.min) & (values <= info.max) & (values == np.round(values))
+        return np.abs(values) <= np.finfo(dtype).max
 
-    # Drop rows containing missing values (NaN resulted from '?' in ca and thal)
-    df.dropna(inplace=True)
 
-    print(f"Data Cleaning: Dropped {initial_shape - df.shape[0]} "
-          f"rows containing missing values ('?').")
+def clean_feature_frame(raw_df: pd.DataFrame, subset: list = None) -> pd.DataFrame:
+    """
+    Applies the UCI-specific cleaning to a frame of raw records.
 
-    # 2. Type Conversion (Crucial for UCI Cleveland data)
-    # The 'ca' (number of major vessels) and 'thal' (thallium stress test) columns # noqa: E501
-    # were loaded as objects/strings due to the original '?' values. We must convert them to numeric. # noqa: E501
-    # We must also convert to integer type to be treated as categorical features in the pipeline. # noqa: E501
-    df['ca'] = pd.to_numeric(df['ca'], errors='coerce').astype(int)
-    df['thal'] = pd.to_numeric(df['thal'], errors='coerce').astype(int)
+    Rows with a missing value (in `subset`, default: any column) are dropped and known
+    columns are cast to compact dtypes (`ca`/`thal` become integers like every other
+    categorical). Works on full datasets and on chunks streamed for batch scoring.
 
-    # 3. Target Encoding: Convert 0-4 targets to binary (0=No Disease, 1=Disease)
-    # The 'target' column in the UCI Cleveland data is 0-4.
-    df[TARGET_COLUMN] = df[TARGET_COLUMN].apply(lambda x: 1 if x > 0 else 0)
+    A value the compact dtype cannot hold exactly (e.g. thal=300 or a fractional code,
+    which an int8 cast would silently wrap or truncate) counts as missing. Columns outside
+    `subset` that hold such values keep their original dtype instead.
+
+    The frame is built column by column in its final dtypes: there is no full-frame copy
+    followed by in-place drops and casts, so the extra memory is about one raw column.
+    """
+    # 1. Data Cleaning
+    # (Handling '?' as missing values - already loaded as NaN in download_dataset.py)
+    # The 'ca' (number of major vessels) and 'thal' (thallium stress test) columns can still
+    # arrive as objects/strings due to the original '?' values, so those are converted to
+    # numeric first (unparseable values become NaN and are dropped with the other gaps).
+    columns = {
+        name: pd.to_numeric(series, errors='coerce')
+        if name in COLUMN_DTYPES and not pd.api.types.is_numeric_dtype(series) else series
+        for name, series in raw_df.items()
+    }
+
+    # We drop rows with ANY missing value (NaN resulted from '?' in ca and thal), and rows
+    # with values out of range for the compact dtypes.
+    checked = raw_df.columns if subset is None else subset
+    keep = np.ones(len(raw_df), dtype=bool)
+    for name in checked:
+        if name in COLUMN_DTYPES:
+            keep &= _representable(columns[name].to_numpy(), COLUMN_DTYPES[name])
+        else:
+            keep &= columns[name].notna().to_numpy()
+
+    # 2. Type Conversion: one filtered, compact array per column
+    def compact(name, values):
+        dtype = COLUMN_DTYPES.get(name)
+        if dtype is None or name not in checked and not _representable(values, dtype).all():
+            return values
+        return values.astype(dtype, copy=False)
+
+    return pd.DataFrame(
+        {name: compact(name, series.to_numpy()[keep]) for name, series in columns.items()},
+        index=raw_df.index[keep], copy=False  # keep the arrays as-is (no block consolidation)
+    )
 
-    print(f"Target distribution after binarization (0=No Disease, 1=Disease):\n"
-          f"{df[TARGET_COLUMN].value_counts()}")
 
-    X = df.drop(TARGET_COLUMN, axis=1)
-    y = df[TARGET_COLUMN]
+def binarize_target(target: pd.Series) -> pd.Series:
+    """Converts the 0-4 UCI target to binary (0=No Disease, 1=Disease) with one comparison."""
+    return (target > 0).astype(np.int8)
 
-    # 4. Define Preprocessing Transformer (Scaling and Encoding)
+
+def build_preprocessor() -> ColumnTransformer:
+    """Defines the (unfitted) scaling and encoding transformer."""
     # This remains robust due to scikit-learn's ColumnTransformer structure.
-    preprocessor = ColumnTransformer(
+    return ColumnTransformer(
         transformers=[
             ('num', StandardScaler(), NUMERICAL_FEATURES),
             ('cat', OneHotEncoder(handle_unknown='ignore', sparse_output=False),
@@ -57,16 +97,40 @@ def preprocess_and_split(raw_df: pd.DataFrame):
         remainder='passthrough'
     )
 
-    preprocessor.fit(X)
 
-    create_dirs([DATA_PROCESSED_DIR])
-    print("Preprocessor fitted successfully.")
+def preprocess_and_split(raw_df: pd.DataFrame):
+    """
+    Cleans, transforms, and splits the raw data, handling specific UCI dataset quirks.
+    """
 
-    # 5. Split Data
+    # 1-2. Data Cleaning and Type Conversion (shared with offline batch scoring)
+    initial_shape = raw_df.shape[0]
+    df = clean_feature_frame(raw_df)
+
+    print(f"Data Cleaning: Dropped {initial_shape - df.shape[0]} "
+          f"rows containing missing ('?') or invalid values.")
+
+    # 3. Target Encoding: Convert 0-4 targets to binary (0=No Disease, 1=Disease)
+    # The 'target' column in the UCI Cleveland data is 0-4.
+    y = binarize_target(df[TARGET_COLUMN])
+    X = df.drop(columns=TARGET_COLUMN)
+
+    print(f"Target distribution after binarization (0=No Disease, 1=Disease):\n"
+          f"{y.value_counts()}")
+
+    # 4. Split Data
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y
     )
 
+    # 5. Fit the Preprocessing Transformer (Scaling and Encoding) on the training split only,
+    # so no test-set statistics leak into the scaler or the encoder categories
+    preprocessor = build_preprocessor()
+    preprocessor.fit(X_train)
+
+    create_dirs([DATA_PROCESSED_DIR])
+    print("Preprocessor fitted successfully.")
+
     return X_train, X_test, y_train, y_test, preprocessor
 
 
@@ -0,0 +1,145 @@
+# src/search.py
+
+import time
+import numpy as np
+import mlflow
+import mlflow.sklearn
+from joblib import Parallel, delayed
+from mlflow.entities import Metric, Param
+from mlflow.tracking import MlflowClient
+from sklearn.base import clone
+from sklearn.model_selection import ParameterGrid, ParameterSampler, StratifiedKFold
+from sklearn.pipeline import Pipeline
+from src.config import (
+    RAW_DATA_PATH, MODEL_DIR, RANDOM_STATE, MLFLOW_EXPERIMENT_NAME, SEARCH_SPACES,
+    SEARCH_STRATEGY, SEARCH_N_ITER, SEARCH_CV_FOLDS, SEARCH_METRIC, SEARCH_N_JOBS
+)
+from src.utils import get_metrics, create_dirs
+from src.dataset_store import load_dataset_split, resolve_source
+from src.train import MODEL_CLASS_MAP, save_model_artifacts
+
+
+def expand_search_space(search_spaces: dict = SEARCH_SPACES, strategy: str = SEARCH_STRATEGY,
+                        n_iter: int = SEARCH_N_ITER):
+    """Expands the configured search spaces into a list of (model name, model key, params)."""
+    candidates = []
+    for name, spec in search_spaces.items():
+        if strategy == "grid":
+            sampled = ParameterGrid(spec["space"])
+        elif strategy == "random":
+            sampled = ParameterSampler(spec["space"], n_iter=n_iter, random_state=RANDOM_STATE)
+        else:
+            raise ValueError(f"Unknown search strategy: {strategy}")
+        for params in sampled:
+            candidates.append((name, spec["model"], {**spec.get("base_params", {}), **params}))
+    return candidates
+
+
+def build_fold_cache(preprocessor, X_train, y_train, n_folds: int = SEARCH_CV_FOLDS):
+    """
+    Fits the preprocessor once per CV fold and caches the transformed arrays.
+
+    Candidates only differ in the classifier, so they all reuse these arrays instead of
+    refitting the ColumnTransformer for every (candidate, fold) pair.
+    """
+    folds = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=RANDOM_STATE)
+    y = np.asarray(y_train)
+    cache = []
+    for train_idx, val_idx in folds.split(X_train, y):
+        fold_preprocessor = clone(preprocessor).fit(X_train.iloc[train_idx])
+        cache.append((
+            fold_preprocessor.transform(X_train.iloc[train_idx]), y[train_idx],
+            fold_preprocessor.transform(X_train.iloc[val_idx]), y[val_idx]
+        ))
+    return cache
+
+
+def evaluate_candidate_fold(model_key: str, params: dict, fold):
+    """Fits one candidate on one cached fold and returns its validation metrics."""
+    X_fit, y_fit, X_val, y_val = fold
+    model = MODEL_CLASS_MAP[model_key](**params).fit(X_fit, y_fit)
+    y_prob = model.predict_proba(X_val)[:, 1]
+    return get_metrics(y_val, model.predict(X_val), y_prob)
+
+
+def log_child_runs(client: MlflowClient, experiment_id: str, parent_run_id: str, results):
+    """Logs every candidate as a child run with a single batched request per run."""
+    timestamp = int(time.time() * 1000)
+    for run_name, params, metrics in results:
+        run = client.create_run(experiment_id, run_name=run_name,
+                                tags={"mlflow.parentRunId": parent_run_id})
+        client.log_batch(
+            run.info.run_id,
+            metrics=[Metric(key, float(value), timestamp, 0) for key, value in metrics.items()],
+            params=[Param(key, str(value)) for key, value in params.items()]
+        )
+        client.set_terminated(run.info.run_id)
+
+
+def run_hyperparameter_search(metric: str = SEARCH_METRIC, n_jobs: int = SEARCH_N_JOBS,
+                              data_source=RAW_DATA_PATH):
+    """Cross-validated, parallel search over SEARCH_SPACES; saves the best pipeline."""
+
+    mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
+    create_dirs([MODEL_DIR])
+
+    if not resolve_source(data_source).exists():
+        print("Raw data not found. Please run download_dataset.py first.")
+        return
+
+    # 1. Preprocess and Split (the test split is only used for the final model)
+    X_train, X_test, y_train, y_test, preprocessor = load_dataset_split(data_source)
+
+    # 2. Cache the per-fold preprocessed arrays and expand the candidates
+    fold_cache = build_fold_cache(preprocessor, X_train, y_train)
+    candidates = expand_search_space()
+    print(f"\n--- Hyperparameter search: {len(candidates)} candidates x "
+          f"{len(fold_cache)} folds, selecting by mean CV {metric} ---")
+
+    # 3. Evaluate every (candidate, fold) pair in parallel across cores
+    start = time.perf_counter()
+    fold_metrics = Parallel(n_jobs=n_jobs)(
+        delayed(evaluate_candidate_fold)(model_key, params, fold)
+        for _, model_key, params in candidates
+        for fold in fold_cache
+    )
+    print(f"Search finished in {time.perf_counter() - start:.1f}s")
+
+    results = []
+    for i, (name, model_key, params) in enumerate(candidates):
+        per_fold = fold_metrics[i * len(fold_cache):(i + 1) * len(fold_cache)]
+        metrics = {key: float(np.mean([m[key] for m in per_fold])) for key in per_fold[0]}
+        results.append((f"{name} #{i}", params, metrics))
+
+    best_index = max(range(len(results)), key=lambda i: results[i][2][metric])
+    best_run_name, best_params, best_cv_metrics = results[best_index]
+    best_name, best_model_key, _ = candidates[best_index]
+
+    # 4. Refit the winner on the full training split and evaluate it on the test split
+    best_pipeline = Pipeline(steps=[
+        ('preprocessor', clone(preprocessor)),
+        ('classifier', MODEL_CLASS_MAP[best_model_key](**best_params))
+    ])
+    best_pipeline.fit(X_train, y_train)
+    y_prob = best_pipeline.predict_proba(X_test)[:, 1]
+    test_metrics = get_metrics(y_test, best_pipeline.predict(X_test), y_prob)
+
+    # 5. Log all candidates as children of one parent run, then the winning pipeline
+    with mlflow.start_run(run_name="Hyperparameter Search") as parent:
+        log_child_runs(MlflowClient(), parent.info.experiment_id, parent.info.run_id, results)
+        mlflow.log_params({"best_candidate": best_run_name, "selection_metric": metric,
+                           "strategy": SEARCH_STRATEGY, "cv_folds": len(fold_cache)})
+        mlflow.log_metrics({**{f"cv_{k}": v for k, v in best_cv_metrics.items()},
+                            **{f"test_{k}": v for k, v in test_metrics.items()}})
+        mlflow.sklearn.log_model(
+            sk_model=best_pipeline,
+            artifact_path="model",
+            registered_model_name=f"{best_name.replace(' ', '_')}_Pipeline"
+        )
+
+    save_model_artifacts(best_pipeline, reference_data=X_train)
+    print(f"\n🏆 Best Model: {best_run_name} {best_params}")
+    print(f"CV Metrics: {best_cv_metrics}")
+    print(f"Test Metrics: {test_metrics}")
+
+    return best_pipeline, test_metrics
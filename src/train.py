@@ -1,6 +1,8 @@
 # src/train.py
 
-import pandas as pd
+import argparse
+import os
+import shutil
 import mlflow
 import mlflow.sklearn
 import joblib
@@ -8,11 +10,14 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.pipeline import Pipeline
 from src.config import (
-    RAW_DATA_PATH, MODEL_PATH, MODEL_DIR, MODEL_CONFIGS,
-    BEST_MODEL_NAME, MLFLOW_EXPERIMENT_NAME
+    RAW_DATA_PATH, MODEL_PATH, MODEL_DIR, FLAT_MODEL_DIR, CHALLENGER_DIR, MODEL_CONFIGS,
+    BEST_MODEL_NAME, MLFLOW_EXPERIMENT_NAME, DRIFT_REFERENCE_PATH, CASCADE_CHEAP_MODEL
 )
 from src.utils import get_metrics, create_dirs
-from src.preprocess import preprocess_and_split
+from src.evaluation import bootstrap_metrics, threshold_sweep, best_threshold
+from src.dataset_store import load_dataset_split, resolve_source
+from src.inference import build_flat_forest, build_fast_encoder, file_digest, flat_export_dir
+from src.drift import build_reference, save_reference
 
 # Map model names (strings) to actual classes
 MODEL_CLASS_MAP = {
@@ -44,11 +49,22 @@ def train_and_log_model(model_name: str, model_config: dict, preprocessor,
         y_pred = full_pipeline.predict(X_test)
         y_prob = full_pipeline.predict_proba(X_test)[:, 1]
         metrics = get_metrics(y_test, y_pred, y_prob)
+        # The test split is small: bootstrap intervals show how far apart models really are
+        intervals = bootstrap_metrics(y_test, y_prob)
+        sweep = threshold_sweep(y_test, y_prob)
 
         # 4. Log Parameters and Metrics
         mlflow.log_params(model_config['params'])
         mlflow.log_metrics(metrics)
+        mlflow.log_metrics({f"{name}_ci_{bound}": interval[f"ci_{bound}"]
+                            for name, interval in intervals.items() for bound in ("low", "high")})
+        mlflow.log_metric("best_f1_threshold", best_threshold(sweep, "f1"))
+        mlflow.log_dict({key: values.tolist() for key, values in sweep.items()},
+                        "threshold_sweep.json")
         print(f"Metrics logged for {model_name}: {metrics}")
+        print("Bootstrap CIs: " + ", ".join(
+            f"{name} [{interval['ci_low']:.3f}, {interval['ci_high']:.3f}]"
+            for name, interval in intervals.items()))
 
         # 5. Save the complete pipeline as an artifact in MLflow
         mlflow.sklearn.log_model(
@@ -60,20 +76,19 @@ def train_and_log_model(model_name: str, model_config: dict, preprocessor,
         return full_pipeline, metrics
 
 
-def run_training_pipeline():
+def run_training_pipeline(data_source=RAW_DATA_PATH):
     """Executes the end-to-end training process."""
 
     mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
     create_dirs([MODEL_DIR])
 
-    if not RAW_DATA_PATH.exists():
+    if not resolve_source(data_source).exists():
         print("Raw data not found. Please run download_dataset.py first.")
         return
 
-    raw_df = pd.read_csv(RAW_DATA_PATH)
-
-    # 1. Preprocess and Split
-    X_train, X_test, y_train, y_test, preprocessor = preprocess_and_split(raw_df)
+    # 1. Preprocess and Split (parsed and cleaned once per raw file, then served from the
+    # dataset store)
+    X_train, X_test, y_train, y_test, preprocessor = load_dataset_split(data_source)
 
     # 2. Train and Log Models
     all_pipelines = {}
@@ -88,11 +103,125 @@ def run_training_pipeline():
     # 3. Select and Save the Best Model
     best_pipeline = all_pipelines[BEST_MODEL_NAME]
 
-    joblib.dump(best_pipeline, MODEL_PATH)
+    save_model_artifacts(best_pipeline, reference_data=X_train)
+    save_challenger_artifacts({name: pipeline for name, pipeline in all_pipelines.items()
+                               if name != BEST_MODEL_NAME})
+
+    # 4. Calibrate the cheap-first cascade (the cheap model is served from its challenger)
+    if CASCADE_CHEAP_MODEL in all_pipelines and CASCADE_CHEAP_MODEL != BEST_MODEL_NAME:
+        from src.cascade import calibrate_and_save_cascade
+        calibrate_and_save_cascade(
+            best_pipeline, all_pipelines[CASCADE_CHEAP_MODEL],
+            CHALLENGER_DIR / f"{challenger_slug(CASCADE_CHEAP_MODEL)}.pkl",
+            X_train, y_train, X_test, y_test
+        )
     print(f"\n🏆 Best Model: {BEST_MODEL_NAME}")
-    print(f"Model saved to: {MODEL_PATH}")
     print(f"Test Metrics: {all_metrics[BEST_MODEL_NAME]}")
 
 
+def save_model_artifacts(pipeline, reference_data=None):
+    """
+    Saves the serving artifact (and its flat forest export, for tree ensembles).
+
+    When `reference_data` (the training features) is given, its drift reference sketches
+    are saved next to the model for the serving drift monitor.
+    """
+
+    # Write to a temporary file and rename, so a serving process polling MODEL_PATH
+    # never picks up a half-written artifact
+    # (compress=0 keeps NumPy arrays uncompressed, so serving can memory-map them)
+    tmp_path = MODEL_PATH.with_suffix('.tmp')
+    joblib.dump(pipeline, tmp_path, compress=0)
+    os.replace(tmp_path, MODEL_PATH)
+    print(f"Model saved to: {MODEL_PATH}")
+
+    # Export tree ensembles as flat arrays for the compiled evaluator, tagged with the
+    # artifact version so serving only memory-maps an export that matches the model.
+    # With the encoder parameters next to it, this is the serving bundle: replicas can
+    # start without unpickling the pipeline (see inference.load_serving_bundle).
+    flat_forest = build_flat_forest(pipeline)
+    if flat_forest is not None:
+        export_dir = export_serving_bundle(flat_forest, build_fast_encoder(pipeline),
+                                           file_digest(MODEL_PATH))
+        print(f"Flat forest ({flat_forest.n_trees} trees, depth {flat_forest.depth}) "
+              f"exported to: {export_dir}")
+
+    if reference_data is not None:
+        save_reference(build_reference(reference_data, source_version=file_digest(MODEL_PATH)),
+                       DRIFT_REFERENCE_PATH)
+        print(f"Drift reference sketches saved to: {DRIFT_REFERENCE_PATH}")
+
+
+def export_serving_bundle(flat_forest, encoder, version: str,
+                          flat_model_dir=FLAT_MODEL_DIR):
+    """
+    Writes the flat forest (and encoder) export for artifact `version` into its own directory.
+
+    The files are written to a temporary directory that is renamed into place, so serving
+    processes never see a partial export, and an existing export is never rewritten: its
+    arrays may be memory-mapped by running replicas. Exports of other versions are then
+    removed (on POSIX, processes that still map their files keep them until they unmap).
+    """
+    export_dir = flat_export_dir(version, flat_model_dir)
+    if not (export_dir / 'metadata.json').exists():
+        tmp_dir = export_dir.with_name(export_dir.name + '.tmp')
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if encoder is not None:
+            encoder.save(tmp_dir, source_version=version)
+        flat_forest.save(tmp_dir, source_version=version)
+        shutil.rmtree(export_dir, ignore_errors=True)
+        os.replace(tmp_dir, export_dir)
+
+    for path in flat_model_dir.iterdir():
+        if path != export_dir:
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink()  # files of the old, unversioned layout
+    return export_dir
+
+
+def challenger_slug(model_name: str) -> str:
+    """File stem (and metrics label) of a challenger, e.g. "logistic_regression"."""
+    return model_name.lower().replace(' ', '_')
+
+
+def save_challenger_artifacts(pipelines: dict):
+    """
+    Saves the non-served pipelines for shadow scoring (api/shadow.py).
+
+    Challengers left over from earlier runs are removed, so the directory always holds
+    the alternatives to the current model.
+    """
+    create_dirs([CHALLENGER_DIR])
+    written = set()
+    for name, pipeline in pipelines.items():
+        path = CHALLENGER_DIR / f"{challenger_slug(name)}.pkl"
+        tmp_path = path.with_suffix('.tmp')
+        joblib.dump(pipeline, tmp_path, compress=0)
+        os.replace(tmp_path, path)
+        written.add(path)
+        print(f"Challenger '{name}' saved to: {path}")
+    for stale in set(CHALLENGER_DIR.glob('*.pkl')) - written:
+        stale.unlink()
+
+
 if __name__ == "__main__":
-    run_training_pipeline()
+    parser = argparse.ArgumentParser(description="Train the heart disease models.")
+    parser.add_argument("--search", action="store_true",
+                        help="Run the cross-validated hyperparameter search (SEARCH_SPACES)")
+    parser.add_argument("--data", default=str(RAW_DATA_PATH),
+                        help="Raw dataset: a local path or file:// URL (default: RAW_DATA_PATH)")
+    parser.add_argument("--incremental", metavar="NEW_ROWS_CSV",
+                        help="Fold new labeled rows into the incremental checkpoint "
+                             "instead of retraining from scratch")
+    args = parser.parse_args()
+
+    if args.incremental:
+        from src.incremental import run_incremental_update
+        run_incremental_update(args.incremental, data_source=args.data)
+    elif args.search:
+        from src.search import run_hyperparameter_search
+        run_hyperparameter_search(data_source=args.data)
+    else:
+        run_training_pipeline(args.data)
@@ -1,11 +1,14 @@
 # src/utils.py
 
-from sklearn.metrics import accuracy_score, precision_score, recall_score, roc_auc_score
+import hashlib
 from pathlib import Path
 
 
 def get_metrics(y_true, y_pred, y_prob):
     """Calculates and returns key classification metrics."""
+    # Imported here: the serving path uses this module and must not load sklearn
+    from sklearn.metrics import accuracy_score, precision_score, recall_score, roc_auc_score
+
     return {
         "accuracy": accuracy_score(y_true, y_pred),
         "precision": precision_score(y_true, y_pred),
@@ -18,3 +21,12 @@ def create_dirs(paths: list[Path]):
     """Creates directories if they do not exist."""
     for path in paths:
         path.mkdir(parents=True, exist_ok=True)
+
+
+def file_sha256(path: Path) -> str:
+    """SHA-256 hex digest of a file, read in 1 MiB blocks (constant memory)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,538 @@
+# tests/test_api.py
+
+import os
+import sys
+import pytest
+import json
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from src.config import MODEL_PATH
+
+
+# --- Fixtures ---
+
+@pytest.fixture(scope="session")
+def client():
+    """Create a test client for the FastAPI app (requires a trained model)."""
+    if not MODEL_PATH.exists():
+        pytest.fail(f"Model file not found at {MODEL_PATH}. Run src/train.py first.")
+    from api.main import app
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def sample_inputs():
+    """Load sample inputs for API tests."""
+    with open("tests/sample_input.json", 'r') as f:
+        return json.load(f)
+
+
+# --- Batch Endpoint Tests ---
+
+def test_batch_records_match_single_predictions(client, sample_inputs):
+    """Test that /predict/batch returns the same results, in order, as repeated /predict calls."""
+    records = [sample['input'] for sample in sample_inputs] * 3
+
+    response = client.post("/predict/batch", json={"records": records})
+    assert response.status_code == 200
+    body = response.json()
+    assert body['count'] == len(records)
+
+    for record, batch_result in zip(records, body['predictions']):
+        single_result = client.post("/predict", json=record).json()
+        assert batch_result == single_result
+
+
+def test_batch_columns_match_records(client, sample_inputs):
+    """Test that the columnar layout scores identically to the row layout."""
+    records = [sample['input'] for sample in sample_inputs]
+    columns = {name: [record[name] for record in records] for name in records[0]}
+
+    by_rows = client.post("/predict/batch", json={"records": records}).json()
+    by_columns = client.post("/predict/batch", json={"columns": columns}).json()
+    assert by_rows == by_columns
+
+
+def test_batch_rejects_invalid_payloads(client, sample_inputs):
+    """Test ragged columns, ambiguous layouts and oversized batches are rejected."""
+    from src.config import MAX_BATCH_SIZE
+
+    record = sample_inputs[0]['input']
+    columns = {name: [value] for name, value in record.items()}
+    ragged = dict(columns, age=[record['age'], record['age']])
+
+    assert client.post("/predict/batch", json={"columns": ragged}).status_code == 422
+    assert client.post("/predict/batch",
+                       json={"records": [record], "columns": columns}).status_code == 422
+
+    # Oversized batches are a 413 even when they also hold invalid values
+    oversized = [dict(record, age=500)] + [record] * MAX_BATCH_SIZE
+    assert client.post("/predict/batch", json={"records": oversized}).status_code == 413
+    assert client.post("/predict/batch", json={"columns": {
+        name: [value] * (MAX_BATCH_SIZE + 1) for name, value in record.items()}}).status_code \
+        == 413
+
+
+# --- Micro-batching Tests ---
+
+def test_micro_batcher_groups_concurrent_requests():
+    """Test that concurrent submissions are scored together and resolved to the right caller."""
+    import asyncio
+    from api.batching import MicroBatcher
+
+    batch_sizes = []
+
+    def score_batch(records):
+        batch_sizes.append(len(records))
+        return [{"echo": record["id"]} for record in records]
+
+    async def run():
+        batcher = MicroBatcher(score_batch, max_batch_size=4, max_wait_ms=50)
+        results = await asyncio.gather(*(batcher.submit({"id": i}) for i in range(10)))
+        await batcher.close()
+        return results
+
+    results = asyncio.run(run())
+
+    assert [result["echo"] for result in results] == list(range(10))
+    assert sum(batch_sizes) == 10
+    assert max(batch_sizes) == 4
+
+
+def test_micro_batcher_close_cancels_pending_callers():
+    """Test that close resolves the batch being scored and the queued records alike."""
+    import asyncio
+    import threading
+    from api.batching import MicroBatcher
+
+    scoring = threading.Event()
+    release = threading.Event()
+
+    def score_batch(records):
+        scoring.set()
+        release.wait(5)
+        return [{} for _ in records]
+
+    async def run():
+        batcher = MicroBatcher(score_batch, max_batch_size=2, max_wait_ms=0)
+        callers = [asyncio.ensure_future(batcher.submit({"id": i})) for i in range(2)]
+        await asyncio.to_thread(scoring.wait, 5)  # the first batch is being scored
+        callers += [asyncio.ensure_future(batcher.submit({"id": i})) for i in range(2, 5)]
+        await asyncio.sleep(0)
+        await batcher.close()
+        results = await asyncio.wait_for(asyncio.gather(*callers, return_exceptions=True), 1)
+        release.set()  # let the abandoned scoring thread finish
+        return results
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        release.set()
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+
+
+# --- Observability Tests ---
+
+def test_stage_histograms_exposed_on_metrics(client, sample_inputs):
+    """Test that a prediction records per-stage timings in the Prometheus histogram."""
+    record = dict(sample_inputs[0]['input'], chol=411)  # avoid a prediction cache hit
+    assert client.post("/predict", json=record).status_code == 200
+
+    metrics = client.get("/metrics").text
+    for stage in ["validation", "cache_lookup", "encode", "classifier", "format",
+                  "serialization", "model_load"]:
+        assert f'inference_stage_seconds_count{{stage="{stage}"}}' in metrics
+
+
+def test_drift_scores_exposed_on_metrics(client, sample_inputs):
+    """Test that predictions feed the drift monitor and its scores appear on /metrics."""
+    import api.main
+    if api.main.DRIFT_MONITOR is None:
+        pytest.skip("No drift reference saved next to the model (run src/train.py).")
+
+    observed = api.main.DRIFT_MONITOR.n_observed
+    records = [sample['input'] for sample in sample_inputs]
+    assert client.post("/predict", json=records[0]).status_code == 200
+    assert client.post("/predict/batch", json={"records": records}).status_code == 200
+    assert api.main.DRIFT_MONITOR.n_observed == observed + 1 + len(records)
+
+    metrics = client.get("/metrics").text
+    assert 'feature_drift_psi{feature="age"}' in metrics
+    assert 'feature_drift_ks{feature="chol"}' in metrics
+    assert 'feature_drift_ks{feature="sex"}' not in metrics
+
+    # A model the reference was not built for (e.g. after an incremental update) turns
+    # monitoring off; reloading the trained artifact brings it back
+    monitor = api.main.DRIFT_MONITOR
+    try:
+        api.main.refresh_drift_monitor(SimpleNamespace(version="not-the-reference"))
+        assert api.main.DRIFT_MONITOR is None
+        assert client.post("/predict", json=records[0]).status_code == 200
+        assert "feature_drift_psi{" not in client.get("/metrics").text
+    finally:
+        api.main.refresh_drift_monitor()
+    assert api.main.DRIFT_MONITOR is not None and api.main.DRIFT_MONITOR is not monitor
+    assert client.post("/predict", json=records[0]).status_code == 200
+    assert api.main.DRIFT_MONITOR.n_observed == 1
+    assert 'feature_drift_psi{feature="age"}' in client.get("/metrics").text
+
+
+def test_profile_endpoint_requires_admin_token(client, monkeypatch):
+    """Test that /admin/profile is hidden without a token, rejects bad tokens and samples."""
+    import api.main
+
+    monkeypatch.setattr(api.main, "PROFILING_ADMIN_TOKEN", "")
+    assert client.post("/admin/profile?seconds=0.1").status_code == 404
+
+    monkeypatch.setattr(api.main, "PROFILING_ADMIN_TOKEN", "s3cret")
+    assert client.post("/admin/profile?seconds=0.1",
+                       headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.post("/admin/profile?seconds=600",
+                       headers={"X-Admin-Token": "s3cret"}).status_code == 422
+
+    response = client.post("/admin/profile?seconds=0.2&interval_ms=2&include_idle=true",
+                           headers={"X-Admin-Token": "s3cret"})
+    assert response.status_code == 200
+    profile = response.json()
+    assert profile['samples'] > 0
+    assert profile['top_functions'] and profile['stacks']
+
+    # Samples are grouped per function, whichever of its lines was executing
+    from api.profiling import _frame_label
+    first = _frame_label(sys._getframe())
+    second = _frame_label(sys._getframe())
+    assert first == second
+    assert first.startswith("test_profile_endpoint_requires_admin_token (test_api.py:")
+
+
+# --- Shadow Scoring Tests ---
+
+def test_shadow_scorer_measures_agreement_and_drops_when_saturated(client, sample_inputs):
+    """Test that challengers are compared with served results and excess work is dropped."""
+    import threading
+    import numpy as np
+    from prometheus_client import REGISTRY
+    from api.shadow import ShadowScorer
+    from src.inference import get_active_model, predict_heart_disease_batch
+
+    def sample(name, labels=None):
+        return REGISTRY.get_sample_value(name, labels or {}) or 0.0
+
+    # The served model as its own challenger agrees on every record
+    records = [sample['input'] for sample in sample_inputs]
+    served = predict_heart_disease_batch(records)
+    scorer = ShadowScorer({"same": get_active_model()})
+    scorer.submit(records, served)
+    scorer.close(wait=True)
+    assert sample("shadow_predictions_total", {"model": "same", "outcome": "agree"}) \
+        == len(records)
+    assert sample("shadow_predictions_total", {"model": "same", "outcome": "disagree"}) == 0
+    assert sample("shadow_scoring_seconds_count", {"model": "same"}) == 1
+
+    class BlockedModel:
+        classes_ = np.array([0, 1])
+        release = threading.Event()
+
+        def predict_proba_batch(self, input_data, fast=True):
+            self.release.wait(5)
+            return np.tile([0.0, 1.0], (len(input_data), 1))
+
+    dropped = sample("shadow_batches_dropped_total")
+    scorer = ShadowScorer({"blocked": BlockedModel()}, max_pending=1)
+    scorer.submit(records, served)
+    scorer.submit(records, served)  # the only slot is taken: dropped, not queued
+    assert sample("shadow_batches_dropped_total") == dropped + 1
+    BlockedModel.release.set()
+    scorer.close(wait=True)
+
+
+def test_challengers_shadow_score_live_traffic(client, sample_inputs):
+    """Test that /predict feeds the loaded challengers without changing the response."""
+    import time
+    import api.main
+    from prometheus_client import REGISTRY
+
+    api.main.SHADOW_LOADED.wait(timeout=30)  # challengers load in the background
+    if api.main.SHADOW_SCORER is None:
+        pytest.skip("No challenger models saved (run src/train.py).")
+    name = next(iter(api.main.SHADOW_SCORER.challengers))
+    labels = {"model": name}
+
+    before = REGISTRY.get_sample_value("shadow_scoring_seconds_count", labels) or 0.0
+    assert client.post("/predict", json=dict(sample_inputs[0]['input'], chol=377)).status_code \
+        == 200
+    deadline = time.monotonic() + 5
+    while (REGISTRY.get_sample_value("shadow_scoring_seconds_count", labels) or 0.0) == before \
+            and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert REGISTRY.get_sample_value("shadow_scoring_seconds_count", labels) == before + 1
+    assert 'shadow_predictions_total{model="%s"' % name in client.get("/metrics").text
+
+
+def test_flat_backend_startup_skips_training_dependencies():
+    """Test that importing the app on the flat backend loads neither sklearn nor the challengers."""
+    import subprocess
+    import sys
+
+    script = (
+        "import sys\n"
+        "import api.main\n"
+        "from src.inference import get_active_model\n"
+        "get_active_model()\n"
+        "heavy = [m for m in ('sklearn', 'pandas', 'scipy', 'mlflow') if m in sys.modules]\n"
+        "print(repr((heavy, api.main.SHADOW_SCORER)))\n"
+    )
+    env = dict(os.environ, INFERENCE_BACKEND="flat", SHADOW_ENABLED="true")
+    result = subprocess.run([sys.executable, "-c", script], env=env,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1] == "([], None)"
+
+
+# --- Audit Log Tests ---
+
+def test_audit_logger_buffers_drops_and_rotates(tmp_path):
+    """Test that records are buffered, dropped when full, flushed as JSONL and rotated."""
+    from api.audit import AuditLogger
+
+    path = tmp_path / "requests.jsonl"
+    audit = AuditLogger(str(path), buffer_size=3, max_bytes=400, backup_count=2)
+    for i in range(5):
+        audit.log("/predict", {"age": i}, {"prediction": 0})
+
+    # Only the first three fit in the buffer; nothing touches the disk until a flush
+    assert not path.exists()
+    audit.flush()
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["input"]["age"] for line in lines] == [0, 1, 2]
+    assert lines[0]["endpoint"] == "/predict" and "timestamp" in lines[0]
+
+    for _ in range(3):
+        for i in range(3):
+            audit.log("/predict", {"age": i}, {"prediction": 0})
+        audit.flush()
+    assert (tmp_path / "requests.jsonl.1").exists()
+    assert not (tmp_path / "requests.jsonl.3").exists()
+
+
+# --- Cascade Tests ---
+
+def test_cascade_escalation_counted_on_metrics(client, sample_inputs):
+    """Test that predictions through the calibrated cascade are counted per stage."""
+    from prometheus_client import REGISTRY
+    from src.inference import get_active_model, load_cascade_stage
+
+    model = get_active_model()
+    cascade = load_cascade_stage(model)
+    if cascade is None:
+        pytest.skip("No cascade calibrated for the served model (run src/train.py).")
+
+    def rows(stage):
+        return REGISTRY.get_sample_value("cascade_rows_total", {"stage": stage}) or 0.0
+
+    before = rows("cheap")
+    model.cascade = cascade
+    try:
+        response = client.post("/predict", json=dict(sample_inputs[0]['input'], chol=389))
+    finally:
+        model.cascade = None
+    assert response.status_code == 200
+    assert rows("cheap") == before + 1
+    assert 'cascade_rows_total{stage="cheap"}' in client.get("/metrics").text
+
+
+# --- Binary Payload Tests ---
+
+def test_binary_payloads_match_json(client, sample_inputs):
+    """Test that float32, Arrow and msgpack bodies score like JSON, in the same format."""
+    import numpy as np
+    from api.binary import FEATURE_NAMES
+
+    records = [sample['input'] for sample in sample_inputs] * 3
+    expected = client.post("/predict/batch", json={"records": records}).json()['predictions']
+    expected_pairs = [[result['prediction'], result['probability']] for result in expected]
+    matrix = np.array([[record[name] for name in FEATURE_NAMES] for record in records],
+                      dtype='<f4')
+
+    response = client.post("/predict/batch", content=matrix.tobytes(),
+                           headers={"Content-Type": "application/x-float32"})
+    assert response.status_code == 200
+    assert response.headers['content-type'] == "application/x-float32"
+    np.testing.assert_allclose(np.frombuffer(response.content, dtype='<f4').reshape(-1, 2),
+                               expected_pairs, atol=1e-6)
+
+    response = client.post("/predict", content=matrix[0].tobytes(),
+                           headers={"Content-Type": "application/x-float32"})
+    np.testing.assert_allclose(np.frombuffer(response.content, dtype='<f4'),
+                               expected_pairs[0], atol=1e-6)
+
+    pa = pytest.importorskip("pyarrow")
+    table = pa.table({name: matrix[:, i] for i, name in enumerate(FEATURE_NAMES)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    response = client.post("/predict/batch", content=sink.getvalue().to_pybytes(),
+                           headers={"Content-Type": "application/vnd.apache.arrow.stream"})
+    results = pa.ipc.open_stream(response.content).read_all().to_pydict()
+    assert results['prediction'] == [result['prediction'] for result in expected]
+    np.testing.assert_allclose(results['probability'],
+                               [result['probability'] for result in expected], atol=1e-6)
+
+    msgpack = pytest.importorskip("msgpack")
+    response = client.post("/predict", content=msgpack.packb(records[0]),
+                           headers={"Content-Type": "application/msgpack"})
+    assert msgpack.unpackb(response.content) == client.post("/predict", json=records[0]).json()
+    columns = {name: [record[name] for record in records] for name in FEATURE_NAMES}
+    response = client.post("/predict/batch", content=msgpack.packb(columns),
+                           headers={"Content-Type": "application/msgpack"})
+    assert msgpack.unpackb(response.content) == {
+        "prediction": [result['prediction'] for result in expected],
+        "probability": [result['probability'] for result in expected],
+        "count": len(records)
+    }
+
+
+def test_binary_payloads_are_validated(client, sample_inputs):
+    """Test that binary bodies get the same range and size checks as JSON."""
+    import numpy as np
+    from api.binary import FEATURE_NAMES
+    from src.config import MAX_BATCH_SIZE
+
+    record = sample_inputs[0]['input']
+    matrix = np.array([[record[name] for name in FEATURE_NAMES]] * 4, dtype='<f4')
+    headers = {"Content-Type": "application/x-float32"}
+
+    assert client.post("/predict", json=dict(record, age=500)).status_code == 422
+    for column, value in (("age", 500), ("sex", 0.5), ("chol", np.nan)):
+        invalid = matrix.copy()
+        invalid[2, FEATURE_NAMES.index(column)] = value
+        response = client.post("/predict/batch", content=invalid.tobytes(), headers=headers)
+        assert response.status_code == 422 and column in response.json()['detail']
+
+    assert client.post("/predict/batch", content=matrix.tobytes()[:-4],
+                       headers=headers).status_code == 422
+    oversized = np.repeat(matrix, MAX_BATCH_SIZE, axis=0)
+    oversized[0, 0] = 500
+    assert client.post("/predict/batch", content=oversized.tobytes(),
+                       headers=headers).status_code == 413
+    assert client.post("/predict", content=matrix.tobytes(), headers=headers).status_code == 422
+    assert client.post("/predict/batch", json={"columns": {
+        name: [record[name], 500] for name in FEATURE_NAMES}}).status_code == 422
+
+
+# --- Admission Control Tests ---
+
+def test_admission_control_sheds_excess_load_and_spares_health():
+    """Test the slot limit, queue bound and latency budget, and that /health is exempt."""
+    import asyncio
+    import httpx
+    from fastapi import FastAPI
+    from prometheus_client import REGISTRY
+    from api.admission import AdmissionController, AdmissionControlMiddleware
+
+    def shed(reason):
+        return REGISTRY.get_sample_value("admission_shed_requests_total", {"reason": reason}) \
+            or 0.0
+
+    controller = AdmissionController(max_in_flight=2, max_queue=2, latency_budget_s=0.2)
+    app = FastAPI()
+    app.add_middleware(AdmissionControlMiddleware, controller=controller, retry_after_s=3)
+    gate = asyncio.Event()
+
+    @app.post("/predict")
+    async def slow_predict():
+        await gate.wait()
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            before = {reason: shed(reason) for reason in ("queue_full", "timeout",
+                                                          "latency_budget")}
+            calls = [asyncio.create_task(http.post("/predict")) for _ in range(5)]
+            await asyncio.sleep(0.05)
+            assert (controller.in_flight, controller.queue_depth) == (2, 2)
+            assert (await http.get("/health")).status_code == 200
+
+            rejected = await calls[4]  # queue full: shed at once
+            assert rejected.status_code == 503 and rejected.headers["retry-after"] == "3"
+            queued = await asyncio.gather(*calls[2:4])  # budget ran out while waiting
+            assert [response.status_code for response in queued] == [503, 503]
+            gate.set()
+            assert [(await call).status_code for call in calls[:2]] == [200, 200]
+            assert (controller.in_flight, controller.queue_depth) == (0, 0)
+
+            # Once requests are known to take longer than the budget, excess is shed upfront
+            gate.clear()
+            controller.service_time_s = 1.0
+            calls = [asyncio.create_task(http.post("/predict")) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            assert (await calls[2]).status_code == 503
+            gate.set()
+            await asyncio.gather(*calls[:2])
+            return before
+
+    before = asyncio.run(run())
+    assert shed("queue_full") == before["queue_full"] + 1
+    assert shed("timeout") == before["timeout"] + 2
+    assert shed("latency_budget") == before["latency_budget"] + 1
+
+
+def test_admission_gauges_exposed_on_metrics(client, sample_inputs):
+    """Test that the service's admission controller is active and exported."""
+    import api.main
+
+    if api.main.ADMISSION_CONTROLLER is None:
+        pytest.skip("Admission control disabled (ADMISSION_CONTROL_ENABLED=false).")
+    assert client.post("/predict", json=sample_inputs[0]['input']).status_code == 200
+    assert api.main.ADMISSION_CONTROLLER.service_time_s > 0
+
+    metrics = client.get("/metrics").text
+    assert "admission_in_flight_requests 0.0" in metrics
+    assert "admission_queue_depth 0.0" in metrics
+
+
+def test_flat_backend_startup_defers_the_cascade():
+    """Test that the cascade's cheap stage is attached after startup, not while loading."""
+    import subprocess
+    import sys
+    from src.inference import get_active_model, load_cascade_stage
+
+    script = (
+        "import sys\n"
+        "import api.main\n"
+        "from src.inference import get_active_model, attach_active_cascade\n"
+        "model = get_active_model()\n"
+        "heavy = [m for m in ('sklearn', 'pandas', 'scipy', 'mlflow') if m in sys.modules]\n"
+        "served_alone = model.cascade is None\n"
+        "attach_active_cascade()  # what the lifespan runs in the background\n"
+        "print(repr((heavy, served_alone, model.cascade is not None)))\n"
+    )
+    env = dict(os.environ, INFERENCE_BACKEND="flat", CASCADE_ENABLED="true",
+               SHADOW_ENABLED="false")
+    result = subprocess.run([sys.executable, "-c", script], env=env,
+                            capture_output=True, text=True, check=True)
+    calibrated = load_cascade_stage(get_active_model()) is not None
+    assert result.stdout.strip().splitlines()[-1] == repr(([], True, calibrated))
+
+
+def test_health_reports_without_loading_the_model(client, monkeypatch):
+    """Test that /health reads the active snapshot and never loads a model on the event loop."""
+    from src import inference
+
+    model = inference.get_active_model()
+    health = client.get("/health").json()
+    assert health['model_loaded'] and health['model_version'] == model.version
+
+    def fail(*args, **kwargs):
+        raise AssertionError("/health must not load the model")
+
+    monkeypatch.setattr(inference, "ACTIVE_MODEL", None)
+    monkeypatch.setattr(inference, "_read_model", fail)
+    monkeypatch.setattr(inference, "file_digest", fail)
+    health = client.get("/health").json()
+    assert health['model_loaded'] is False and health['model_version'] is None
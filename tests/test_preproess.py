@@ -1,9 +1,10 @@
 # tests/test_preprocess.py
 
 import pytest
+import numpy as np
 import pandas as pd
-from src.preprocess import preprocess_and_split
-from src.config import RAW_DATA_PATH, TARGET_COLUMN
+from src.preprocess import preprocess_and_split, clean_feature_frame, binarize_target
+from src.config import RAW_DATA_PATH, TARGET_COLUMN, NUMERICAL_FEATURES, CATEGORICAL_FEATURES
 
 
 @pytest.fixture(scope="session")
@@ -44,3 +45,53 @@ def test_target_binary_conversion(raw_data_df):
     assert set(combined_y.unique()).issubset({0, 1})
     # Check that both classes are present
     assert combined_y.nunique() == 2
+
+
+def test_clean_feature_frame_uses_compact_dtypes(raw_data_df):
+    """Test that the cleaned columns are float32 measurements and int8 codes."""
+    df = clean_feature_frame(raw_data_df)
+
+    assert all(df[feature].dtype == np.float32 for feature in NUMERICAL_FEATURES)
+    assert all(df[feature].dtype == np.int8 for feature in CATEGORICAL_FEATURES + [TARGET_COLUMN])
+    assert df.notna().all().all()
+
+
+def test_clean_feature_frame_drops_values_the_dtypes_cannot_hold(raw_data_df):
+    """Test that out-of-range or fractional codes are dropped instead of wrapped by the cast."""
+    raw = raw_data_df.dropna().head(10).copy()
+    raw['thal'] = raw['thal'].astype(float)
+    raw['target'] = raw['target'].astype(float)
+    raw.iloc[0, raw.columns.get_loc('thal')] = 300    # wraps to 44 in int8
+    raw.iloc[1, raw.columns.get_loc('thal')] = 259    # wraps to 3, a valid code
+    raw.iloc[2, raw.columns.get_loc('target')] = 2.7  # truncates to 2
+
+    df = clean_feature_frame(raw)
+    assert list(df.index) == list(raw.index[3:])
+    assert (df['thal'].to_numpy() == raw['thal'].to_numpy()[3:]).all()
+
+    # Outside `subset`, such a column is kept in its original dtype instead
+    df = clean_feature_frame(raw, subset=[c for c in raw.columns if c != TARGET_COLUMN])
+    assert list(df.index) == list(raw.index[2:])
+    assert df[TARGET_COLUMN].iloc[0] == 2.7
+
+
+def test_binarize_target_compares_with_zero():
+    """Test that every positive UCI grade (1-4) becomes class 1, as compact int8."""
+    y = binarize_target(pd.Series([0, 1, 2, 3, 4, 0], dtype=np.int8))
+
+    assert y.dtype == np.int8
+    assert y.tolist() == [0, 1, 1, 1, 1, 0]
+
+
+def test_preprocessor_fitted_on_training_split_only(raw_data_df):
+    """Test that the scaler statistics and encoder categories come from X_train alone."""
+    X_train, X_test, _, _, preprocessor = preprocess_and_split(raw_data_df)
+    scaler = preprocessor.named_transformers_['num']
+    encoder = preprocessor.named_transformers_['cat']
+
+    np.testing.assert_allclose(scaler.mean_, X_train[NUMERICAL_FEATURES].astype(float).mean(),
+                               rtol=1e-6)
+    assert not np.allclose(scaler.mean_, pd.concat([X_train, X_test])[NUMERICAL_FEATURES]
+                           .astype(float).mean(), rtol=1e-6)
+    for feature, categories in zip(CATEGORICAL_FEATURES, encoder.categories_):
+        assert categories.tolist() == sorted(X_train[feature].unique().tolist())
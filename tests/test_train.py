@@ -2,11 +2,18 @@
 
 import pytest
 import json
+import numpy as np
 import pandas as pd
-from src.config import MODEL_PATH, RAW_DATA_PATH
-from src.inference import load_model_pipeline, predict_heart_disease
+from src.config import MODEL_PATH, RAW_DATA_PATH, NUMERICAL_FEATURES
+from src.inference import (
+    load_model_pipeline, predict_heart_disease, predict_heart_disease_batch, build_fast_encoder,
+    build_flat_forest, load_flat_forest, FlatForest, predict_heart_disease_batch_cached,
+    get_active_model, reload_model_if_changed, load_serving_bundle
+)
+from src.cache import PredictionCache, make_cache_key
 from src.utils import get_metrics
 from src.preprocess import preprocess_and_split
+from src.dataset_store import load_dataset_split
 
 
 # --- Fixtures ---
@@ -20,11 +27,18 @@ def trained_pipeline():
 
 
 @pytest.fixture(scope="session")
-def test_data():
-    """Load the test split data for metric validation."""
+def dataset_split():
+    """Cleaned train/test split, parsed once per raw file by the dataset store."""
     # Assuming raw data exists from test_preprocess setup
-    raw_df = pd.read_csv(RAW_DATA_PATH)
-    _, X_test, _, y_test, _ = preprocess_and_split(raw_df)
+    if not RAW_DATA_PATH.exists():
+        pytest.fail(f"Raw data file not found at {RAW_DATA_PATH}. Please run download_dataset.py.")
+    return load_dataset_split(RAW_DATA_PATH)
+
+
+@pytest.fixture(scope="session")
+def test_data(dataset_split):
+    """Load the test split data for metric validation."""
+    _, X_test, _, y_test, _ = dataset_split
     return X_test, y_test
 
 
@@ -79,3 +93,413 @@ def test_inference_with_sample_inputs(sample_inputs):
         assert 0.0 <= result['probability'] <= 1.0
 
         print(f"Inference test passed for {sample['name']}. Prediction: {result['prediction']}")
+
+
+def test_fast_encoder_matches_pipeline(trained_pipeline, test_data):
+    """Test that the NumPy encoder reproduces the fitted ColumnTransformer exactly."""
+    X_test, _ = test_data
+    encoder = build_fast_encoder(trained_pipeline)
+    assert encoder is not None
+
+    # Serving inputs arrive as float64; include unseen categories, which must be ignored
+    X = X_test.astype({feature: 'float64' for feature in NUMERICAL_FEATURES})
+    X.iloc[0, X.columns.get_loc('thal')] = 5
+    X.iloc[1, X.columns.get_loc('cp')] = 9
+
+    expected = trained_pipeline.named_steps['preprocessor'].transform(X)
+    by_columns = encoder.encode_columns({c: X[c].tolist() for c in X.columns})
+    by_records = np.vstack([encoder.encode_record(r).copy()
+                            for r in X.to_dict(orient='records')])
+
+    assert np.array_equal(by_columns, expected)
+    assert np.array_equal(by_records, expected)
+
+
+def test_fast_inference_matches_dataframe_path(trained_pipeline, test_data):
+    """Test that the fast path returns exactly the same results as the sklearn pipeline."""
+    X_test, _ = test_data
+    records = X_test.to_dict(orient='records')
+
+    for record in records:
+        assert predict_heart_disease(record, fast=True) == predict_heart_disease(record, fast=False)
+
+    fast = predict_heart_disease_batch(records, fast=True)
+    assert fast == predict_heart_disease_batch(records, fast=False)
+    assert [r['prediction'] for r in fast] == trained_pipeline.predict(X_test).tolist()
+
+
+def test_flat_forest_matches_predict_proba(trained_pipeline, test_data, tmp_path, monkeypatch):
+    """Test that the compiled forest matches the sklearn forest after a save/load, and its cap."""
+    X_test, _ = test_data
+    forest = build_flat_forest(trained_pipeline)
+    if forest is None:
+        pytest.skip("The trained classifier is not a tree ensemble.")
+
+    encoded = trained_pipeline.named_steps['preprocessor'].transform(X_test)
+    expected = trained_pipeline.named_steps['classifier'].predict_proba(encoded)
+    np.testing.assert_allclose(forest.predict_proba(encoded), expected, rtol=0, atol=1e-12)
+
+    forest.save(tmp_path / "v1", source_version="v1")
+    reloaded = FlatForest.load(tmp_path / "v1", mmap_mode='r')
+    np.testing.assert_allclose(reloaded.predict_proba(encoded), expected, rtol=0, atol=1e-12)
+
+    # The export is only memory-mapped for the artifact it was written from
+    assert isinstance(load_flat_forest(trained_pipeline, "v1", tmp_path).left_child, np.memmap)
+    assert not isinstance(load_flat_forest(trained_pipeline, "v2", tmp_path).left_child,
+                          np.memmap)
+
+    # Ensembles deeper than the configured cap are left to sklearn instead of compiled
+    from src import inference
+    monkeypatch.setattr(inference, "FLAT_FOREST_MAX_DEPTH", forest.depth - 1)
+    assert build_flat_forest(trained_pipeline) is None
+
+
+def test_serving_bundle_skips_training_dependencies(trained_pipeline, test_data, tmp_path):
+    """Test that a model served from its bundle matches the pipeline without importing sklearn."""
+    import subprocess
+    import sys
+    from src.inference import file_digest
+    from src.train import export_serving_bundle
+
+    forest = build_flat_forest(trained_pipeline)
+    if forest is None:
+        pytest.skip("The trained classifier is not a tree ensemble.")
+    version = file_digest(MODEL_PATH)
+    export_serving_bundle(forest, build_fast_encoder(trained_pipeline), version, tmp_path)
+
+    X_test, _ = test_data
+    X_test = X_test.astype({name: np.float64 for name in NUMERICAL_FEATURES})  # as served
+    columns = {name: X_test[name].tolist() for name in X_test.columns}
+    expected = trained_pipeline.predict_proba(X_test)
+
+    script = (
+        "import json, sys\n"
+        "from pathlib import Path\n"
+        "from src.inference import load_serving_bundle\n"
+        f"model = load_serving_bundle(Path({str(MODEL_PATH)!r}), Path({str(tmp_path)!r}))\n"
+        "proba = model.predict_proba_batch(json.load(sys.stdin), fast=True)\n"
+        "heavy = [m for m in ('sklearn', 'pandas', 'scipy', 'mlflow', 'src.train')"
+        " if m in sys.modules]\n"
+        "print(json.dumps({'proba': proba.tolist(), 'heavy': heavy}))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], input=json.dumps(columns),
+                            capture_output=True, text=True, check=True)
+    output = json.loads(result.stdout)
+
+    assert output['heavy'] == []
+    np.testing.assert_allclose(output['proba'], expected, rtol=0, atol=1e-12)
+
+    # A new export gets its own directory: the mapped files of the old one are left intact
+    mapped = FlatForest.load(tmp_path / version, mmap_mode='r')
+    export_serving_bundle(forest, None, "next", tmp_path)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["next"]
+    np.testing.assert_allclose(mapped.predict_proba(
+        trained_pipeline.named_steps['preprocessor'].transform(X_test)), expected, atol=1e-12)
+    # Only a bundle exported for this artifact version is used
+    assert load_serving_bundle(MODEL_PATH, tmp_path) is None
+
+
+def test_prediction_cache_lru_and_invalidation(sample_inputs):
+    """Test canonical keys, LRU eviction and flushing when the model version changes."""
+    record = sample_inputs[0]['input']
+    as_floats = {name: float(value) for name, value in reversed(list(record.items()))}
+    assert make_cache_key(record, "v1") == make_cache_key(as_floats, "v1")
+    assert make_cache_key(record, "v1") != make_cache_key(record, "v2")
+
+    cache = PredictionCache(max_entries=2, ttl_seconds=60)
+    cache.sync_model_version("v1")
+    for key in (b"a", b"b", b"c"):
+        cache.put(key, {"prediction": 1})
+    assert cache.get(b"a") is None and cache.get(b"c") == {"prediction": 1}
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 1, 1)
+
+    cache.sync_model_version("v2")
+    assert len(cache) == 0 and cache.invalidations == 1
+
+
+def test_cached_batch_matches_uncached(sample_inputs):
+    """Test that cached results (hits and misses mixed) match direct scoring."""
+    records = [sample['input'] for sample in sample_inputs]
+    first = predict_heart_disease_batch_cached(records[:1])
+    mixed = predict_heart_disease_batch_cached(records)
+    assert mixed[0] == first[0]
+    assert mixed == predict_heart_disease_batch(records)
+
+
+def test_hot_reload_swaps_changed_artifact(trained_pipeline, sample_inputs, tmp_path):
+    """Test that a changed artifact is loaded and swapped in, and an unchanged one is not."""
+    import copy
+    import joblib
+    import src.inference as inference
+
+    original = get_active_model()
+    record = sample_inputs[0]['input']
+    expected = predict_heart_disease(record)
+
+    # A different artifact with identical predictions (only n_jobs changes)
+    retrained = copy.deepcopy(trained_pipeline)
+    retrained.named_steps['classifier'].n_jobs = 1
+    artifact = tmp_path / "model.pkl"
+    joblib.dump(retrained, artifact)
+    try:
+        assert reload_model_if_changed(artifact)
+        swapped = get_active_model()
+        assert swapped is not original and swapped.path == artifact
+        assert predict_heart_disease(record) == expected
+
+        # Same content rewritten: the content hash matches, so nothing is reloaded
+        joblib.dump(retrained, artifact)
+        assert not reload_model_if_changed(artifact)
+        assert get_active_model() is swapped
+    finally:
+        inference._activate(original)
+
+
+# --- Hyperparameter Search Tests ---
+
+def test_search_expands_spaces_and_caches_folds(dataset_split):
+    """Test grid/random expansion and that the fold cache holds preprocessed arrays."""
+    from src.search import expand_search_space, build_fold_cache, evaluate_candidate_fold
+
+    spaces = {"LR": {"model": "LogisticRegression", "base_params": {"solver": 'liblinear'},
+                     "space": {"C": [0.1, 1.0, 10.0]}}}
+    grid = expand_search_space(spaces, strategy="grid")
+    assert [params["C"] for _, _, params in grid] == [0.1, 1.0, 10.0]
+    assert all(params["solver"] == 'liblinear' for _, _, params in grid)
+    assert len(expand_search_space(spaces, strategy="random", n_iter=2)) == 2
+
+    X_train, _, y_train, _, preprocessor = dataset_split
+    folds = build_fold_cache(preprocessor, X_train, y_train, n_folds=3)
+    assert len(folds) == 3
+    assert sum(len(y_val) for _, _, _, y_val in folds) == len(y_train)
+
+    metrics = evaluate_candidate_fold("LogisticRegression", grid[1][2], folds[0])
+    assert 0.0 <= metrics["roc_auc"] <= 1.0
+
+
+# --- Offline Batch Scoring Tests ---
+
+def test_batch_scoring_streams_file_in_chunks(trained_pipeline, tmp_path):
+    """Test that chunked file scoring matches the pipeline and drops incomplete rows."""
+    from src.batch_score import run_batch_scoring
+    from src.preprocess import clean_feature_frame
+
+    raw_df = pd.read_csv(RAW_DATA_PATH)
+    output_path = tmp_path / "scores.csv"
+    rows_out = run_batch_scoring(RAW_DATA_PATH, output_path, chunk_size=50, workers=1)
+
+    expected = clean_feature_frame(raw_df.drop(columns='target'))
+    scored = pd.read_csv(output_path)
+    assert rows_out == len(scored) == len(expected)
+    assert scored['prediction'].tolist() == trained_pipeline.predict(expected).tolist()
+
+
+# --- Drift Monitoring Tests ---
+
+def test_drift_monitor_scores_shifted_traffic(dataset_split):
+    """Test that the drift sketches stay fixed-size, score shifts, and agree across inputs."""
+    from src.drift import build_reference, DriftMonitor
+
+    X_train, _, _, _, _ = dataset_split
+    reference = build_reference(X_train, n_bins=10)
+
+    # Live traffic drawn from the training data itself shows (almost) no drift
+    same = DriftMonitor(reference, window=0)
+    same.update(X_train.to_dict('records'))
+    assert max(scores['psi'] for scores in same.scores().values()) < 0.01
+
+    shifted = X_train.assign(age=X_train['age'] + 15, cp=4)
+    monitor = DriftMonitor(reference, window=0)
+    sizes = [len(counts) for _, _, counts in monitor._numerical + monitor._categorical]
+    monitor.update(shifted.to_dict('records'))
+    scores = monitor.scores()
+    assert scores['age']['psi'] > 0.25 and scores['age']['ks'] > 0.3
+    assert scores['cp']['psi'] > 0.25
+    assert scores['chol']['psi'] < 0.01
+    assert [len(counts) for _, _, counts in monitor._numerical + monitor._categorical] == sizes
+
+    # The vectorized column update matches the per-record one
+    columnar = DriftMonitor(reference, window=0)
+    columnar.update_columns({name: shifted[name].tolist() for name in shifted.columns})
+    assert columnar.scores() == scores
+
+    # Counts decay every `window` records
+    decaying = DriftMonitor(reference, window=len(X_train))
+    decaying.update(X_train.to_dict('records'))
+    assert sum(decaying._numerical[0][2]) == len(X_train) / 2
+
+
+# --- Incremental Training Tests ---
+
+def test_incremental_update_adds_trees_and_updates_scaler(dataset_split, tmp_path):
+    """Test that an update grows the forest in proportion to the new rows and checkpoints."""
+    from src.incremental import (
+        init_state, update_state, evaluate_state, save_checkpoint, load_checkpoint
+    )
+    from src.preprocess import build_preprocessor
+
+    X_train, X_test, y_train, y_test, _ = dataset_split
+    n_initial = len(X_train) * 2 // 3
+    X_old, y_old = X_train.iloc[:n_initial], y_train.iloc[:n_initial]
+    X_new, y_new = X_train.iloc[n_initial:], y_train.iloc[n_initial:]
+
+    state = init_state(X_old, y_old, X_test, y_test, build_preprocessor().fit(X_old))
+    forest = state['pipelines']["Random Forest"].named_steps['classifier']
+    first_tree = forest.estimators_[0]
+    scaler = state['pipelines']["SGD Classifier"].named_steps['preprocessor'] \
+        .named_transformers_['num']
+    frozen_mean = state['pipelines']["Random Forest"].named_steps['preprocessor'] \
+        .named_transformers_['num'].mean_.copy()
+
+    summary = update_state(state, X_new, y_new)
+
+    assert summary['n_new_trees'] == round(len(X_new) / (n_initial / 100))
+    assert len(forest.estimators_) == 100 + summary['n_new_trees']
+    assert forest.estimators_[0] is first_tree  # existing trees are kept, not refitted
+    assert scaler.n_samples_seen_ == len(X_train)
+    np.testing.assert_allclose(scaler.mean_, X_train[NUMERICAL_FEATURES].mean(), rtol=1e-5)
+    np.testing.assert_array_equal(
+        state['pipelines']["Random Forest"].named_steps['preprocessor']
+        .named_transformers_['num'].mean_, frozen_mean)
+    assert state['n_rows_seen'] == len(X_train)
+
+    # A single-class batch still updates the linear model but adds no trees
+    positives = y_new == 1
+    assert update_state(state, X_new[positives], y_new[positives])['n_new_trees'] == 0
+
+    save_checkpoint(state, tmp_path / 'checkpoint.pkl')
+    restored = load_checkpoint(tmp_path / 'checkpoint.pkl')
+    assert evaluate_state(restored) == evaluate_state(state)
+
+
+# --- Dataset Store Tests ---
+
+def test_dataset_store_reuses_entries_by_checksum(tmp_path):
+    """Test that the store matches preprocess_and_split, memory-maps, and keys by content."""
+    from src.dataset_store import ensure_dataset
+
+    store_dir = tmp_path / 'store'
+    source = f"file://{RAW_DATA_PATH}"
+    X_train, X_test, y_train, y_test, _ = load_dataset_split(source, store_dir)
+    expected = preprocess_and_split(pd.read_csv(RAW_DATA_PATH))
+
+    pd.testing.assert_frame_equal(X_train.copy(), expected[0])
+    pd.testing.assert_frame_equal(X_test.copy(), expected[1])
+    np.testing.assert_array_equal(y_train, expected[2])
+    np.testing.assert_array_equal(y_test.index, expected[3].index)
+    assert isinstance(X_train['age'].values, np.memmap)
+
+    # Same bytes: the entry is reused as-is, even under another path
+    entry = ensure_dataset(RAW_DATA_PATH, store_dir)
+    manifest_mtime = (entry / 'manifest.json').stat().st_mtime_ns
+    copy_path = tmp_path / 'copy.csv'
+    copy_path.write_bytes(RAW_DATA_PATH.read_bytes())
+    assert ensure_dataset(copy_path, store_dir) == entry
+    assert (entry / 'manifest.json').stat().st_mtime_ns == manifest_mtime
+
+    # Changed bytes: a new entry
+    with open(copy_path, 'a') as f:
+        f.write(copy_path.read_text().splitlines()[1] + "\n")
+    assert ensure_dataset(copy_path, store_dir) != entry
+
+    with pytest.raises(ValueError):
+        ensure_dataset("https://example.com/heart.csv", store_dir)
+
+
+# --- Cascade Tests ---
+
+def test_cascade_band_is_minimal_and_routes_uncertain_rows(trained_pipeline, dataset_split):
+    """Test that the calibrated band meets its target and the cascade serves it exactly."""
+    from sklearn.base import clone
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+    from src import inference
+    from src.inference import LoadedModel, CascadeStage, file_digest
+    from src.cascade import calibrate_cascade_band, cascade_proba, out_of_fold_predictions
+
+    # Against an exhaustive search over all bands on synthetic scores
+    rng = np.random.default_rng(0)
+    p = np.round(rng.uniform(size=300), 2)
+    expensive = (p + rng.normal(scale=0.15, size=300)) > 0.5
+    candidates = np.unique(np.append(p, 0.5))
+    for target in (0.9, 0.97, 1.0):
+        band = calibrate_cascade_band(p, expensive, target)
+        inside = (p >= band['low']) & (p <= band['high'])
+        served = np.where(inside, expensive, p > 0.5)
+        assert np.mean(served == expensive) == pytest.approx(band['agreement'])
+        assert band['agreement'] >= target
+        best = min(
+            np.sum((p >= low) & (p <= high))
+            for low in candidates[candidates <= 0.5] for high in candidates[candidates >= 0.5]
+            if np.mean(np.where((p >= low) & (p <= high), expensive, p > 0.5) == expensive)
+            >= target
+        )
+        assert inside.sum() == best
+
+    # Served cascade: cheap probabilities outside the band, the forest's inside it
+    X_train, X_test, y_train, _, preprocessor = dataset_split
+    cheap_pipeline = Pipeline([('preprocessor', clone(preprocessor)),
+                               ('classifier', LogisticRegression(max_iter=1000))])
+    cheap_pipeline.fit(X_train, y_train)
+    # Calibrated on clones fitted per fold: the fitted models themselves are untouched
+    before = trained_pipeline.predict_proba(X_test)
+    oof_cheap, oof_served = out_of_fold_predictions(trained_pipeline, cheap_pipeline,
+                                                    X_train, y_train)
+    assert oof_cheap.shape == oof_served.shape == (len(X_train),)
+    np.testing.assert_array_equal(trained_pipeline.predict_proba(X_test), before)
+    band = calibrate_cascade_band(oof_cheap, oof_served, 0.99)
+    cheap = LoadedModel(cheap_pipeline, MODEL_PATH, "cheap", None)
+    model = LoadedModel(trained_pipeline, MODEL_PATH, file_digest(MODEL_PATH), None,
+                        cascade=CascadeStage(cheap, band['low'], band['high']))
+    # (numerical features as served: float64)
+    X_served = X_test.astype({feature: np.float64 for feature in NUMERICAL_FEATURES})
+    expected = cascade_proba(cheap_pipeline.predict_proba(X_served),
+                             trained_pipeline.predict_proba(X_served), band['low'], band['high'])
+
+    counts = []
+    inference.CASCADE_OBSERVER = lambda n_rows, n_escalated: counts.append((n_rows, n_escalated))
+    try:
+        records = X_served.to_dict('records')
+        np.testing.assert_allclose(model.predict_proba_batch(records, fast=True), expected)
+        for record, row in zip(records[:10], expected):
+            np.testing.assert_allclose(model.predict_proba_record(record, fast=True)[0], row)
+    finally:
+        inference.CASCADE_OBSERVER = None
+    escalated = CascadeStage(None, band['low'], band['high']).escalate(
+        cheap_pipeline.predict_proba(X_served))
+    assert counts[0] == (len(X_test), escalated.sum())
+    assert 0 < escalated.sum() < len(X_test)
+
+
+# --- Evaluation Tests ---
+
+def test_vectorized_evaluation_matches_sklearn(trained_pipeline, test_data):
+    """Test that bootstrap resamples and threshold sweeps score exactly like get_metrics."""
+    from src.evaluation import weighted_metrics, bootstrap_metrics, threshold_sweep
+
+    X_test, y_test = test_data
+    y_true = y_test.to_numpy()
+    y_prob = trained_pipeline.predict_proba(X_test)[:, 1]
+    rng = np.random.default_rng(0)
+
+    # Each weight row is one resample (row multiplicities); scores are tied in places
+    indices = rng.integers(0, len(y_true), size=(20, len(y_true)))
+    weights = np.stack([np.bincount(row, minlength=len(y_true)) for row in indices])
+    resampled = weighted_metrics(y_true, y_prob, weights)
+    for i, row in enumerate(indices):
+        expected = get_metrics(y_true[row], (y_prob[row] > 0.5).astype(int), y_prob[row])
+        for name, value in expected.items():
+            assert resampled[name][i] == pytest.approx(value)
+
+    intervals = bootstrap_metrics(y_true, y_prob, n_resamples=500)
+    for name, value in get_metrics(y_true, trained_pipeline.predict(X_test), y_prob).items():
+        assert intervals[name]['estimate'] == pytest.approx(value)
+        assert intervals[name]['ci_low'] <= value <= intervals[name]['ci_high']
+    assert bootstrap_metrics(y_true, y_prob, n_resamples=500) == intervals  # seeded
+
+    sweep = threshold_sweep(y_true, y_prob, [0.2, 0.5, 0.8])
+    for i, threshold in enumerate([0.2, 0.5, 0.8]):
+        expected = get_metrics(y_true, (y_prob > threshold).astype(int), y_prob)
+        for name in ("accuracy", "precision", "recall"):
+            assert sweep[name][i] == pytest.approx(expected[name])
+    assert (sweep['tp'] + sweep['fp'] + sweep['fn'] + sweep['tn'] == len(y_true)).all()